@@ -4,22 +4,40 @@ Admin API endpoints for superadmin monitoring.
 Provides:
 - Users health overview (Meta connection status, activity stats, error counts)
 - Log cleanup (delete old logs)
+- Upstream call ranking (Meta Graph API / LLM latency, throttling, retries)
+- Request traces (orchestrator -> skills -> tools -> Meta API waterfalls)
+- Blocking calls caught by the event loop watchdog
+- On-demand sampling profiler (collapsed stacks for flame graphs)
 """
 
-import json
-import re
-from pathlib import Path
+import asyncio
+from datetime import datetime, timedelta
 from typing import Optional
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 
-from app.middleware.activity_logger import get_db_connection
+from app.config import get_settings
+from app.services.activity_log import (
+    UPSTREAM_TABLE,
+    count_logs,
+    get_db_connection,
+    get_last_retention_report,
+    latency_percentiles,
+    log_row_to_dict,
+    now_ms,
+    partition_union,
+    rollup_source,
+    run_retention,
+)
+from app.services.loop_monitor import get_loop_monitor
+from app.services.profiler import MAX_SECONDS as PROFILER_MAX_SECONDS, get_profiler
+from app.services.settings_index import get_settings_index
+from app.services.tracing import get_trace_buffer
 
 router = APIRouter()
 
-DATA_DIR = Path(__file__).parent.parent.parent / "data"
-
 
 class UserHealth(BaseModel):
     user_id: str
@@ -43,42 +61,61 @@ class LogCleanupResponse(BaseModel):
     success: bool
     deleted_count: int
     remaining_count: int
+    dropped_partitions: int = 0
+    reclaimed_bytes: int = 0
 
 
-def get_all_user_settings() -> list[dict]:
-    """Scan data dir for all per-user settings files."""
-    users = []
-    if not DATA_DIR.exists():
-        return users
-
-    for path in DATA_DIR.glob("settings_*.json"):
-        match = re.match(r"settings_(.+)\.json$", path.name)
-        if not match:
-            continue
+class LogRetentionResponse(BaseModel):
+    success: bool
+    report: Optional[dict] = None
 
-        user_id = match.group(1)
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                settings = json.load(f)
-        except (json.JSONDecodeError, OSError):
-            settings = {}
 
-        meta_api = settings.get("meta_api", {})
-        evolution = settings.get("evolution", {})
+class UpstreamCallsResponse(BaseModel):
+    success: bool
+    hours: int
+    sort: str
+    endpoints: list[dict]
+    accounts: list[dict]
+
+
+class TracesResponse(BaseModel):
+    success: bool
+    traces: list[dict]
+
+
+class TraceResponse(BaseModel):
+    success: bool
+    trace: dict
+
+
+class BlockingCallsResponse(BaseModel):
+    success: bool
+    watchdog_running: bool
+    since: str
+    threshold_ms: float
+    last_lag_ms: float
+    max_lag_ms: float
+    discarded: int
+    sites: list[dict]
+
+
+class ProfilerResponse(BaseModel):
+    success: bool
+    session: Optional[dict] = None
+    top_frames: list[dict] = []
+
 
-        users.append({
-            "user_id": user_id,
-            "has_meta_token": bool(meta_api.get("access_token", "")),
-            "has_ad_account": bool(meta_api.get("ad_account_id", "")),
-            "ad_account_id": meta_api.get("ad_account_id", "") or None,
-            "has_evolution": bool(
-                evolution.get("enabled", False)
-                and evolution.get("api_url", "")
-                and evolution.get("api_key", "")
-            ),
-        })
+# sort key -> ORDER BY of the upstream endpoint ranking
+UPSTREAM_SORTS = {
+    "total_time": "total_ms DESC",
+    "throttle_rate": "throttle_rate DESC, throttled DESC",
+    "retry_cost": "retry_ms DESC, retries DESC",
+}
 
-    return users
+
+def get_all_user_settings() -> list[dict]:
+    """Summaries of all per-user settings files (cached, see settings_index)."""
+    return get_settings_index().get_all()
 
 
 @router.get("/users-health", response_model=UsersHealthResponse)
@@ -92,17 +129,19 @@ async def get_users_health(
     user_settings = get_all_user_settings()
 
     conn = get_db_connection()
-    time_filter = f"timestamp >= datetime('now', '-{hours} hours')"
+    since_ms = now_ms() - hours * 3_600_000
 
-    # Get per-user activity stats
+    # Per-user activity stats from the request roll-ups
+    rollups, rollup_params = rollup_source(datetime.utcnow() - timedelta(hours=hours))
     activity_stats = conn.execute(
         f"""SELECT user_id,
-            COUNT(*) as total_requests,
-            SUM(CASE WHEN status_code >= 400 THEN 1 ELSE 0 END) as error_count,
-            MAX(timestamp) as last_activity
-            FROM activity_logs
-            WHERE {time_filter} AND user_id IS NOT NULL
-            GROUP BY user_id"""
+            SUM(count) as total_requests,
+            SUM(error_count) as error_count,
+            MAX(last_seen) as last_activity
+            FROM ({rollups})
+            WHERE user_id != ''
+            GROUP BY user_id""",
+        rollup_params,
     ).fetchall()
 
     stats_map = {
@@ -114,17 +153,21 @@ async def get_users_health(
         for row in activity_stats
     }
 
-    # Get last error per user
-    error_rows = conn.execute(
-        f"""SELECT user_id, timestamp, error_detail
-            FROM activity_logs
-            WHERE {time_filter} AND status_code >= 400 AND user_id IS NOT NULL
-            AND timestamp IN (
-                SELECT MAX(timestamp) FROM activity_logs
-                WHERE {time_filter} AND status_code >= 400 AND user_id IS NOT NULL
-                GROUP BY user_id
-            )"""
-    ).fetchall()
+    # Last error per user: one pass over the period's partitions
+    error_rows = []
+    source = partition_union(conn, since_ms=since_ms)
+    if source:
+        error_rows = conn.execute(
+            f"""SELECT user_id, ts, error_detail FROM (
+                SELECT user_id, ts, error_detail,
+                    ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY ts DESC, id DESC) as rn
+                FROM ({source})
+                WHERE ts >= ? AND status_code >= 400 AND user_id IS NOT NULL
+            ) WHERE rn = 1""",
+            (since_ms,),
+        ).fetchall()
+
+    error_rows = [log_row_to_dict(row) for row in error_rows]
 
     error_map = {
         row["user_id"]: {
@@ -187,29 +230,229 @@ async def cleanup_old_logs(
 ):
     """
     Delete activity logs older than the specified number of days.
-    Returns the count of deleted and remaining logs.
+    Same routine as the scheduled retention job: whole daily partitions are
+    dropped, the straddling partition is deleted in small batches and the
+    freed space is reclaimed. Returns the count of deleted and remaining logs.
     """
-    conn = get_db_connection()
+    def cleanup() -> tuple[dict, int]:
+        report = run_retention(days, batch_size=get_settings().activity_log_delete_batch_size)
+        conn = get_db_connection()
+        try:
+            return report, count_logs(conn)
+        finally:
+            conn.close()
 
-    count_before = conn.execute(
-        "SELECT COUNT(*) as cnt FROM activity_logs"
-    ).fetchone()["cnt"]
+    report, count_after = await asyncio.to_thread(cleanup)
 
-    conn.execute(
-        f"DELETE FROM activity_logs WHERE timestamp < datetime('now', '-{days} days')"
+    return LogCleanupResponse(
+        success=True,
+        deleted_count=report["deleted_rows"],
+        remaining_count=count_after,
+        dropped_partitions=report["dropped_partitions"],
+        reclaimed_bytes=report["reclaimed_bytes"],
     )
-    conn.commit()
 
-    count_after = conn.execute(
-        "SELECT COUNT(*) as cnt FROM activity_logs"
-    ).fetchone()["cnt"]
 
+@router.get("/logs-retention", response_model=LogRetentionResponse)
+async def get_logs_retention():
+    """Report of the last retention run (scheduled job or manual cleanup)."""
+    return LogRetentionResponse(success=True, report=get_last_retention_report())
+
+
+@router.get("/upstream-calls", response_model=UpstreamCallsResponse)
+async def get_upstream_calls(
+    hours: int = Query(24, ge=1, le=720, description="Last N hours"),
+    service: Optional[str] = Query(None, description="meta or llm"),
+    sort: str = Query("total_time", description="total_time, throttle_rate or retry_cost"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """
+    Ranks upstream endpoints (Meta Graph API templates, LLM calls per skill)
+    by total time spent, throttle rate or retry cost, with latency
+    percentiles and the highest usage percentages reported per ad account.
+    """
+    if sort not in UPSTREAM_SORTS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort: {sort}")
+
+    since_ms = now_ms() - hours * 3_600_000
+    where = "WHERE ts >= ?"
+    params: list = [since_ms]
+    if service:
+        where += " AND service = ?"
+        params.append(service)
+
+    conn = get_db_connection()
+    endpoints = conn.execute(
+        f"""SELECT service, method, endpoint, COALESCE(caller, '') as caller,
+            COUNT(*) as calls,
+            ROUND(SUM(duration_ms), 2) as total_ms,
+            ROUND(AVG(duration_ms), 2) as avg_ms,
+            MAX(duration_ms) as max_ms,
+            SUM(attempts - 1) as retries,
+            ROUND(SUM(retry_ms), 2) as retry_ms,
+            SUM(throttled) as throttled,
+            ROUND(1.0 * SUM(throttled) / COUNT(*), 4) as throttle_rate,
+            SUM(status_code IS NULL OR status_code >= 400 OR error_code IS NOT NULL) as errors,
+            COALESCE(SUM(response_bytes), 0) as response_bytes
+            FROM {UPSTREAM_TABLE} {where}
+            GROUP BY service, method, endpoint, caller
+            ORDER BY {UPSTREAM_SORTS[sort]}
+            LIMIT ?""",
+        [*params, limit],
+    ).fetchall()
+
+    histogram_rows = conn.execute(
+        f"""SELECT service, method, endpoint, COALESCE(caller, '') as caller,
+            latency_bin(duration_ms) as bin, COUNT(*) as count
+            FROM {UPSTREAM_TABLE} {where}
+            GROUP BY service, method, endpoint, caller, bin""",
+        params,
+    ).fetchall()
+
+    accounts = conn.execute(
+        f"""SELECT account_id, COUNT(*) as calls,
+            SUM(throttled) as throttled,
+            MAX(app_usage_pct) as max_app_usage_pct,
+            MAX(account_usage_pct) as max_account_usage_pct,
+            MAX(business_usage_pct) as max_business_usage_pct
+            FROM {UPSTREAM_TABLE}
+            WHERE ts >= ? AND service = 'meta' AND account_id IS NOT NULL
+            GROUP BY account_id
+            ORDER BY MAX(COALESCE(account_usage_pct, 0), COALESCE(business_usage_pct, 0),
+                         COALESCE(app_usage_pct, 0)) DESC, calls DESC
+            LIMIT ?""",
+        (since_ms, limit),
+    ).fetchall()
     conn.close()
 
-    deleted = count_before - count_after
+    histograms: dict[tuple, dict[int, int]] = {}
+    for row in histogram_rows:
+        key = (row["service"], row["method"], row["endpoint"], row["caller"])
+        histograms.setdefault(key, {})[row["bin"]] = row["count"]
 
-    return LogCleanupResponse(
+    ranked = []
+    for row in endpoints:
+        endpoint = dict(row)
+        key = (row["service"], row["method"], row["endpoint"], row["caller"])
+        latency = latency_percentiles(histograms.get(key, {}), row["max_ms"])
+        endpoint.update({f"{name}_ms": value for name, value in latency.items() if name != "max"})
+        ranked.append(endpoint)
+
+    return UpstreamCallsResponse(
         success=True,
-        deleted_count=deleted,
-        remaining_count=count_after,
+        hours=hours,
+        sort=sort,
+        endpoints=ranked,
+        accounts=[dict(row) for row in accounts],
+    )
+
+
+@router.get("/traces", response_model=TracesResponse)
+async def list_traces(
+    name: Optional[str] = Query(None, description="Root span name, e.g. orchestrator.process_message"),
+    min_duration_ms: float = Query(0, ge=0, description="Only traces at least this slow"),
+    errors_only: bool = Query(False),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Most recent traces kept in memory (newest first), without their spans."""
+    traces = []
+    for trace in get_trace_buffer().list():
+        summary = trace.summary()
+        if name and summary["name"] != name:
+            continue
+        if (summary["duration_ms"] or 0) < min_duration_ms:
+            continue
+        if errors_only and not summary["error"]:
+            continue
+        traces.append(summary)
+        if len(traces) >= limit:
+            break
+    return TracesResponse(success=True, traces=traces)
+
+
+@router.get("/traces/{trace_id}", response_model=TraceResponse)
+async def get_trace(trace_id: str):
+    """
+    Waterfall of one trace: spans in start order with their offset from the
+    trace start, duration, nesting depth, thread and attributes.
+    """
+    trace = get_trace_buffer().get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found (expired from the buffer?)")
+    return TraceResponse(success=True, trace=trace.waterfall())
+
+
+@router.get("/blocking-calls", response_model=BlockingCallsResponse)
+async def get_blocking_calls(limit: int = Query(50, ge=1, le=200)):
+    """
+    Call sites that blocked the event loop for longer than the watchdog
+    threshold, ranked by total blocked time, with the stack of the worst stall.
+    """
+    monitor = get_loop_monitor()
+    return BlockingCallsResponse(
+        success=True,
+        watchdog_running=monitor.running and monitor.watchdog_enabled,
+        since=monitor.report.since.isoformat(),
+        threshold_ms=monitor.block_threshold * 1000,
+        last_lag_ms=round(monitor.last_lag * 1000, 2),
+        max_lag_ms=round(monitor.max_lag * 1000, 2),
+        discarded=monitor.report.discarded,
+        sites=monitor.report.top(limit),
+    )
+
+
+@router.delete("/blocking-calls")
+async def reset_blocking_calls():
+    """Clears the blocking call report (e.g. after deploying a fix)."""
+    get_loop_monitor().report.reset()
+    return {"success": True}
+
+
+@router.post("/profiler/start", response_model=ProfilerResponse)
+async def start_profiler(
+    seconds: float = Query(30, gt=0, le=PROFILER_MAX_SECONDS),
+    interval_ms: float = Query(10, ge=1, le=1000),
+    route: Optional[str] = Query(None, description="Route template, e.g. /api/campaigns/{campaign_id}"),
+    include_idle: bool = Query(False, description="Also count threads waiting on I/O, locks or queues"),
+):
+    """
+    Starts a time-boxed sampling profile of the running process (no restart
+    needed). Fetch the result with GET /profiler/collapsed once it finishes.
+    """
+    try:
+        session = get_profiler().start(seconds, interval_ms, route=route, include_idle=include_idle)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return ProfilerResponse(success=True, session=session)
+
+
+@router.post("/profiler/stop", response_model=ProfilerResponse)
+async def stop_profiler():
+    """Ends the running profile early, keeping the samples taken so far."""
+    profiler = get_profiler()
+    await asyncio.to_thread(profiler.stop)
+    return ProfilerResponse(success=True, session=profiler.status())
+
+
+@router.get("/profiler", response_model=ProfilerResponse)
+async def get_profiler_status(limit: int = Query(30, ge=1, le=200)):
+    """Status of the current or last profile and its hottest frames (by self samples)."""
+    profiler = get_profiler()
+    return ProfilerResponse(success=True, session=profiler.status(), top_frames=profiler.top_frames(limit))
+
+
+@router.get("/profiler/collapsed", response_class=PlainTextResponse)
+async def download_profile():
+    """
+    Collapsed stacks of the current or last profile, one `frames count` line
+    per stack: feed to flamegraph.pl or open in speedscope.
+    """
+    profiler = get_profiler()
+    status = profiler.status()
+    if status is None:
+        raise HTTPException(status_code=404, detail="No profile recorded yet")
+    filename = f"profile-{status['started_at'][:19].replace(':', '')}.collapsed"
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
@@ -1,8 +1,8 @@
+import asyncio
 import json
-from datetime import datetime
-from pathlib import Path
 from typing import Optional
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
 from app.models.alert import (
     Alert,
@@ -13,30 +13,27 @@ from app.models.alert import (
     AlertType,
     AlertPriority,
 )
+from app.services.alert_bus import get_alert_bus
 from app.services.alert_generator import run_alert_generation
+from app.services.alert_store import (
+    delete_user_alerts,
+    find_alert,
+    get_partition_file,
+    get_unread_count as count_unread_alerts,
+    last_seen,
+    list_partition_files,
+    load_alerts,
+    load_partition,
+    read_partition,
+    save_partition,
+    user_lock,
+    write_partition,
+)
 
 router = APIRouter()
 
-DATA_DIR = Path(__file__).parent.parent.parent / "data"
-ALERTS_FILE = DATA_DIR / "alerts.json"
-
-
-def ensure_data_dir():
-    DATA_DIR.mkdir(exist_ok=True)
-
-
-def load_alerts() -> list[dict]:
-    ensure_data_dir()
-    if ALERTS_FILE.exists():
-        with open(ALERTS_FILE, "r") as f:
-            return json.load(f)
-    return []
-
-
-def save_alerts(alerts: list[dict]):
-    ensure_data_dir()
-    with open(ALERTS_FILE, "w") as f:
-        json.dump(alerts, f, indent=2, default=str)
+# Interval between SSE keep-alive comments (seconds)
+STREAM_HEARTBEAT_SECONDS = 15
 
 
 def alert_to_response(alert: dict) -> AlertResponse:
@@ -50,7 +47,9 @@ def alert_to_response(alert: dict) -> AlertResponse:
         campaign_name=alert.get("campaign_name"),
         ad_account_id=alert.get("ad_account_id"),
         read=alert.get("read", False),
+        occurrences=alert.get("occurrences", 1),
         created_at=alert["created_at"],
+        last_seen_at=alert.get("last_seen_at"),
     )
 
 
@@ -61,13 +60,12 @@ async def get_alerts(
     read: Optional[bool] = Query(None),
     ad_account_id: Optional[str] = Query(None, description="Filtrar por conta de anúncios"),
     limit: int = Query(50, ge=1, le=100),
+    user_id: Optional[str] = Query(None),
 ):
     """Get all alerts with optional filtering"""
-    alerts = load_alerts()
+    alerts = load_alerts(user_id, ad_account_id)
 
     # Apply filters
-    if ad_account_id:
-        alerts = [a for a in alerts if a.get("ad_account_id") == ad_account_id]
     if type:
         alerts = [a for a in alerts if a["type"] == type]
     if priority:
@@ -75,11 +73,11 @@ async def get_alerts(
     if read is not None:
         alerts = [a for a in alerts if a.get("read", False) == read]
 
-    # Sort by created_at descending (newest first)
-    alerts.sort(key=lambda x: x["created_at"], reverse=True)
+    # Sort by last occurrence descending (most recent first)
+    alerts.sort(key=last_seen, reverse=True)
 
-    # Calculate unread count (same scope as filtered alerts)
-    unread_count = sum(1 for a in alerts if not a.get("read", False))
+    # Unread count (same scope as filtered alerts) from the maintained counters
+    unread_count = 0 if read else count_unread_alerts(user_id, ad_account_id, type, priority)
 
     # Apply limit
     limited_alerts = alerts[:limit]
@@ -92,27 +90,100 @@ async def get_alerts(
 
 
 @router.get("/unread-count")
-async def get_unread_count():
+async def get_unread_count(
+    ad_account_id: Optional[str] = Query(None, description="Filtrar por conta de anúncios"),
+    user_id: Optional[str] = Query(None),
+):
     """Get count of unread alerts"""
-    alerts = load_alerts()
-    unread_count = sum(1 for a in alerts if not a.get("read", False))
-    return {"unread_count": unread_count}
+    return {"unread_count": count_unread_alerts(user_id, ad_account_id)}
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str, ensure_ascii=False)}\n\n"
+
+
+@router.get("/stream")
+async def stream_alerts(request: Request, user_id: Optional[str] = Query(None)):
+    """
+    Server-Sent Events stream of the user's alerts.
+
+    Events:
+    - unread_count: initial snapshot ({"unread_count": n})
+    - alert: new or reopened alert ({"alert": {...}, "unread_delta": 1})
+    - unread_delta: read/unread/delete changes ({"delta": n, "ad_account_id": ...})
+    - resync: the client fell behind and should refetch its state
+    """
+    bus = get_alert_bus()
+    subscription = bus.subscribe(user_id)
+
+    async def event_stream():
+        try:
+            yield format_sse("unread_count", {"unread_count": count_unread_alerts(user_id)})
+
+            while not await request.is_disconnected():
+                message = await subscription.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(message["event"], message["data"])
+        except asyncio.CancelledError:
+            pass
+        finally:
+            bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.put("/mark-all-read", response_model=dict)
+async def mark_all_read(
+    ad_account_id: Optional[str] = Query(None, description="Filtrar por conta de anúncios"),
+    user_id: Optional[str] = Query(None),
+):
+    """Mark all alerts as read"""
+    def mark_partitions() -> tuple[int, int]:
+        if ad_account_id:
+            paths = [get_partition_file(user_id, ad_account_id)]
+        else:
+            paths = list_partition_files(user_id)
+
+        updated = 0
+        newly_read = 0
+        with user_lock(user_id):
+            for path in paths:
+                alerts = read_partition(path)
+                for alert in alerts:
+                    if not alert.get("read", False):
+                        newly_read += 1
+                    alert["read"] = True
+                write_partition(path, alerts)
+                updated += len(alerts)
+        return updated, newly_read
+
+    # The user's lock is held in a worker thread, never on the event loop
+    updated, newly_read = await asyncio.to_thread(mark_partitions)
+
+    get_alert_bus().publish_unread_delta(user_id, -newly_read, ad_account_id)
+    return {"success": True, "updated": updated}
 
 
 @router.get("/{alert_id}", response_model=AlertResponse)
-async def get_alert(alert_id: str):
+async def get_alert(alert_id: str, user_id: Optional[str] = Query(None)):
     """Get a specific alert by ID"""
-    alerts = load_alerts()
-    alert = next((a for a in alerts if a["id"] == alert_id), None)
+    found = find_alert(user_id, alert_id)
 
-    if not alert:
+    if not found:
         raise HTTPException(status_code=404, detail="Alert not found")
 
-    return alert_to_response(alert)
+    _, alerts, index = found
+    return alert_to_response(alerts[index])
 
 
 @router.post("", response_model=AlertResponse)
-async def create_alert(request: CreateAlertRequest):
+async def create_alert(request: CreateAlertRequest, user_id: Optional[str] = Query(None)):
     """Create a new alert"""
     alert = Alert(
         type=request.type,
@@ -121,69 +192,90 @@ async def create_alert(request: CreateAlertRequest):
         message=request.message,
         campaign_id=request.campaign_id,
         campaign_name=request.campaign_name,
+        ad_account_id=request.ad_account_id,
     )
 
-    alerts = load_alerts()
     alert_dict = alert.model_dump()
     alert_dict["created_at"] = alert.created_at.isoformat()
-    alerts.append(alert_dict)
-    save_alerts(alerts)
+    alert_dict["last_seen_at"] = alert_dict["created_at"]
+
+    def append_alert():
+        with user_lock(user_id):
+            alerts = load_partition(user_id, request.ad_account_id)
+            alerts.append(alert_dict)
+            save_partition(alerts, user_id, request.ad_account_id)
+
+    await asyncio.to_thread(append_alert)
+    get_alert_bus().publish_alerts(user_id, [alert_dict])
 
     return alert_to_response(alert_dict)
 
 
 @router.put("/{alert_id}", response_model=AlertResponse)
-async def update_alert(alert_id: str, update: AlertUpdate):
+async def update_alert(alert_id: str, update: AlertUpdate, user_id: Optional[str] = Query(None)):
     """Update an alert (e.g., mark as read)"""
-    alerts = load_alerts()
-    alert_index = next((i for i, a in enumerate(alerts) if a["id"] == alert_id), None)
+    def apply_update() -> tuple[dict, bool]:
+        with user_lock(user_id):
+            found = find_alert(user_id, alert_id)
 
-    if alert_index is None:
-        raise HTTPException(status_code=404, detail="Alert not found")
+            if not found:
+                raise HTTPException(status_code=404, detail="Alert not found")
 
-    if update.read is not None:
-        alerts[alert_index]["read"] = update.read
+            path, alerts, alert_index = found
+            alert = alerts[alert_index]
+            was_read = alert.get("read", False)
+            if update.read is not None:
+                alert["read"] = update.read
 
-    save_alerts(alerts)
-    return alert_to_response(alerts[alert_index])
+            write_partition(path, alerts)
+        return alert, was_read
 
-
-@router.put("/mark-all-read", response_model=dict)
-async def mark_all_read():
-    """Mark all alerts as read"""
-    alerts = load_alerts()
-    for alert in alerts:
-        alert["read"] = True
-    save_alerts(alerts)
-    return {"success": True, "updated": len(alerts)}
+    alert, was_read = await asyncio.to_thread(apply_update)
+    if alert.get("read", False) != was_read:
+        get_alert_bus().publish_unread_delta(user_id, 1 if was_read else -1, alert.get("ad_account_id"))
+    return alert_to_response(alert)
 
 
 @router.delete("/{alert_id}")
-async def delete_alert(alert_id: str):
+async def delete_alert(alert_id: str, user_id: Optional[str] = Query(None)):
     """Delete an alert"""
-    alerts = load_alerts()
-    alert_index = next((i for i, a in enumerate(alerts) if a["id"] == alert_id), None)
+    def remove_alert() -> dict:
+        with user_lock(user_id):
+            found = find_alert(user_id, alert_id)
 
-    if alert_index is None:
-        raise HTTPException(status_code=404, detail="Alert not found")
+            if not found:
+                raise HTTPException(status_code=404, detail="Alert not found")
+
+            path, alerts, alert_index = found
+            deleted = alerts.pop(alert_index)
+            write_partition(path, alerts)
+        return deleted
 
-    deleted = alerts.pop(alert_index)
-    save_alerts(alerts)
+    deleted = await asyncio.to_thread(remove_alert)
+    if not deleted.get("read", False):
+        get_alert_bus().publish_unread_delta(user_id, -1, deleted.get("ad_account_id"))
     return {"success": True, "deleted_id": deleted["id"]}
 
 
 @router.delete("")
-async def delete_all_alerts():
+async def delete_all_alerts(user_id: Optional[str] = Query(None)):
     """Delete all alerts"""
-    save_alerts([])
+    await asyncio.to_thread(delete_user_alerts, user_id)
+    get_alert_bus().publish(user_id, "resync", {})
     return {"success": True}
 
 
 @router.post("/generate")
-async def generate_alerts(campaigns: list[dict]):
+async def generate_alerts(
+    campaigns: list[dict],
+    ad_account_id: Optional[str] = Query(None, description="ID da conta de anúncios"),
+    user_id: Optional[str] = Query(None),
+):
     """
     Generate alerts based on campaign data.
     This endpoint is called after syncing campaigns.
     """
-    new_count = run_alert_generation(campaigns)
+    new_count = await asyncio.to_thread(
+        run_alert_generation, campaigns, user_id=user_id, ad_account_id=ad_account_id
+    )
     return {"success": True, "new_alerts": new_count}
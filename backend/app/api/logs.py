@@ -1,11 +1,26 @@
-from fastapi import APIRouter, Query
+import base64
+
+from fastapi import APIRouter, HTTPException, Query
+from datetime import datetime, timedelta
 from typing import Optional
 from pydantic import BaseModel
 
-from app.middleware.activity_logger import get_db_connection
+from app.services.activity_log import (
+    LOG_COLUMNS,
+    get_db_connection,
+    iso_to_ms,
+    latency_percentiles,
+    latency_source,
+    list_partitions,
+    log_row_to_dict,
+    rollup_source,
+)
 
 router = APIRouter()
 
+TOTAL_COUNT_CAP = 10000
+ESTIMATE_SAMPLE_SIZE = 20000
+
 
 class ActivityLog(BaseModel):
     id: int
@@ -19,14 +34,22 @@ class ActivityLog(BaseModel):
     error_detail: Optional[str] = None
     ip_address: Optional[str] = None
     user_agent: Optional[str] = None
+    route: Optional[str] = None
 
 
 class LogsResponse(BaseModel):
     success: bool
     logs: list[ActivityLog]
     total: int
+    total_exact: bool = True
     page: int
     limit: int
+    next_cursor: Optional[str] = None
+
+
+class LogRoutesResponse(BaseModel):
+    success: bool
+    routes: list[dict]
 
 
 class LogStatsResponse(BaseModel):
@@ -34,26 +57,53 @@ class LogStatsResponse(BaseModel):
     total_requests: int
     error_count: int
     avg_response_time_ms: float
+    latency: dict
     active_users: list[dict]
     top_endpoints: list[dict]
     status_breakdown: list[dict]
     recent_errors: list[dict]
 
 
+def encode_cursor(ts_ms: int, log_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{ts_ms}|{log_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    try:
+        ts_ms, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return int(ts_ms), int(log_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor invalido")
+
+
+def parse_date_ms(value: str) -> int:
+    try:
+        return iso_to_ms(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Data invalida: {value}")
+
+
 @router.get("", response_model=LogsResponse)
 async def get_logs(
     filter_user_id: Optional[str] = Query(None, description="Filtrar por user_id"),
     method: Optional[str] = Query(None, description="Filtrar por metodo HTTP"),
     status_min: Optional[int] = Query(None, description="Status code minimo"),
     status_max: Optional[int] = Query(None, description="Status code maximo"),
-    path_contains: Optional[str] = Query(None, description="Filtrar por path"),
+    route: Optional[str] = Query(None, description="Filtrar por rota (template, ex: /api/campaigns/{campaign_id})"),
+    path_contains: Optional[str] = Query(None, description="Filtrar por path (substring, sem indice)"),
     from_date: Optional[str] = Query(None, description="Data inicio (ISO)"),
     to_date: Optional[str] = Query(None, description="Data fim (ISO)"),
-    page: int = Query(1, ge=1),
+    cursor: Optional[str] = Query(None, description="Cursor retornado em next_cursor"),
+    page: int = Query(1, ge=1, description="Usado apenas sem cursor"),
     limit: int = Query(50, ge=1, le=200),
     errors_only: bool = Query(False, description="Apenas erros (status >= 400)"),
 ):
-    """Lista activity logs com filtros."""
+    """
+    Lista activity logs com filtros, do mais recente para o mais antigo.
+    Paginacao por cursor (ts, id): passe o next_cursor da resposta anterior.
+    Apenas as particoes diarias do periodo filtrado sao consultadas. O total
+    e exato ate TOTAL_COUNT_CAP; acima disso e aproximado.
+    """
     conn = get_db_connection()
 
     conditions = []
@@ -71,119 +121,232 @@ async def get_logs(
     if status_max:
         conditions.append("status_code <= ?")
         params.append(status_max)
+    if route:
+        conditions.append("route = ?")
+        params.append(route)
     if path_contains:
         conditions.append("path LIKE ?")
         params.append(f"%{path_contains}%")
-    if from_date:
-        conditions.append("timestamp >= ?")
-        params.append(from_date)
-    if to_date:
-        conditions.append("timestamp <= ?")
-        params.append(to_date)
+    since_ms = parse_date_ms(from_date) if from_date else None
+    until_ms = parse_date_ms(to_date) if to_date else None
+    if since_ms is not None:
+        conditions.append("ts >= ?")
+        params.append(since_ms)
+    if until_ms is not None:
+        conditions.append("ts <= ?")
+        params.append(until_ms)
     if errors_only:
         conditions.append("status_code >= 400")
 
     where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    partitions = list_partitions(conn, since_ms, until_ms)
 
-    count_row = conn.execute(
-        f"SELECT COUNT(*) as cnt FROM activity_logs {where_clause}", params
-    ).fetchone()
-    total = count_row["cnt"] if count_row else 0
+    # Contagem limitada: nunca percorre mais que TOTAL_COUNT_CAP linhas
+    total = 0
+    for table in partitions:
+        total += conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {table} {where_clause} LIMIT ?)",
+            [*params, TOTAL_COUNT_CAP + 1 - total],
+        ).fetchone()[0]
+        if total > TOTAL_COUNT_CAP:
+            break
+    total_exact = total <= TOTAL_COUNT_CAP
+    if not total_exact:
+        total = _estimate_total(conn, partitions, where_clause, params)
 
-    offset = (page - 1) * limit
-    rows = conn.execute(
-        f"SELECT * FROM activity_logs {where_clause} ORDER BY timestamp DESC LIMIT ? OFFSET ?",
-        [*params, limit, offset],
-    ).fetchall()
+    page_conditions = list(conditions)
+    page_params = list(params)
+    offset = 0
+    if cursor:
+        cursor_ts, cursor_id = decode_cursor(cursor)
+        page_conditions.append("(ts, id) < (?, ?)")
+        page_params.extend([cursor_ts, cursor_id])
+        partitions = list_partitions(conn, since_ms, cursor_ts if until_ms is None else min(until_ms, cursor_ts))
+    else:
+        offset = (page - 1) * limit
+    page_where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+
+    wanted = offset + limit + 1
+    rows = []
+    for table in partitions:
+        rows += conn.execute(
+            f"""SELECT {LOG_COLUMNS} FROM {table} {page_where}
+                ORDER BY ts DESC, id DESC LIMIT ?""",
+            [*page_params, wanted - len(rows)],
+        ).fetchall()
+        if len(rows) >= wanted:
+            break
 
     conn.close()
 
-    logs = [ActivityLog(**dict(row)) for row in rows]
+    rows = rows[offset:]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    logs = [ActivityLog(**log_row_to_dict(row)) for row in rows]
+    next_cursor = encode_cursor(rows[-1]["ts"], rows[-1]["id"]) if has_more else None
 
     return LogsResponse(
         success=True,
         logs=logs,
         total=total,
+        total_exact=total_exact,
         page=page,
         limit=limit,
+        next_cursor=next_cursor,
+    )
+
+
+def _estimate_total(conn, partitions: list[str], where_clause: str, params: list) -> int:
+    """
+    Estimativa barata do total quando passa de TOTAL_COUNT_CAP: mede a
+    seletividade do filtro numa amostra das linhas mais recentes e projeta
+    sobre o tamanho das particoes (faixa de ids de cada uma).
+    """
+    size = sum(
+        conn.execute(f"SELECT COALESCE(MAX(id) - MIN(id) + 1, 0) FROM {table}").fetchone()[0]
+        for table in partitions
     )
+    if not where_clause or not partitions:
+        return max(size, TOTAL_COUNT_CAP + 1)
+    sample = conn.execute(
+        f"SELECT COUNT(*) FROM (SELECT 1 FROM {partitions[0]} ORDER BY id DESC LIMIT ?)",
+        [ESTIMATE_SAMPLE_SIZE],
+    ).fetchone()[0]
+    matched = conn.execute(
+        f"""SELECT COUNT(*) FROM (
+            SELECT * FROM {partitions[0]} ORDER BY id DESC LIMIT ?
+        ) {where_clause}""",
+        [ESTIMATE_SAMPLE_SIZE, *params],
+    ).fetchone()[0]
+    estimate = round(size * matched / sample) if sample else 0
+    return max(estimate, TOTAL_COUNT_CAP + 1)
+
+
+@router.get("/routes", response_model=LogRoutesResponse)
+async def get_log_routes(
+    hours: int = Query(168, ge=1, le=720, description="Ultimas N horas"),
+):
+    """Rotas (templates) com requests no periodo, para o filtro por rota."""
+    conn = get_db_connection()
+    source, params = rollup_source(datetime.utcnow() - timedelta(hours=hours))
+    rows = conn.execute(
+        f"""SELECT route, method, SUM(count) as count
+            FROM ({source})
+            GROUP BY route, method
+            ORDER BY count DESC""",
+        params,
+    ).fetchall()
+    conn.close()
+
+    return LogRoutesResponse(success=True, routes=[dict(row) for row in rows])
 
 
 @router.get("/stats", response_model=LogStatsResponse)
 async def get_log_stats(
     hours: int = Query(24, ge=1, le=168, description="Ultimas N horas"),
 ):
-    """Estatisticas dos activity logs."""
+    """Estatisticas dos activity logs (somadas a partir dos roll-ups)."""
     conn = get_db_connection()
 
-    time_filter = f"timestamp >= datetime('now', '-{hours} hours')"
+    since = datetime.utcnow() - timedelta(hours=hours)
+    source, params = rollup_source(since)
 
-    total = conn.execute(
-        f"SELECT COUNT(*) as cnt FROM activity_logs WHERE {time_filter}"
-    ).fetchone()["cnt"]
-
-    error_count = conn.execute(
-        f"SELECT COUNT(*) as cnt FROM activity_logs WHERE {time_filter} AND status_code >= 400"
-    ).fetchone()["cnt"]
-
-    avg_time = conn.execute(
-        f"SELECT COALESCE(AVG(response_time_ms), 0) as avg_ms FROM activity_logs WHERE {time_filter}"
-    ).fetchone()["avg_ms"]
+    totals = conn.execute(
+        f"""SELECT COALESCE(SUM(count), 0) as total,
+            COALESCE(SUM(error_count), 0) as errors,
+            COALESCE(SUM(total_ms), 0) as total_ms,
+            MAX(max_ms) as max_ms
+            FROM ({source})""",
+        params,
+    ).fetchone()
 
     active_users = conn.execute(
-        f"""SELECT user_id, COUNT(*) as request_count,
-            MAX(timestamp) as last_seen
-            FROM activity_logs
-            WHERE {time_filter} AND user_id IS NOT NULL
+        f"""SELECT user_id, SUM(count) as request_count,
+            MAX(last_seen) as last_seen
+            FROM ({source})
+            WHERE user_id != ''
             GROUP BY user_id
             ORDER BY request_count DESC""",
+        params,
     ).fetchall()
 
     top_endpoints = conn.execute(
-        f"""SELECT path, method, COUNT(*) as count,
-            ROUND(AVG(response_time_ms), 2) as avg_time_ms,
-            SUM(CASE WHEN status_code >= 400 THEN 1 ELSE 0 END) as error_count
-            FROM activity_logs
-            WHERE {time_filter}
-            GROUP BY path, method
+        f"""SELECT route as path, method, SUM(count) as count,
+            ROUND(SUM(total_ms) / SUM(count), 2) as avg_time_ms,
+            SUM(error_count) as error_count,
+            MAX(max_ms) as max_ms
+            FROM ({source})
+            GROUP BY route, method
             ORDER BY count DESC
             LIMIT 20""",
+        params,
     ).fetchall()
 
     status_breakdown = conn.execute(
-        f"""SELECT
-            CASE
-                WHEN status_code >= 500 THEN '5xx'
-                WHEN status_code >= 400 THEN '4xx'
-                WHEN status_code >= 300 THEN '3xx'
-                WHEN status_code >= 200 THEN '2xx'
-                ELSE 'other'
-            END as status_group,
-            COUNT(*) as count
-            FROM activity_logs
-            WHERE {time_filter}
-            GROUP BY status_group
+        f"""SELECT status_class as status_group, SUM(count) as count
+            FROM ({source})
+            GROUP BY status_class
             ORDER BY count DESC""",
+        params,
     ).fetchall()
 
-    recent_errors = conn.execute(
-        f"""SELECT timestamp, user_id, method, path, status_code,
-            response_time_ms, error_detail
-            FROM activity_logs
-            WHERE {time_filter} AND status_code >= 400
-            ORDER BY timestamp DESC
-            LIMIT 20""",
+    latency_source_sql, latency_params = latency_source(since)
+    latency_rows = conn.execute(
+        f"""SELECT route, method, bin, SUM(count) as count
+            FROM ({latency_source_sql})
+            GROUP BY route, method, bin""",
+        latency_params,
     ).fetchall()
 
+    # Erros recentes: percorre as particoes do periodo, da mais nova para a mais antiga
+    since_ms = iso_to_ms(since.isoformat())
+    recent_errors = []
+    for table in list_partitions(conn, since_ms=since_ms):
+        recent_errors += [
+            log_row_to_dict(row) for row in conn.execute(
+                f"""SELECT ts, user_id, method, path, status_code,
+                    response_time_ms, error_detail
+                    FROM {table}
+                    WHERE ts >= ? AND status_code >= 400
+                    ORDER BY ts DESC
+                    LIMIT ?""",
+                (since_ms, 20 - len(recent_errors)),
+            )
+        ]
+        if len(recent_errors) >= 20:
+            break
+
     conn.close()
 
+    total = totals["total"]
+    avg_time = totals["total_ms"] / total if total else 0
+
+    # Merge histograms per endpoint and overall
+    overall_histogram: dict[int, int] = {}
+    endpoint_histograms: dict[tuple, dict[int, int]] = {}
+    for row in latency_rows:
+        histogram = endpoint_histograms.setdefault((row["route"], row["method"]), {})
+        histogram[row["bin"]] = histogram.get(row["bin"], 0) + row["count"]
+        overall_histogram[row["bin"]] = overall_histogram.get(row["bin"], 0) + row["count"]
+
+    endpoints = []
+    for row in top_endpoints:
+        endpoint = dict(row)
+        latency = latency_percentiles(
+            endpoint_histograms.get((endpoint["path"], endpoint["method"]), {}),
+            endpoint.pop("max_ms"),
+        )
+        endpoint.update({f"{name}_ms": value for name, value in latency.items()})
+        endpoints.append(endpoint)
+
     return LogStatsResponse(
         success=True,
         total_requests=total,
-        error_count=error_count,
+        error_count=totals["errors"],
         avg_response_time_ms=round(avg_time, 2),
+        latency=latency_percentiles(overall_histogram, totals["max_ms"]),
         active_users=[dict(row) for row in active_users],
-        top_endpoints=[dict(row) for row in top_endpoints],
+        top_endpoints=endpoints,
         status_breakdown=[dict(row) for row in status_breakdown],
-        recent_errors=[dict(row) for row in recent_errors],
+        recent_errors=recent_errors,
     )
@@ -1,10 +1,9 @@
-import logging
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Optional
 
 from app.tools.meta_api import MetaAPI, MetaAPIError
-from app.services.alert_generator import run_alert_generation
+from app.services.account_snapshot import fetch_account_snapshot, publish_snapshot
 
 router = APIRouter()
 
@@ -81,41 +80,21 @@ async def get_pages(user_id: Optional[str] = Query(None)):
 
 @router.post("", response_model=SyncResponse)
 async def sync_all(ad_account_id: Optional[str] = Query(None, description="ID da conta de anúncios"), user_id: Optional[str] = Query(None)):
-    """Sincroniza campanhas e métricas do Meta."""
+    """
+    Sincroniza campanhas e métricas do Meta.
+    Publica o snapshot da conta para os consumidores (alertas, orçamento/WhatsApp).
+    """
     try:
         meta_api = get_meta_api(ad_account_id, user_id)
-        campaigns = await meta_api.get_campaigns()
-        campaigns_count = len(campaigns)
-
-        metrics_count = 0
-        errors = []
-        campaigns_with_insights = []
-
-        for campaign in campaigns:
-            try:
-                insights = await meta_api.get_campaign_insights(campaign["id"], "last_7d")
-                campaign_with_insights = {**campaign, "insights": insights}
-                campaigns_with_insights.append(campaign_with_insights)
-                metrics_count += 1
-            except Exception as e:
-                campaigns_with_insights.append(campaign)
-                errors.append(f"Erro ao sincronizar métricas de {campaign['name']}: {str(e)}")
-
-        # Generate alerts based on campaign data
-        new_alerts = 0
-        try:
-            new_alerts = run_alert_generation(campaigns_with_insights, user_id=user_id, ad_account_id=ad_account_id)
-            if new_alerts > 0:
-                logging.info(f"Generated {new_alerts} new alerts")
-        except Exception as e:
-            logging.error(f"Error generating alerts: {e}")
+        snapshot = await fetch_account_snapshot(meta_api, user_id=user_id)
+        results = await publish_snapshot(snapshot)
 
         return SyncResponse(
             success=True,
-            campaigns_synced=campaigns_count,
-            metrics_synced=metrics_count,
-            new_alerts=new_alerts,
-            errors=errors if errors else None,
+            campaigns_synced=len(snapshot.campaigns),
+            metrics_synced=snapshot.metrics_synced,
+            new_alerts=results.get("alerts") or 0,
+            errors=snapshot.errors if snapshot.errors else None,
         )
     except MetaAPIError:
         raise
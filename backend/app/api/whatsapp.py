@@ -10,12 +10,32 @@ from pydantic import BaseModel
 
 from app.config import get_settings
 from app.models.whatsapp import WebhookEvent
+from app.services.metrics import get_metrics_registry
 from app.services.whatsapp_handler import get_whatsapp_handler
 from app.services.whatsapp_scheduler import get_whatsapp_scheduler
 
 settings = get_settings()
 router = APIRouter()
 
+_registry = get_metrics_registry()
+WEBHOOK_EVENTS = _registry.counter(
+    "whatsapp_webhook_events_total",
+    "Eventos de webhook recebidos da Evolution API",
+    ("event",),
+)
+WEBHOOK_PENDING = _registry.gauge(
+    "whatsapp_webhook_pending",
+    "Eventos de webhook aceitos e ainda em processamento (fila de background)",
+)
+
+
+async def process_webhook_event(handler, event: WebhookEvent):
+    """Processa o evento em background, mantendo a métrica de fila atualizada."""
+    try:
+        await handler.process_webhook_event(event)
+    finally:
+        WEBHOOK_PENDING.inc(-1)
+
 
 def verify_webhook_signature(
     payload: bytes,
@@ -101,7 +121,9 @@ async def webhook_handler(
 
         # Processar em background para responder rapidamente
         handler = get_whatsapp_handler()
-        background_tasks.add_task(handler.process_webhook_event, event)
+        WEBHOOK_EVENTS.inc(event=event.event or "unknown")
+        WEBHOOK_PENDING.inc()
+        background_tasks.add_task(process_webhook_event, handler, event)
 
         return {"success": True, "message": "Event received"}
 
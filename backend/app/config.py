@@ -9,6 +9,7 @@ class Settings(BaseSettings):
     meta_business_id: str = ""
     meta_page_id: str = ""
     meta_api_version: str = "v22.0"
+    meta_graph_base_url: str = "https://graph.facebook.com"  # Outro valor = servidor Graph falso (benchmarks/)
 
     # LLM Provider (OpenAI, OpenRouter, ou qualquer API compatível)
     llm_api_key: str = ""
@@ -37,10 +38,51 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 8000
     debug: bool = True
+    scheduler_enabled: bool = True  # False = não inicia os jobs agendados (ex.: benchmarks/load_test --spawn)
 
     # Rate Limiting
     rate_limit_per_minute: int = 60
 
+    # Alerts (armazenamento particionado por usuário/conta)
+    alerts_max_per_partition: int = 500  # Máximo de alertas mantidos por partição
+    alerts_retention_days: int = 90  # Alertas não vistos há mais tempo que isso são descartados
+    alerts_read_retention_days: int = 30  # Retenção (menor) para alertas já lidos
+    alerts_reopen_cooldown_hours: int = 24  # Alerta lido só reabre se ficou esse tempo sem se repetir (ou se a prioridade subir)
+    alerts_compaction_interval_hours: int = 6  # Intervalo do job de compactação
+    alerts_counters_reconcile_minutes: int = 60  # Intervalo da reconciliação dos contadores de não lidos
+
+    # Activity log (gravação assíncrona em lote)
+    activity_log_queue_size: int = 10000  # Tamanho máximo da fila de logs pendentes
+    activity_log_batch_size: int = 200  # Grava a cada N logs...
+    activity_log_flush_ms: int = 500  # ...ou a cada T ms, o que vier primeiro
+    activity_log_full_policy: str = "drop"  # Fila cheia: "drop" (descarta) ou "block" (só a requisição espera, depois descarta)
+    activity_log_block_ms: int = 50  # Espera máxima da política "block"
+    activity_rollup_minute_hours: int = 6  # Roll-ups por minuto viram roll-ups por hora após N horas
+    activity_rollup_hour_days: int = 8  # Roll-ups por hora viram roll-ups por dia após N dias
+    activity_rollup_compaction_minutes: int = 10  # Intervalo da compactação dos roll-ups
+    activity_log_retention_days: int = 30  # Logs brutos mais antigos que isso são removidos
+    activity_rollup_retention_days: int = 400  # Roll-ups/histogramas diários mais antigos que isso são removidos
+    activity_log_retention_interval_hours: int = 6  # Intervalo do job de retenção
+    activity_log_delete_batch_size: int = 5000  # Linhas por DELETE (mantém os locks de escrita curtos)
+
+    # Métricas (GET /metrics, formato Prometheus)
+    metrics_multiproc_dir: str = ""  # Diretório compartilhado entre workers (vazio = apenas o processo atual)
+    metrics_flush_seconds: int = 10  # Intervalo de gravação do snapshot de cada worker no diretório
+    event_loop_lag_interval_ms: int = 250  # Intervalo de amostragem do atraso do event loop
+    event_loop_watchdog_enabled: bool = True  # Captura a stack de quem bloqueia o event loop
+    event_loop_block_threshold_ms: int = 100  # Atraso a partir do qual o loop é considerado bloqueado
+
+    # Tracing (GET /api/admin/traces)
+    trace_buffer_size: int = 200  # Últimos N traces mantidos em memória
+    trace_max_spans: int = 1000  # Spans por trace (o excedente é descartado e contado)
+
+    # Tools dos agentes (app/skills/tools.py, app/services/tool_loop.py)
+    agent_async_tools: bool = True  # Tools async no loop da requisição; False = síncronas via loop de fundo
+    tool_loop_max_concurrency: int = 16  # Corrotinas de tools executando ao mesmo tempo no loop de fundo
+    tool_loop_max_connections: int = 20  # Conexões do cliente HTTP compartilhado pelas tools (por event loop)
+    tool_call_timeout_seconds: float = 120  # Tempo máximo de uma chamada de tool no loop de fundo (inclui a espera por vaga)
+    tool_max_concurrency_per_account: int = 4  # Tools executando ao mesmo tempo por conta de anúncios (rate limit da Meta)
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
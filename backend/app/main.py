@@ -1,3 +1,4 @@
+import asyncio
 import os
 import logging
 from contextlib import asynccontextmanager
@@ -10,7 +11,7 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.config import get_settings
 from app.tools.meta_api import MetaAPIError
@@ -25,7 +26,14 @@ from app.api.logs import router as logs_router
 from app.api.admin import router as admin_router
 from app.dependencies.admin_auth import require_admin_key
 from app.middleware.activity_logger import ActivityLoggerMiddleware
-from app.services.whatsapp_scheduler import get_whatsapp_scheduler
+from app.services.activity_log import get_activity_log_writer
+from app.services.account_snapshot import subscribe as subscribe_snapshot
+from app.services.loop_monitor import get_loop_monitor
+from app.services.tool_loop import close_loop_http_client, get_tool_loop
+from app.services.metrics import collect_metrics, get_metrics_exporter, render_prometheus
+from app.services.alert_generator import generate_alerts_from_snapshot
+from app.services.alert_store import migrate_legacy_alerts
+from app.services.whatsapp_scheduler import check_budget_alerts_from_snapshot, get_whatsapp_scheduler
 
 settings = get_settings()
 
@@ -48,16 +56,45 @@ async def lifespan(app: FastAPI):
     # Startup
     print("Starting Meta Campaign Manager API...")
 
+    # Migração única do data/alerts.json legado, antes de requisições e jobs
+    try:
+        await asyncio.to_thread(migrate_legacy_alerts)
+    except Exception as e:
+        print(f"Legacy alert migration failed (retried on next start): {e}")
+
+    # Consumidores do evento "account snapshot updated" (emitido pela sincronização)
+    subscribe_snapshot("alerts", generate_alerts_from_snapshot)
+    subscribe_snapshot("budget", check_budget_alerts_from_snapshot)
+
     # Iniciar scheduler de mensagens WhatsApp
-    scheduler = get_whatsapp_scheduler()
-    scheduler.start()
-    print("WhatsApp Scheduler started")
+    scheduler = get_whatsapp_scheduler() if settings.scheduler_enabled else None
+    if scheduler:
+        scheduler.start()
+        print("WhatsApp Scheduler started")
+
+    # Gravação em lote dos logs de atividade
+    activity_log_writer = get_activity_log_writer()
+    activity_log_writer.start()
+
+    # Métricas: atraso do event loop e snapshot compartilhado entre workers
+    loop_monitor = get_loop_monitor()
+    loop_monitor.start()
+    metrics_exporter = get_metrics_exporter()
+    if metrics_exporter:
+        metrics_exporter.start()
 
     yield
 
     # Shutdown
-    scheduler.stop()
-    print("WhatsApp Scheduler stopped")
+    if scheduler:
+        scheduler.stop()
+        print("WhatsApp Scheduler stopped")
+    activity_log_writer.stop()
+    await loop_monitor.stop()
+    get_tool_loop().stop()
+    await close_loop_http_client()
+    if metrics_exporter:
+        metrics_exporter.stop()
     print("Shutting down Meta Campaign Manager API...")
 
 
@@ -125,3 +162,12 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", dependencies=[Depends(require_admin_key)], include_in_schema=False)
+def metrics():
+    """Métricas no formato Prometheus (somadas entre workers se metrics_multiproc_dir estiver configurado)."""
+    return PlainTextResponse(
+        render_prometheus(collect_metrics()),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
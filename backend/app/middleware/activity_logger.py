@@ -1,136 +1,126 @@
 import time
-import sqlite3
 import logging
-from datetime import datetime
-from pathlib import Path
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import Response, StreamingResponse
-from io import BytesIO
+from urllib.parse import parse_qsl
 
-logger = logging.getLogger(__name__)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.activity_log import get_activity_log_writer, normalize_path, now_ms
+from app.services.metrics import get_metrics_registry
 
-DB_PATH = Path(__file__).parent.parent.parent / "data" / "activity.db"
+logger = logging.getLogger(__name__)
 
 SKIP_PATHS = frozenset({"/", "/health", "/docs", "/openapi.json", "/redoc"})
 SKIP_PREFIXES = ("/api/logs", "/api/admin")
 
-
-def get_db_connection():
-    """Creates a new SQLite connection with WAL mode for concurrent reads."""
-    conn = sqlite3.connect(str(DB_PATH), timeout=5)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def init_activity_db():
-    """Initialize the activity logs database and table."""
-    DB_PATH.parent.mkdir(exist_ok=True)
-    conn = get_db_connection()
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS activity_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT NOT NULL,
-            user_id TEXT,
-            method TEXT NOT NULL,
-            path TEXT NOT NULL,
-            query_params TEXT,
-            status_code INTEGER,
-            response_time_ms REAL,
-            error_detail TEXT,
-            ip_address TEXT,
-            user_agent TEXT
-        )
-    """)
-    conn.execute("""
-        CREATE INDEX IF NOT EXISTS idx_activity_timestamp
-        ON activity_logs(timestamp DESC)
-    """)
-    conn.execute("""
-        CREATE INDEX IF NOT EXISTS idx_activity_user_id
-        ON activity_logs(user_id)
-    """)
-    conn.execute("""
-        CREATE INDEX IF NOT EXISTS idx_activity_status_code
-        ON activity_logs(status_code)
-    """)
-    conn.commit()
-    conn.close()
-
-
-class ActivityLoggerMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
-        init_activity_db()
-
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
-
-        if path in SKIP_PATHS or not path.startswith("/api/") or path.startswith(SKIP_PREFIXES):
-            return await call_next(request)
+# Not counted in the HTTP metrics either (scrapes would dominate them)
+METRICS_SKIP_PATHS = frozenset({"/metrics"})
+UNMATCHED_ROUTE = "<unmatched>"
+
+_registry = get_metrics_registry()
+HTTP_REQUESTS = _registry.counter(
+    "http_requests_total",
+    "HTTP requests by route template and status",
+    ("method", "route", "status"),
+)
+HTTP_DURATION = _registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request duration by route template",
+    ("method", "route"),
+)
+
+ERROR_DETAIL_MAX_BYTES = 500
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Matched FastAPI route template (e.g. /api/campaigns/{campaign_id}), or the
+    normalised path when no route matched, so logs and metrics group by route.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template:
+        return template
+    return normalize_path(scope["path"])
+
+
+class ActivityLoggerMiddleware:
+    """
+    Pure ASGI middleware: wraps `send` to observe the status code and the
+    first bytes of error bodies while they pass through. Nothing is buffered
+    or rebuilt, so streaming responses and SSE are untouched.
+
+    Every request updates the HTTP metrics; only /api requests outside
+    SKIP_PREFIXES are written to the activity log.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path in METRICS_SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+        should_log = not (path in SKIP_PATHS or not path.startswith("/api/") or path.startswith(SKIP_PREFIXES))
 
         start_time = time.time()
-        user_id = request.query_params.get("user_id")
-        error_detail = None
         status_code = 500
+        error_body = bytearray()
+        error_detail = None
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body" and status_code >= 400 and should_log:
+                missing = ERROR_DETAIL_MAX_BYTES - len(error_body)
+                if missing > 0:
+                    error_body.extend(message.get("body", b"")[:missing])
+            await send(message)
 
         try:
-            response = await call_next(request)
-            status_code = response.status_code
-
-            # Capture error detail from non-2xx responses
-            if status_code >= 400:
-                try:
-                    body_chunks = []
-                    async for chunk in response.body_iterator:
-                        if isinstance(chunk, str):
-                            body_chunks.append(chunk.encode("utf-8"))
-                        else:
-                            body_chunks.append(chunk)
-                    body_bytes = b"".join(body_chunks)
-                    error_detail = body_bytes.decode("utf-8", errors="replace")[:500]
-
-                    # Rebuild response with the consumed body
-                    response = Response(
-                        content=body_bytes,
-                        status_code=status_code,
-                        headers=dict(response.headers),
-                        media_type=response.media_type,
-                    )
-                except Exception:
-                    pass
-
-            return response
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            error_detail = str(e)[:500]
+            error_detail = str(e)[:ERROR_DETAIL_MAX_BYTES]
             raise
         finally:
-            elapsed_ms = round((time.time() - start_time) * 1000, 2)
-            self._save_log(
-                user_id=user_id,
-                method=request.method,
-                path=path,
-                query_params=str(dict(request.query_params)),
-                status_code=status_code,
-                response_time_ms=elapsed_ms,
-                error_detail=error_detail,
-                ip_address=request.client.host if request.client else None,
-                user_agent=(request.headers.get("user-agent") or "")[:200],
-            )
+            elapsed = time.time() - start_time
+            route = route_template(scope)
+            # Unmatched paths (scanners, typos) would add one series per path
+            metric_route = route if scope.get("route") is not None else UNMATCHED_ROUTE
+            HTTP_REQUESTS.inc(method=scope["method"], route=metric_route, status=status_code)
+            HTTP_DURATION.observe(elapsed, method=scope["method"], route=metric_route)
+            if should_log:
+                if error_detail is None and error_body:
+                    error_detail = error_body.decode("utf-8", errors="replace")
+                elapsed_ms = round(elapsed * 1000, 2)
+                query_params = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+                headers = dict(scope.get("headers") or ())
+                client = scope.get("client")
+                await self._save_log(
+                    user_id=query_params.get("user_id"),
+                    method=scope["method"],
+                    path=path,
+                    route=route,
+                    query_params=str(query_params),
+                    status_code=status_code,
+                    response_time_ms=elapsed_ms,
+                    error_detail=error_detail,
+                    ip_address=client[0] if client else None,
+                    user_agent=headers.get(b"user-agent", b"").decode("latin-1")[:200],
+                )
 
     @staticmethod
-    def _save_log(**kwargs):
-        """Persist a log entry to SQLite. Failures are silently logged."""
+    async def _save_log(**kwargs):
+        """Hand the log entry to the background writer (never touches SQLite here)."""
         try:
-            conn = get_db_connection()
-            conn.execute(
-                """INSERT INTO activity_logs
-                (timestamp, user_id, method, path, query_params,
-                 status_code, response_time_ms, error_detail, ip_address, user_agent)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            await get_activity_log_writer().asubmit(
                 (
-                    datetime.utcnow().isoformat(),
+                    now_ms(),
                     kwargs["user_id"],
                     kwargs["method"],
                     kwargs["path"],
@@ -141,8 +131,7 @@ class ActivityLoggerMiddleware(BaseHTTPMiddleware):
                     kwargs["ip_address"],
                     kwargs["user_agent"],
                 ),
+                route=kwargs["route"],
             )
-            conn.commit()
-            conn.close()
         except Exception as e:
-            logger.warning(f"Failed to save activity log: {e}")
+            logger.warning(f"Failed to queue activity log: {e}")
@@ -29,7 +29,9 @@ class Alert(BaseModel):
     campaign_name: Optional[str] = None
     ad_account_id: Optional[str] = None
     read: bool = False
+    occurrences: int = 1
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_seen_at: Optional[datetime] = None
 
     class Config:
         json_encoders = {
@@ -47,7 +49,9 @@ class AlertResponse(BaseModel):
     campaign_name: Optional[str] = None
     ad_account_id: Optional[str] = None
     read: bool
+    occurrences: int = 1
     created_at: str
+    last_seen_at: Optional[str] = None
 
 
 class AlertListResponse(BaseModel):
@@ -67,3 +71,4 @@ class CreateAlertRequest(BaseModel):
     message: str
     campaign_id: Optional[str] = None
     campaign_name: Optional[str] = None
+    ad_account_id: Optional[str] = None
@@ -0,0 +1,129 @@
+"""
+Snapshot de conta e evento "account snapshot updated".
+
+A sincronização (POST /api/sync) busca os dados da conta na Meta UMA vez e
+publica um AccountSnapshot; ela é a única fonte do evento. Os consumidores
+(geração de alertas, alertas de orçamento via WhatsApp, ...) se inscrevem no
+evento e avaliam o mesmo snapshot, em vez de cada um consultar a Graph API
+no seu próprio timer.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Optional
+
+from app.services.metrics import record_cache
+from app.tools.meta_api import MetaAPI
+
+logger = logging.getLogger(__name__)
+
+SnapshotHandler = Callable[["AccountSnapshot"], Awaitable[Any]]
+
+
+@dataclass
+class AccountSnapshot:
+    """Dados de uma conta de anúncios obtidos em uma única sincronização."""
+    user_id: Optional[str]
+    ad_account_id: Optional[str]
+    campaigns: list[dict]  # Campanhas com "insights" (last_7d) quando disponíveis
+    month_insights: Optional[dict] = None  # Insights da conta em this_month
+    metrics_synced: int = 0
+    errors: list[str] = field(default_factory=list)
+    fetched_at: datetime = field(default_factory=datetime.now)
+    previous: Optional["AccountSnapshot"] = None  # Snapshot anterior da mesma conta
+
+    @property
+    def previous_campaigns(self) -> Optional[list[dict]]:
+        return self.previous.campaigns if self.previous else None
+
+
+# Consumidores inscritos no evento (nome -> handler)
+_subscribers: dict[str, SnapshotHandler] = {}
+
+# Último snapshot por (user_id, ad_account_id)
+_latest: dict[tuple[Optional[str], Optional[str]], AccountSnapshot] = {}
+
+
+def subscribe(name: str, handler: SnapshotHandler):
+    """Inscreve um consumidor no evento de snapshot atualizado."""
+    _subscribers[name] = handler
+
+
+def unsubscribe(name: str):
+    _subscribers.pop(name, None)
+
+
+def get_latest_snapshot(user_id: Optional[str], ad_account_id: Optional[str]) -> Optional[AccountSnapshot]:
+    """Retorna o último snapshot publicado para a conta, se houver."""
+    return _latest.get((user_id, ad_account_id))
+
+
+def is_snapshot_fresh(user_id: Optional[str], ad_account_id: Optional[str], max_age_seconds: float) -> bool:
+    """Indica se existe snapshot publicado há menos de `max_age_seconds`."""
+    snapshot = get_latest_snapshot(user_id, ad_account_id)
+    fresh = snapshot is not None and (datetime.now() - snapshot.fetched_at).total_seconds() < max_age_seconds
+    record_cache("account_snapshot", hit=fresh)
+    return fresh
+
+
+async def fetch_account_snapshot(meta_api: MetaAPI, user_id: Optional[str] = None) -> AccountSnapshot:
+    """Busca campanhas, métricas e gasto do mês da conta configurada no `meta_api`."""
+    campaigns = await meta_api.get_campaigns()
+
+    errors = []
+    metrics_synced = 0
+    campaigns_with_insights = []
+
+    for campaign in campaigns:
+        try:
+            insights = await meta_api.get_campaign_insights(campaign["id"], "last_7d")
+            campaigns_with_insights.append({**campaign, "insights": insights})
+            metrics_synced += 1
+        except Exception as e:
+            campaigns_with_insights.append(campaign)
+            errors.append(f"Erro ao sincronizar métricas de {campaign['name']}: {str(e)}")
+
+    month_insights = None
+    try:
+        month_insights = await meta_api.get_account_insights(date_preset="this_month")
+    except Exception as e:
+        errors.append(f"Erro ao sincronizar gasto do mês: {str(e)}")
+
+    return AccountSnapshot(
+        user_id=user_id,
+        ad_account_id=meta_api.ad_account_id or None,
+        campaigns=campaigns_with_insights,
+        month_insights=month_insights,
+        metrics_synced=metrics_synced,
+        errors=errors,
+    )
+
+
+async def publish_snapshot(snapshot: AccountSnapshot) -> dict[str, Any]:
+    """
+    Publica o evento "account snapshot updated" para todos os consumidores.
+    Consumidores rodam em paralelo; falhas são logadas e não afetam os demais.
+    Retorna o resultado de cada consumidor por nome (None em caso de erro).
+    """
+    key = (snapshot.user_id, snapshot.ad_account_id)
+    snapshot.previous = _latest.get(key)
+    if snapshot.previous is not None:
+        snapshot.previous.previous = None  # Mantém apenas um nível de histórico
+    _latest[key] = snapshot
+
+    handlers = list(_subscribers.items())
+    results = await asyncio.gather(
+        *(handler(snapshot) for _, handler in handlers),
+        return_exceptions=True,
+    )
+
+    outcome = {}
+    for (name, _), result in zip(handlers, results):
+        if isinstance(result, Exception):
+            logger.error(f"Erro no consumidor de snapshot '{name}' (user={snapshot.user_id or 'global'}): {result}")
+            outcome[name] = None
+        else:
+            outcome[name] = result
+    return outcome
@@ -0,0 +1,1005 @@
+"""
+Activity log storage (SQLite).
+
+Request logs are written by a background writer thread that owns a single
+long-lived connection: the middleware only enqueues a row (microseconds),
+and the writer flushes batches with `executemany` in one transaction every
+`activity_log_batch_size` rows or `activity_log_flush_ms` milliseconds.
+
+When the queue is full the configured policy applies:
+- "drop": the entry is discarded (counted in `dropped`)
+- "block": `asubmit` (the middleware) waits up to `activity_log_block_ms`
+  for room with asyncio.sleep, so only that request waits, never the event
+  loop; then drops. The sync `submit` always drops.
+
+Once the writer has been stopped (application shutdown), new entries are
+dropped instead of starting a new writer thread.
+
+Alongside the raw rows, the writer maintains pre-aggregated roll-ups keyed by
+(bucket, route template, method, status class, user) so that stats queries
+sum a few buckets instead of scanning raw rows. Roll-ups start per minute and
+are compacted into hour and then day buckets as they age; each request is
+counted in exactly one roll-up table at any time.
+
+Latency is kept the same way as log-bucketed histograms per (bucket, route
+template, method): bins grow by 2^(1/8) (~9% relative error), so histograms
+merge by adding counts and percentiles never need the raw rows.
+
+Raw rows live in daily partition tables (activity_logs_YYYYMMDD) with the
+request time stored as integer epoch milliseconds (`ts`). Time-range queries
+only touch the partitions that overlap the range, and retention drops whole
+partitions. Each partition's ids start at days_since_epoch * 10^8, so ids
+stay unique (and time-ordered) across partitions.
+
+The database uses auto_vacuum=INCREMENTAL: `run_retention` (scheduled job and
+admin cleanup) drops expired partitions, deletes the remaining expired rows in
+small batches, then returns free pages to the filesystem with
+`PRAGMA incremental_vacuum` and truncates the WAL. A database created before
+that setting is switched by the first retention run (one full VACUUM, in the
+retention thread rather than at startup).
+
+The same writer also stores one compact row per upstream call (Meta Graph
+API, LLM) in `upstream_calls`, submitted by app.services.upstream_metrics;
+it follows the raw log retention.
+"""
+
+import asyncio
+import logging
+import math
+import queue
+import sqlite3
+import threading
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = Path(__file__).parent.parent.parent / "data" / "activity.db"
+
+_last_retention_report: Optional[dict] = None
+
+LEGACY_TABLE = "activity_logs"  # Single-table layout (ISO text timestamps), migrated on startup
+PARTITION_PREFIX = "activity_logs_"
+PARTITION_PATTERN = re.compile(r"^activity_logs_(\d{8})$")
+PARTITION_ID_STRIDE = 10 ** 8
+
+INSERT_LOG_SQL = """INSERT INTO {table}
+    (ts, user_id, method, path, query_params,
+     status_code, response_time_ms, error_detail, ip_address, user_agent, route)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+LOG_COLUMNS = (
+    "id, ts, user_id, method, path, query_params, status_code, "
+    "response_time_ms, error_detail, ip_address, user_agent, route"
+)
+
+UPSTREAM_TABLE = "upstream_calls"
+
+UPSTREAM_COLUMNS = (
+    "ts, service, method, endpoint, caller, account_id, attempts, status_code, error_code, "
+    "response_bytes, app_usage_pct, account_usage_pct, business_usage_pct, throttled, "
+    "duration_ms, retry_ms"
+)
+
+INSERT_UPSTREAM_SQL = f"""INSERT INTO {UPSTREAM_TABLE}
+    ({UPSTREAM_COLUMNS})
+    VALUES ({', '.join('?' * 16)})"""
+
+# granularity -> (table, length of the ISO timestamp prefix used as bucket)
+ROLLUP_TABLES = {
+    "minute": ("activity_rollup_minute", 16),  # 2026-01-31T12:34
+    "hour": ("activity_rollup_hour", 13),  # 2026-01-31T12
+    "day": ("activity_rollup_day", 10),  # 2026-01-31
+}
+
+ROLLUP_COLUMNS = "bucket, route, method, status_class, user_id, count, error_count, total_ms, max_ms, last_seen"
+
+ROLLUP_UPSERT_SQL = """INSERT INTO {table} ({columns})
+    {source}
+    ON CONFLICT(bucket, route, method, status_class, user_id) DO UPDATE SET
+        count = count + excluded.count,
+        error_count = error_count + excluded.error_count,
+        total_ms = total_ms + excluded.total_ms,
+        max_ms = MAX(max_ms, excluded.max_ms),
+        last_seen = MAX(last_seen, excluded.last_seen)"""
+
+
+LATENCY_TABLES = {
+    "minute": ("activity_latency_minute", 16),
+    "hour": ("activity_latency_hour", 13),
+    "day": ("activity_latency_day", 10),
+}
+
+LATENCY_COLUMNS = "bucket, route, method, bin, count"
+
+LATENCY_UPSERT_SQL = """INSERT INTO {table} ({columns})
+    {source}
+    ON CONFLICT(bucket, route, method, bin) DO UPDATE SET
+        count = count + excluded.count"""
+
+LATENCY_BINS_PER_OCTAVE = 8
+
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+
+# (tables, columns, upsert, key columns, aggregated values) of each bucketed family
+BUCKETED_FAMILIES = (
+    (
+        ROLLUP_TABLES, ROLLUP_COLUMNS, ROLLUP_UPSERT_SQL,
+        "route, method, status_class, user_id",
+        "SUM(count), SUM(error_count), SUM(total_ms), MAX(max_ms), MAX(last_seen)",
+    ),
+    (
+        LATENCY_TABLES, LATENCY_COLUMNS, LATENCY_UPSERT_SQL,
+        "route, method, bin",
+        "SUM(count)",
+    ),
+)
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def ms_to_iso(ts_ms: int) -> str:
+    """Epoch ms -> naive UTC ISO string (the format the API exposes)."""
+    return (datetime(1970, 1, 1) + timedelta(milliseconds=ts_ms)).isoformat()
+
+
+def iso_to_ms(value: str) -> int:
+    """ISO date/datetime (naive = UTC) -> epoch ms."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((parsed - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+
+def partition_for(ts_ms: int) -> str:
+    """Name of the daily partition holding `ts_ms`."""
+    day = date(1970, 1, 1) + timedelta(days=ts_ms // 86_400_000)
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def _partition_day(table: str) -> date:
+    return datetime.strptime(PARTITION_PATTERN.match(table).group(1), "%Y%m%d").date()
+
+
+def _partition_bounds(table: str) -> tuple[int, int]:
+    """[start, end) of a partition in epoch ms."""
+    start = (_partition_day(table) - date(1970, 1, 1)).days * 86_400_000
+    return start, start + 86_400_000
+
+
+def ensure_partition(conn: sqlite3.Connection, table: str):
+    """Creates a daily partition (idempotent) and seeds its id sequence."""
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts INTEGER NOT NULL,
+            user_id TEXT,
+            method TEXT NOT NULL,
+            path TEXT NOT NULL,
+            query_params TEXT,
+            status_code INTEGER,
+            response_time_ms REAL,
+            error_detail TEXT,
+            ip_address TEXT,
+            user_agent TEXT,
+            route TEXT
+        )
+    """)
+    # Ascending so that "ORDER BY ts DESC, id DESC" is a backward index scan;
+    # the filtered indexes end in (ts, id) so a filter plus that order needs no sort
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_ts ON {table}(ts)")
+    for name, column in (("user", "user_id"), ("route", "route"), ("status", "status_code")):
+        conn.execute(f"DROP INDEX IF EXISTS idx_{table}_{name}_ts")  # Superseded (no id column)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{name}_ts_id ON {table}({column}, ts, id)")
+
+    base_id = (_partition_day(table) - date(1970, 1, 1)).days * PARTITION_ID_STRIDE
+    conn.execute(
+        """INSERT INTO sqlite_sequence (name, seq)
+            SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)""",
+        (table, base_id, table),
+    )
+
+
+def list_partitions(
+    conn: sqlite3.Connection,
+    since_ms: Optional[int] = None,
+    until_ms: Optional[int] = None,
+) -> list[str]:
+    """Partitions overlapping [since_ms, until_ms], newest first."""
+    tables = []
+    for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+        (f"{PARTITION_PREFIX}%",),
+    ):
+        name = row[0]
+        if not PARTITION_PATTERN.match(name):
+            continue
+        start, end = _partition_bounds(name)
+        if since_ms is not None and end <= since_ms:
+            continue
+        if until_ms is not None and start > until_ms:
+            continue
+        tables.append(name)
+    return sorted(tables, reverse=True)
+
+
+def partition_union(
+    conn: sqlite3.Connection,
+    since_ms: Optional[int] = None,
+    until_ms: Optional[int] = None,
+    columns: str = LOG_COLUMNS,
+) -> Optional[str]:
+    """
+    Subquery over the partitions overlapping the range (UNION ALL), or None
+    when there are none. Callers still filter on `ts`.
+    """
+    tables = list_partitions(conn, since_ms, until_ms)
+    if not tables:
+        return None
+    return " UNION ALL ".join(f"SELECT {columns} FROM {table}" for table in tables)
+
+
+def drop_partitions_before(conn: sqlite3.Connection, cutoff_ms: int, batch_size: int = 5000) -> dict:
+    """
+    Drops every partition that ends before `cutoff_ms`, and deletes the older
+    rows of the partition that straddles it in batches of `batch_size` (one
+    short transaction each). Returns counts.
+    """
+    dropped_tables = 0
+    deleted_rows = 0
+    for table in list_partitions(conn, until_ms=cutoff_ms):
+        start, end = _partition_bounds(table)
+        if end <= cutoff_ms:
+            with conn:
+                deleted_rows += conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                conn.execute(f"DROP TABLE {table}")
+                conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+            dropped_tables += 1
+        else:
+            deleted_rows += _delete_in_batches(
+                conn,
+                f"DELETE FROM {table} WHERE id IN (SELECT id FROM {table} WHERE ts < ? ORDER BY ts LIMIT ?)",
+                (cutoff_ms,),
+                batch_size,
+            )
+    return {"dropped_partitions": dropped_tables, "deleted_rows": deleted_rows}
+
+
+def _delete_in_batches(conn: sqlite3.Connection, sql: str, params: tuple, batch_size: int) -> int:
+    """Runs a `... LIMIT ?` DELETE until it removes less than a batch."""
+    deleted = 0
+    while True:
+        with conn:
+            count = conn.execute(sql, (*params, batch_size)).rowcount
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+def _db_size_bytes() -> int:
+    """Size of the database file plus its WAL."""
+    total = 0
+    for path in (DB_PATH, DB_PATH.with_name(DB_PATH.name + "-wal")):
+        try:
+            total += path.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+def _enable_incremental_vacuum(conn: sqlite3.Connection) -> bool:
+    """
+    Switches a database created without incremental auto-vacuum, which takes
+    one full VACUUM (it rewrites the file and holds the write lock meanwhile).
+    Returns True if the VACUUM ran.
+    """
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    logger.info(f"Switching {DB_PATH.name} to auto_vacuum=INCREMENTAL (one-time full VACUUM)")
+    started = time.monotonic()
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    logger.info(f"Full VACUUM of {DB_PATH.name} finished in {time.monotonic() - started:.1f}s")
+    return True
+
+
+def run_retention(
+    retention_days: int,
+    rollup_retention_days: Optional[int] = None,
+    batch_size: int = 5000,
+) -> dict:
+    """
+    Removes raw logs older than `retention_days` (and day roll-ups/histograms
+    older than `rollup_retention_days`), then reclaims the freed space.
+    Returns a report with row counts and reclaimed bytes.
+    """
+    global _last_retention_report
+    started = time.monotonic()
+    size_before = _db_size_bytes()
+
+    conn = get_db_connection()
+    try:
+        result = drop_partitions_before(conn, now_ms() - retention_days * 86_400_000, batch_size)
+
+        upstream_rows = _delete_in_batches(
+            conn,
+            f"DELETE FROM {UPSTREAM_TABLE} WHERE rowid IN "
+            f"(SELECT rowid FROM {UPSTREAM_TABLE} WHERE ts < ? ORDER BY ts LIMIT ?)",
+            (now_ms() - retention_days * 86_400_000,),
+            batch_size,
+        )
+
+        rollup_rows = 0
+        if rollup_retention_days:
+            cutoff_day = (datetime.utcnow() - timedelta(days=rollup_retention_days)).date().isoformat()
+            # Day buckets are small (one row per route/method/status/user per day)
+            with conn:
+                for tables in (ROLLUP_TABLES, LATENCY_TABLES):
+                    table, _ = tables["day"]
+                    rollup_rows += conn.execute(
+                        f"DELETE FROM {table} WHERE bucket < ?", (cutoff_day,)
+                    ).rowcount
+
+        freed_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        full_vacuum = _enable_incremental_vacuum(conn)
+        if not full_vacuum:
+            # executescript steps the pragma to completion (execute() frees a single page)
+            conn.executescript("PRAGMA incremental_vacuum;")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    finally:
+        conn.close()
+
+    size_after = _db_size_bytes()
+    report = {
+        "finished_at": datetime.utcnow().isoformat(),
+        "dropped_partitions": result["dropped_partitions"],
+        "deleted_rows": result["deleted_rows"],
+        "deleted_rollup_rows": rollup_rows,
+        "deleted_upstream_rows": upstream_rows,
+        "freed_pages": freed_pages,
+        "full_vacuum": full_vacuum,
+        "size_before_bytes": size_before,
+        "size_after_bytes": size_after,
+        "reclaimed_bytes": max(size_before - size_after, 0),
+        "duration_ms": round((time.monotonic() - started) * 1000, 2),
+    }
+    _last_retention_report = report
+    return report
+
+
+def get_last_retention_report() -> Optional[dict]:
+    return _last_retention_report
+
+
+def count_logs(conn: sqlite3.Connection) -> int:
+    return sum(
+        conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in list_partitions(conn)
+    )
+
+
+def log_row_to_dict(row: sqlite3.Row) -> dict:
+    """Partition row -> API dict (`ts` exposed as ISO `timestamp`)."""
+    data = dict(row)
+    data["timestamp"] = ms_to_iso(data.pop("ts"))
+    return data
+
+
+_ID_SEGMENT_PATTERNS = (
+    (re.compile(r"^act_\d+$"), "{ad_account_id}"),
+    (re.compile(r"^\d+(_\d+)*$"), "{id}"),
+    (re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"), "{uuid}"),
+    (re.compile(r"^(?=.*\d)[A-Za-z0-9_\-]{16,}$"), "{token}"),
+)
+
+
+def normalize_path(path: str) -> str:
+    """
+    Route template for a path that matched no FastAPI route (404s, mounts):
+    id-like segments become placeholders, e.g. /api/x/123/act_9 -> /api/x/{id}/{ad_account_id}.
+    """
+    segments = path.split("/")
+    for i, segment in enumerate(segments):
+        for pattern, placeholder in _ID_SEGMENT_PATTERNS:
+            if pattern.match(segment):
+                segments[i] = placeholder
+                break
+    return "/".join(segments)
+
+
+def status_class(status_code: Optional[int]) -> str:
+    """Groups a status code into 2xx/3xx/4xx/5xx/other."""
+    if status_code is None or not 200 <= status_code < 600:
+        return "other"
+    return f"{status_code // 100}xx"
+
+
+def latency_bin(elapsed_ms: Optional[float]) -> int:
+    """Histogram bin of a latency; bin `b` covers (2^((b-1)/8), 2^(b/8)] ms."""
+    if not elapsed_ms or elapsed_ms <= 1:
+        return 0
+    return math.ceil(math.log2(elapsed_ms) * LATENCY_BINS_PER_OCTAVE)
+
+
+def latency_bin_upper_ms(bin_index: int) -> float:
+    return 2 ** (bin_index / LATENCY_BINS_PER_OCTAVE)
+
+
+def latency_percentiles(histogram: dict[int, int], max_ms: Optional[float] = None) -> dict:
+    """
+    p50/p90/p95/p99 (upper bound of the bin holding each rank) and max from a
+    {bin: count} histogram. Values never exceed the observed max.
+    """
+    total = sum(histogram.values())
+    result = {f"p{p}": None for p in LATENCY_PERCENTILES}
+    result["max"] = round(max_ms, 2) if max_ms is not None else None
+    if not total:
+        return result
+
+    bins = sorted(histogram.items())
+    for p in LATENCY_PERCENTILES:
+        rank = math.ceil(total * p / 100)
+        seen = 0
+        for bin_index, count in bins:
+            seen += count
+            if seen >= rank:
+                value = latency_bin_upper_ms(bin_index)
+                if max_ms is not None:
+                    value = min(value, max_ms)
+                result[f"p{p}"] = round(value, 2)
+                break
+    return result
+
+
+def _bucket_source(tables: dict, columns: str, since: datetime) -> tuple[str, list]:
+    parts = []
+    params = []
+    since_iso = since.isoformat()
+    for table, width in tables.values():
+        parts.append(f"SELECT {columns} FROM {table} WHERE bucket >= ?")
+        params.append(since_iso[:width])
+    return " UNION ALL ".join(parts), params
+
+
+def rollup_source(since: datetime) -> tuple[str, list]:
+    """
+    Subquery (with params) returning every roll-up row whose bucket ends after
+    `since`, across the minute/hour/day tables. Coarse buckets overlapping
+    `since` are included whole.
+    """
+    return _bucket_source(ROLLUP_TABLES, ROLLUP_COLUMNS, since)
+
+
+def latency_source(since: datetime) -> tuple[str, list]:
+    """Same as `rollup_source`, for the latency histogram tables."""
+    return _bucket_source(LATENCY_TABLES, LATENCY_COLUMNS, since)
+
+
+def get_db_connection():
+    """Creates a new SQLite connection with WAL mode for concurrent reads."""
+    conn = sqlite3.connect(str(DB_PATH), timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.row_factory = sqlite3.Row
+    conn.create_function("latency_bin", 1, latency_bin, deterministic=True)
+    conn.create_function("normalize_path", 1, normalize_path, deterministic=True)
+    return conn
+
+
+def init_activity_db():
+    """
+    Create the activity logs schema (roll-up, histogram and upstream tables).
+    Cheap and idempotent; the one-off data migrations live in
+    `migrate_activity_db`, which the writer thread runs.
+    """
+    DB_PATH.parent.mkdir(exist_ok=True)
+    conn = get_db_connection()
+
+    existing = {
+        row["name"] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+
+    # Incremental auto-vacuum lets retention give space back without a full VACUUM.
+    # A new database switches right away (the VACUUM is instant); an existing one
+    # needs a full VACUUM, which run_retention does once in the background.
+    if not existing and conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    for table, _ in ROLLUP_TABLES.values():
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket TEXT NOT NULL,
+                route TEXT NOT NULL,
+                method TEXT NOT NULL,
+                status_class TEXT NOT NULL,
+                user_id TEXT NOT NULL DEFAULT '',
+                count INTEGER NOT NULL DEFAULT 0,
+                error_count INTEGER NOT NULL DEFAULT 0,
+                total_ms REAL NOT NULL DEFAULT 0,
+                max_ms REAL NOT NULL DEFAULT 0,
+                last_seen TEXT,
+                PRIMARY KEY (bucket, route, method, status_class, user_id)
+            ) WITHOUT ROWID
+        """)
+
+    for table, _ in LATENCY_TABLES.values():
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket TEXT NOT NULL,
+                route TEXT NOT NULL,
+                method TEXT NOT NULL,
+                bin INTEGER NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket, route, method, bin)
+            ) WITHOUT ROWID
+        """)
+
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {UPSTREAM_TABLE} (
+            ts INTEGER NOT NULL,
+            service TEXT NOT NULL,
+            method TEXT NOT NULL,
+            endpoint TEXT NOT NULL,
+            caller TEXT,
+            account_id TEXT,
+            attempts INTEGER NOT NULL DEFAULT 1,
+            status_code INTEGER,
+            error_code INTEGER,
+            response_bytes INTEGER,
+            app_usage_pct REAL,
+            account_usage_pct REAL,
+            business_usage_pct REAL,
+            throttled INTEGER NOT NULL DEFAULT 0,
+            duration_ms REAL NOT NULL,
+            retry_ms REAL NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{UPSTREAM_TABLE}_ts ON {UPSTREAM_TABLE}(ts)")
+
+    conn.commit()
+    conn.close()
+
+
+def migrate_activity_db(conn: sqlite3.Connection):
+    """
+    One-off data migrations: moves the legacy single table into daily partitions
+    (building its roll-ups/histograms first) and normalises stored routes.
+    Can take a while on a large database, so it runs on the writer thread
+    rather than at startup; a no-op once done.
+    """
+    existing = {
+        row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if LEGACY_TABLE not in existing and version >= 1:
+        return
+
+    if LEGACY_TABLE in existing:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({LEGACY_TABLE})")}
+        if "route" not in columns:
+            conn.execute(f"ALTER TABLE {LEGACY_TABLE} ADD COLUMN route TEXT")
+
+        # First run with roll-ups/histograms: build them from the raw rows already stored
+        if _tables_empty(conn, ROLLUP_TABLES):
+            _backfill_rollups(conn)
+        if _tables_empty(conn, LATENCY_TABLES):
+            _backfill_latency(conn)
+
+        _migrate_legacy_logs(conn)
+
+    if version < 1:
+        _normalize_stored_routes(conn)
+        conn.execute("PRAGMA user_version = 1")
+
+    conn.commit()
+
+
+def _tables_empty(conn: sqlite3.Connection, tables: dict) -> bool:
+    return not any(conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() for table, _ in tables.values())
+
+
+def _normalize_stored_routes(conn: sqlite3.Connection):
+    """
+    One-off backfill: rows logged before route templates were recorded carry
+    the raw path as route. Normalise them, and merge the roll-up/histogram
+    rows that collapse into the same template.
+    """
+    for table in list_partitions(conn):
+        conn.execute(f"UPDATE {table} SET route = normalize_path(COALESCE(route, path)) WHERE route IS NULL OR route = path")
+
+    for tables, columns, upsert_sql, keys, values in BUCKETED_FAMILIES:
+        key_columns = [k.strip() for k in keys.split(",")]
+        group_by = ", ".join(str(i) for i in range(1, len(key_columns) + 2))
+        select_keys = ", ".join("normalize_path(route)" if k == "route" else k for k in key_columns)
+        for table, _ in tables.values():
+            raw = "route NOT LIKE '%{%' AND normalize_path(route) != route"
+            conn.execute("DROP TABLE IF EXISTS temp.route_merge")
+            conn.execute(
+                f"""CREATE TEMP TABLE route_merge AS
+                    SELECT bucket, {select_keys}, {values}
+                    FROM {table} WHERE {raw} GROUP BY {group_by}"""
+            )
+            conn.execute(f"DELETE FROM {table} WHERE {raw}")
+            conn.execute(
+                upsert_sql.format(table=table, columns=columns, source="SELECT * FROM temp.route_merge WHERE 1")
+            )
+            conn.execute("DROP TABLE temp.route_merge")
+
+
+def _migrate_legacy_logs(conn: sqlite3.Connection):
+    """Moves the single-table ISO-timestamp logs into daily epoch-ms partitions."""
+    ts_expr = "CAST(ROUND((julianday(timestamp) - 2440587.5) * 86400000) AS INTEGER)"
+    days = [
+        row[0] for row in conn.execute(
+            f"SELECT DISTINCT substr(timestamp, 1, 10) FROM {LEGACY_TABLE} ORDER BY 1"
+        )
+    ]
+    for day in days:
+        table = f"{PARTITION_PREFIX}{day.replace('-', '')}"
+        ensure_partition(conn, table)
+        conn.execute(
+            f"""INSERT INTO {table}
+                (ts, user_id, method, path, query_params, status_code,
+                 response_time_ms, error_detail, ip_address, user_agent, route)
+                SELECT {ts_expr}, user_id, method, path, query_params, status_code,
+                    response_time_ms, error_detail, ip_address, user_agent, COALESCE(route, path)
+                FROM {LEGACY_TABLE} WHERE substr(timestamp, 1, 10) = ?
+                ORDER BY timestamp, id""",
+            (day,),
+        )
+    conn.execute(f"DROP TABLE {LEGACY_TABLE}")
+    logger.info(f"Migrated activity logs into {len(days)} daily partitions")
+
+
+def _backfill_rollups(conn: sqlite3.Connection):
+    """Aggregates existing activity_logs rows into minute roll-ups."""
+    table, width = ROLLUP_TABLES["minute"]
+    source = f"""SELECT substr(timestamp, 1, {width}), COALESCE(route, path), method,
+            CASE
+                WHEN status_code >= 200 AND status_code < 600 THEN (status_code / 100) || 'xx'
+                ELSE 'other'
+            END,
+            COALESCE(user_id, ''),
+            COUNT(*),
+            SUM(CASE WHEN status_code >= 400 THEN 1 ELSE 0 END),
+            COALESCE(SUM(response_time_ms), 0),
+            COALESCE(MAX(response_time_ms), 0),
+            MAX(timestamp)
+        FROM activity_logs WHERE 1
+        GROUP BY 1, 2, 3, 4, 5"""
+    conn.execute(ROLLUP_UPSERT_SQL.format(table=table, columns=ROLLUP_COLUMNS, source=source))
+
+
+def _backfill_latency(conn: sqlite3.Connection):
+    """Builds minute latency histograms from existing activity_logs rows."""
+    table, width = LATENCY_TABLES["minute"]
+    source = f"""SELECT substr(timestamp, 1, {width}), COALESCE(route, path), method, latency_bin(response_time_ms), COUNT(*)
+        FROM activity_logs WHERE 1
+        GROUP BY 1, 2, 3, 4"""
+    conn.execute(LATENCY_UPSERT_SQL.format(table=table, columns=LATENCY_COLUMNS, source=source))
+
+
+def compact_rollups(
+    conn: sqlite3.Connection,
+    minute_hours: int,
+    hour_days: int,
+    now: Optional[datetime] = None,
+) -> dict:
+    """
+    Moves minute buckets older than `minute_hours` into hour buckets, and hour
+    buckets older than `hour_days` into day buckets, for both the roll-ups and
+    the latency histograms. Returns rows moved per source table.
+    """
+    now = now or datetime.utcnow()
+    steps = [
+        ("minute", "hour", now - timedelta(hours=minute_hours)),
+        ("hour", "day", now - timedelta(days=hour_days)),
+    ]
+    moved = {}
+    with conn:
+        for tables, columns, upsert_sql, keys, values in BUCKETED_FAMILIES:
+            group_by = ", ".join(str(i) for i in range(1, keys.count(",") + 3))
+            for source_name, target_name, cutoff in steps:
+                source_table, _ = tables[source_name]
+                target_table, width = tables[target_name]
+                # Cut at a target bucket boundary so no target bucket is split
+                boundary = cutoff.isoformat()[:width]
+                source = f"""SELECT substr(bucket, 1, {width}), {keys}, {values}
+                    FROM {source_table} WHERE bucket < ?
+                    GROUP BY {group_by}"""
+                conn.execute(
+                    upsert_sql.format(table=target_table, columns=columns, source=source),
+                    (boundary,),
+                )
+                moved[source_table] = conn.execute(
+                    f"DELETE FROM {source_table} WHERE bucket < ?", (boundary,)
+                ).rowcount
+    return moved
+
+
+class ActivityLogWriter:
+    """Bounded queue + dedicated thread that batches inserts into activity_logs."""
+
+    _STOP = object()
+    _UPSTREAM = object()  # Tags queue items holding an upstream call row
+
+    def __init__(
+        self,
+        max_queue: int = 10000,
+        batch_size: int = 200,
+        flush_interval_ms: int = 500,
+        policy: str = "drop",
+        block_ms: int = 50,
+        rollup_minute_hours: int = 6,
+        rollup_hour_days: int = 8,
+        compaction_interval_minutes: int = 10,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.policy = policy
+        self.block_timeout = block_ms / 1000
+        self.rollup_minute_hours = rollup_minute_hours
+        self.rollup_hour_days = rollup_hour_days
+        self.compaction_interval = compaction_interval_minutes * 60
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stopped = False  # Set by stop(): late entries are dropped
+        self._partitions: set[str] = set()  # Partitions known to exist
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the writer thread (idempotent)."""
+        with self._start_lock:
+            self._stopped = False
+            if self.running:
+                return
+            init_activity_db()
+            self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Flush pending entries and stop the writer thread. Later entries are dropped."""
+        self._stopped = True
+        if not self.running:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _ensure_running(self) -> bool:
+        """Start the writer on first use; False once it has been stopped."""
+        if self._stopped:
+            return False
+        if not self.running:
+            self.start()
+        return True
+
+    def _put(self, item) -> bool:
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+    def submit(self, row: tuple, route: Optional[str] = None) -> bool:
+        """
+        Enqueue a row (INSERT_LOG_SQL order without route, `ts` in epoch ms).
+        `route` is the route template (defaults to the normalised path).
+        Never blocks. Returns False if dropped.
+        """
+        if self._ensure_running() and self._put((row, route or normalize_path(row[3]))):
+            return True
+        self.dropped += 1
+        return False
+
+    async def asubmit(self, row: tuple, route: Optional[str] = None) -> bool:
+        """
+        `submit` for the event loop. With the "block" policy a full queue is
+        retried with asyncio.sleep for up to `block_ms`, so only the caller
+        waits. Returns False if dropped.
+        """
+        if not self._ensure_running():
+            self.dropped += 1
+            return False
+        item = (row, route or normalize_path(row[3]))
+        if self._put(item):
+            return True
+        if self.policy == "block":
+            deadline = time.monotonic() + self.block_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(min(0.005, self.block_timeout))
+                if self._put(item):
+                    return True
+        self.dropped += 1
+        return False
+
+    def submit_upstream(self, row: tuple) -> bool:
+        """
+        Enqueue an upstream call row (INSERT_UPSTREAM_SQL order). Never blocks:
+        telemetry is dropped rather than slowing the caller down.
+        """
+        if self._ensure_running() and self._put((self._UPSTREAM, row)):
+            return True
+        self.dropped += 1
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed_batches": self.failed_batches,
+        }
+
+    def _run(self):
+        try:
+            migration_conn = get_db_connection()
+            try:
+                migrate_activity_db(migration_conn)
+            finally:
+                migration_conn.close()
+        except Exception:
+            logger.exception("Activity log migration failed (retried on next start)")
+
+        conn = sqlite3.connect(str(DB_PATH), timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        stopping = False
+        next_compaction = time.monotonic()
+
+        try:
+            while not stopping:
+                if time.monotonic() >= next_compaction:
+                    self._compact(conn)
+                    next_compaction = time.monotonic() + self.compaction_interval
+
+                batch = []
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    if item is self._STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+
+                if stopping:
+                    # Drain whatever is left before exiting
+                    while True:
+                        try:
+                            item = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is not self._STOP:
+                            batch.append(item)
+
+                self._flush(conn, batch)
+        finally:
+            conn.close()
+
+    def _flush(self, conn: sqlite3.Connection, batch: list[tuple]):
+        if not batch:
+            return
+        logs = []
+        upstream = []
+        by_partition: dict[str, list[tuple]] = {}
+        for first, second in batch:
+            if first is self._UPSTREAM:
+                upstream.append(second)
+                continue
+            logs.append((first, second))
+            by_partition.setdefault(partition_for(first[0]), []).append((*first, second))
+        for attempt in range(2):
+            try:
+                with conn:
+                    for table, rows in by_partition.items():
+                        if table not in self._partitions:
+                            ensure_partition(conn, table)
+                            self._partitions.add(table)
+                        conn.executemany(INSERT_LOG_SQL.format(table=table), rows)
+                    if logs:
+                        self._update_rollups(conn, logs)
+                    if upstream:
+                        conn.executemany(INSERT_UPSTREAM_SQL, upstream)
+                self.written += len(batch)
+                return
+            except Exception as e:
+                # A cached partition may have been dropped by retention: forget
+                # the cache and retry once, recreating the partitions
+                self._partitions.clear()
+                error = e
+        self.failed_batches += 1
+        logger.warning(f"Failed to save {len(logs)} activity logs and {len(upstream)} upstream calls: {error}")
+
+    @staticmethod
+    def _update_rollups(conn: sqlite3.Connection, batch: list[tuple]):
+        """Aggregates the batch in memory and upserts it into the minute roll-ups and histograms."""
+        table, width = ROLLUP_TABLES["minute"]
+        buckets: dict[tuple, list] = {}
+        histograms: dict[tuple, int] = {}
+        for row, route in batch:
+            timestamp, user_id, method = ms_to_iso(row[0]), row[1], row[2]
+            status_code, elapsed_ms = row[5], row[6] or 0
+            bucket = timestamp[:width]
+            hist_key = (bucket, route, method, latency_bin(elapsed_ms))
+            histograms[hist_key] = histograms.get(hist_key, 0) + 1
+            key = (bucket, route, method, status_class(status_code), user_id or "")
+            agg = buckets.get(key)
+            if agg is None:
+                agg = buckets[key] = [0, 0, 0.0, 0.0, timestamp]
+            agg[0] += 1
+            if status_code is not None and status_code >= 400:
+                agg[1] += 1
+            agg[2] += elapsed_ms
+            agg[3] = max(agg[3], elapsed_ms)
+            agg[4] = max(agg[4], timestamp)
+
+        source = f"VALUES ({', '.join('?' * 10)})"
+        conn.executemany(
+            ROLLUP_UPSERT_SQL.format(table=table, columns=ROLLUP_COLUMNS, source=source),
+            [(*key, *agg) for key, agg in buckets.items()],
+        )
+        conn.executemany(
+            LATENCY_UPSERT_SQL.format(
+                table=LATENCY_TABLES["minute"][0],
+                columns=LATENCY_COLUMNS,
+                source="VALUES (?, ?, ?, ?, ?)",
+            ),
+            [(*key, count) for key, count in histograms.items()],
+        )
+
+    def _compact(self, conn: sqlite3.Connection):
+        try:
+            moved = compact_rollups(conn, self.rollup_minute_hours, self.rollup_hour_days)
+            if any(moved.values()):
+                logger.info(f"Compacted activity roll-ups: {moved}")
+        except Exception as e:
+            logger.warning(f"Failed to compact activity roll-ups: {e}")
+
+
+# Singleton
+_writer: Optional[ActivityLogWriter] = None
+
+
+def get_activity_log_writer() -> ActivityLogWriter:
+    """Returns the activity log writer singleton."""
+    global _writer
+    if _writer is None:
+        settings = get_settings()
+        _writer = ActivityLogWriter(
+            max_queue=settings.activity_log_queue_size,
+            batch_size=settings.activity_log_batch_size,
+            flush_interval_ms=settings.activity_log_flush_ms,
+            policy=settings.activity_log_full_policy,
+            block_ms=settings.activity_log_block_ms,
+            rollup_minute_hours=settings.activity_rollup_minute_hours,
+            rollup_hour_days=settings.activity_rollup_hour_days,
+            compaction_interval_minutes=settings.activity_rollup_compaction_minutes,
+        )
+    return _writer
@@ -0,0 +1,132 @@
+"""
+Alert Event Bus
+
+In-process pub/sub used to push alert changes to connected clients
+(see the SSE endpoint GET /api/alerts/stream).
+
+- One channel per user; each connection gets its own bounded queue.
+- Publishing never blocks: when a subscriber falls behind and its queue
+  fills up, its pending events are discarded and replaced by a single
+  "resync" event, telling the client to refetch its state.
+- Publishing is safe from any thread; events are delivered on the loop
+  that owns the subscription.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class AlertSubscription:
+    """A single connected client listening to one user's channel."""
+
+    def __init__(self, channel: str, loop: asyncio.AbstractEventLoop, max_size: int):
+        self.channel = channel
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.dropped = 0
+
+    def _deliver(self, event: dict):
+        """Enqueue an event. Must run on the subscription's loop."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: drop the backlog and ask the client to resync
+            self.dropped += self.queue.qsize()
+            logger.warning(f"Alert subscriber on '{self.channel}' is lagging, dropping {self.queue.qsize()} events")
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"event": "resync", "data": {}})
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Wait for the next event. Returns None on timeout."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class AlertBus:
+    """Per-user channels of alert events."""
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self._queue_size = queue_size
+        self._channels: dict[str, set[AlertSubscription]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _channel(user_id: Optional[str]) -> str:
+        return user_id or "_global"
+
+    def subscribe(self, user_id: Optional[str] = None) -> AlertSubscription:
+        """Register a new subscriber on the running loop."""
+        subscription = AlertSubscription(
+            self._channel(user_id),
+            asyncio.get_running_loop(),
+            self._queue_size,
+        )
+        with self._lock:
+            self._channels.setdefault(subscription.channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: AlertSubscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._channels[subscription.channel]
+
+    def has_subscribers(self, user_id: Optional[str] = None) -> bool:
+        return bool(self._channels.get(self._channel(user_id)))
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._channels.values())
+
+    def publish(self, user_id: Optional[str], event: str, data: dict):
+        """Publish an event to every subscriber of a user. Never blocks."""
+        with self._lock:
+            subscribers = list(self._channels.get(self._channel(user_id), ()))
+
+        if not subscribers:
+            return
+
+        message = {"event": event, "data": data}
+        try:
+            current_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+
+        for subscription in subscribers:
+            if subscription.loop is current_loop:
+                subscription._deliver(message)
+            elif not subscription.loop.is_closed():
+                subscription.loop.call_soon_threadsafe(subscription._deliver, message)
+
+    def publish_alerts(self, user_id: Optional[str], alerts: list[dict]):
+        """Publish new/reopened alerts; each one increments the unread count."""
+        for alert in alerts:
+            self.publish(user_id, "alert", {"alert": alert, "unread_delta": 1})
+
+    def publish_unread_delta(self, user_id: Optional[str], delta: int, ad_account_id: Optional[str] = None):
+        if delta:
+            self.publish(user_id, "unread_delta", {"delta": delta, "ad_account_id": ad_account_id})
+
+
+# Singleton
+_alert_bus: Optional[AlertBus] = None
+
+
+def get_alert_bus() -> AlertBus:
+    """Returns the alert bus singleton."""
+    global _alert_bus
+    if _alert_bus is None:
+        _alert_bus = AlertBus()
+    return _alert_bus
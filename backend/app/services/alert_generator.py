@@ -8,42 +8,20 @@ Analyzes campaigns and generates alerts based on:
 - Optimization opportunities
 """
 
+import asyncio
 import json
-from datetime import datetime
+import logging
 from pathlib import Path
 from typing import Optional
 
 from app.models.alert import Alert, AlertType, AlertPriority
+from app.services.account_snapshot import AccountSnapshot
+from app.services.alert_bus import get_alert_bus
+from app.services.alert_store import load_partition, rollup_alerts, save_partition, user_lock
 
-DATA_DIR = Path(__file__).parent.parent.parent / "data"
-ALERTS_FILE = DATA_DIR / "alerts.json"
-
-
-def ensure_data_dir():
-    DATA_DIR.mkdir(exist_ok=True)
-
-
-def get_alerts_file(user_id: Optional[str] = None) -> Path:
-    """Retorna o path do arquivo de alertas para o usuário."""
-    if user_id:
-        return DATA_DIR / f"alerts_{user_id}.json"
-    return ALERTS_FILE
-
-
-def load_alerts(user_id: Optional[str] = None) -> list[dict]:
-    ensure_data_dir()
-    alerts_file = get_alerts_file(user_id)
-    if alerts_file.exists():
-        with open(alerts_file, "r") as f:
-            return json.load(f)
-    return []
-
+logger = logging.getLogger(__name__)
 
-def save_alerts(alerts: list[dict], user_id: Optional[str] = None):
-    ensure_data_dir()
-    alerts_file = get_alerts_file(user_id)
-    with open(alerts_file, "w") as f:
-        json.dump(alerts, f, indent=2, default=str)
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
 
 
 def load_settings(user_id: Optional[str] = None) -> dict:
@@ -60,19 +38,6 @@ def load_settings(user_id: Optional[str] = None) -> dict:
     return {}
 
 
-def alert_exists(alerts: list[dict], alert_type: str, campaign_id: Optional[str], title: str) -> bool:
-    """Check if a similar unread alert already exists"""
-    for alert in alerts:
-        if (
-            alert["type"] == alert_type
-            and alert.get("campaign_id") == campaign_id
-            and alert["title"] == title
-            and not alert.get("read", False)
-        ):
-            return True
-    return False
-
-
 def create_alert(
     alert_type: AlertType,
     priority: AlertPriority,
@@ -94,13 +59,17 @@ def create_alert(
     )
     alert_dict = alert.model_dump()
     alert_dict["created_at"] = alert.created_at.isoformat()
+    alert_dict["last_seen_at"] = alert_dict["created_at"]
     return alert_dict
 
 
-def generate_budget_alerts(campaigns: list[dict], settings: dict, ad_account_id: Optional[str] = None) -> list[dict]:
+def generate_budget_alerts(
+    campaigns: list[dict],
+    settings: dict,
+    ad_account_id: Optional[str] = None,
+) -> list[dict]:
     """Generate alerts for budget thresholds"""
     new_alerts = []
-    alerts = load_alerts()
 
     budget_settings = settings.get("budget", {})
     daily_limit = budget_settings.get("daily_limit", 1000)
@@ -119,52 +88,51 @@ def generate_budget_alerts(campaigns: list[dict], settings: dict, ad_account_id:
         # Critical: Over 100%
         if usage_percent >= 100:
             title = "Orçamento diário excedido"
-            if not alert_exists(alerts, "budget", None, title):
-                new_alerts.append(
-                    create_alert(
-                        AlertType.BUDGET,
-                        AlertPriority.CRITICAL,
-                        title,
-                        f"O orçamento diário total (R$ {total_daily_budget:.2f}) excedeu o limite de R$ {daily_limit:.2f}.",
-                        ad_account_id=ad_account_id,
-                    )
+            new_alerts.append(
+                create_alert(
+                    AlertType.BUDGET,
+                    AlertPriority.CRITICAL,
+                    title,
+                    f"O orçamento diário total (R$ {total_daily_budget:.2f}) excedeu o limite de R$ {daily_limit:.2f}.",
+                    ad_account_id=ad_account_id,
                 )
+            )
 
         # High: Over 90%
         elif usage_percent >= 90:
             title = "Orçamento diário em 90%"
-            if not alert_exists(alerts, "budget", None, title):
-                new_alerts.append(
-                    create_alert(
-                        AlertType.BUDGET,
-                        AlertPriority.HIGH,
-                        title,
-                        f"O orçamento diário está em {usage_percent:.0f}% do limite (R$ {total_daily_budget:.2f} de R$ {daily_limit:.2f}).",
-                        ad_account_id=ad_account_id,
-                    )
+            new_alerts.append(
+                create_alert(
+                    AlertType.BUDGET,
+                    AlertPriority.HIGH,
+                    title,
+                    f"O orçamento diário está em {usage_percent:.0f}% do limite (R$ {total_daily_budget:.2f} de R$ {daily_limit:.2f}).",
+                    ad_account_id=ad_account_id,
                 )
+            )
 
         # Medium: Over threshold (default 80%)
         elif usage_percent >= alert_threshold:
             title = f"Orçamento diário em {usage_percent:.0f}%"
-            if not alert_exists(alerts, "budget", None, title):
-                new_alerts.append(
-                    create_alert(
-                        AlertType.BUDGET,
-                        AlertPriority.MEDIUM,
-                        title,
-                        f"O orçamento diário atingiu {usage_percent:.0f}% do limite configurado.",
-                        ad_account_id=ad_account_id,
-                    )
+            new_alerts.append(
+                create_alert(
+                    AlertType.BUDGET,
+                    AlertPriority.MEDIUM,
+                    title,
+                    f"O orçamento diário atingiu {usage_percent:.0f}% do limite configurado.",
+                    ad_account_id=ad_account_id,
                 )
+            )
 
     return new_alerts
 
 
-def generate_performance_alerts(campaigns: list[dict], ad_account_id: Optional[str] = None) -> list[dict]:
+def generate_performance_alerts(
+    campaigns: list[dict],
+    ad_account_id: Optional[str] = None,
+) -> list[dict]:
     """Generate alerts for performance issues"""
     new_alerts = []
-    alerts = load_alerts()
 
     for campaign in campaigns:
         if campaign.get("status") != "ACTIVE":
@@ -181,61 +149,60 @@ def generate_performance_alerts(campaigns: list[dict], ad_account_id: Optional[s
         ctr = insights.get("ctr", 0)
         if ctr and float(ctr) < 1.0:
             title = f"CTR baixo: {campaign_name}"
-            if not alert_exists(alerts, "performance", campaign_id, title):
-                new_alerts.append(
-                    create_alert(
-                        AlertType.PERFORMANCE,
-                        AlertPriority.MEDIUM,
-                        title,
-                        f"A campanha está com CTR de {float(ctr):.2f}%, abaixo do recomendado (1%).",
-                        campaign_id,
-                        campaign_name,
-                        ad_account_id=ad_account_id,
-                    )
+            new_alerts.append(
+                create_alert(
+                    AlertType.PERFORMANCE,
+                    AlertPriority.MEDIUM,
+                    title,
+                    f"A campanha está com CTR de {float(ctr):.2f}%, abaixo do recomendado (1%).",
+                    campaign_id,
+                    campaign_name,
+                    ad_account_id=ad_account_id,
                 )
+            )
 
         # High CPC alert (above R$ 5.00)
         cpc = insights.get("cpc", 0)
         if cpc and float(cpc) > 5.0:
             title = f"CPC elevado: {campaign_name}"
-            if not alert_exists(alerts, "performance", campaign_id, title):
-                new_alerts.append(
-                    create_alert(
-                        AlertType.PERFORMANCE,
-                        AlertPriority.HIGH,
-                        title,
-                        f"O custo por clique está em R$ {float(cpc):.2f}, acima do ideal.",
-                        campaign_id,
-                        campaign_name,
-                        ad_account_id=ad_account_id,
-                    )
+            new_alerts.append(
+                create_alert(
+                    AlertType.PERFORMANCE,
+                    AlertPriority.HIGH,
+                    title,
+                    f"O custo por clique está em R$ {float(cpc):.2f}, acima do ideal.",
+                    campaign_id,
+                    campaign_name,
+                    ad_account_id=ad_account_id,
                 )
+            )
 
         # Low impressions alert (campaign active but no impressions)
         impressions = insights.get("impressions", 0)
         spend = insights.get("spend", 0)
         if spend and float(spend) > 0 and int(impressions) == 0:
             title = f"Sem impressões: {campaign_name}"
-            if not alert_exists(alerts, "performance", campaign_id, title):
-                new_alerts.append(
-                    create_alert(
-                        AlertType.PERFORMANCE,
-                        AlertPriority.CRITICAL,
-                        title,
-                        "A campanha está gastando mas não está gerando impressões. Verifique a segmentação.",
-                        campaign_id,
-                        campaign_name,
-                        ad_account_id=ad_account_id,
-                    )
+            new_alerts.append(
+                create_alert(
+                    AlertType.PERFORMANCE,
+                    AlertPriority.CRITICAL,
+                    title,
+                    "A campanha está gastando mas não está gerando impressões. Verifique a segmentação.",
+                    campaign_id,
+                    campaign_name,
+                    ad_account_id=ad_account_id,
                 )
+            )
 
     return new_alerts
 
 
-def generate_optimization_alerts(campaigns: list[dict], ad_account_id: Optional[str] = None) -> list[dict]:
+def generate_optimization_alerts(
+    campaigns: list[dict],
+    ad_account_id: Optional[str] = None,
+) -> list[dict]:
     """Generate alerts for optimization opportunities"""
     new_alerts = []
-    alerts = load_alerts()
 
     # Check for paused campaigns with good performance
     for campaign in campaigns:
@@ -252,45 +219,46 @@ def generate_optimization_alerts(campaigns: list[dict], ad_account_id: Optional[
         ctr = insights.get("ctr", 0)
         if ctr and float(ctr) > 2.0:
             title = f"Reativar campanha: {campaign_name}"
-            if not alert_exists(alerts, "optimization", campaign_id, title):
-                new_alerts.append(
-                    create_alert(
-                        AlertType.OPTIMIZATION,
-                        AlertPriority.LOW,
-                        title,
-                        f"Esta campanha pausada tinha CTR de {float(ctr):.2f}%. Considere reativá-la.",
-                        campaign_id,
-                        campaign_name,
-                        ad_account_id=ad_account_id,
-                    )
-                )
-
-    # Check for campaigns without A/B testing
-    active_campaigns = [c for c in campaigns if c.get("status") == "ACTIVE"]
-    if len(active_campaigns) >= 3:
-        title = "Oportunidade de A/B testing"
-        if not alert_exists(alerts, "optimization", None, title):
             new_alerts.append(
                 create_alert(
                     AlertType.OPTIMIZATION,
                     AlertPriority.LOW,
                     title,
-                    f"Você tem {len(active_campaigns)} campanhas ativas. Considere fazer testes A/B para otimizar resultados.",
+                    f"Esta campanha pausada tinha CTR de {float(ctr):.2f}%. Considere reativá-la.",
+                    campaign_id,
+                    campaign_name,
                     ad_account_id=ad_account_id,
                 )
             )
 
+    # Check for campaigns without A/B testing
+    active_campaigns = [c for c in campaigns if c.get("status") == "ACTIVE"]
+    if len(active_campaigns) >= 3:
+        title = "Oportunidade de A/B testing"
+        new_alerts.append(
+            create_alert(
+                AlertType.OPTIMIZATION,
+                AlertPriority.LOW,
+                title,
+                f"Você tem {len(active_campaigns)} campanhas ativas. Considere fazer testes A/B para otimizar resultados.",
+                ad_account_id=ad_account_id,
+            )
+        )
+
     return new_alerts
 
 
-def generate_status_alerts(campaigns: list[dict], previous_campaigns: Optional[list[dict]] = None, ad_account_id: Optional[str] = None) -> list[dict]:
+def generate_status_alerts(
+    campaigns: list[dict],
+    previous_campaigns: Optional[list[dict]] = None,
+    ad_account_id: Optional[str] = None,
+) -> list[dict]:
     """Generate alerts for status changes"""
     new_alerts = []
 
     if not previous_campaigns:
         return new_alerts
 
-    alerts = load_alerts()
     prev_status_map = {c["id"]: c.get("status") for c in previous_campaigns}
 
     for campaign in campaigns:
@@ -303,40 +271,69 @@ def generate_status_alerts(campaigns: list[dict], previous_campaigns: Optional[l
             # Campaign was active and is now paused/archived
             if previous_status == "ACTIVE" and current_status in ["PAUSED", "ARCHIVED"]:
                 title = f"Campanha pausada: {campaign_name}"
-                if not alert_exists(alerts, "status", campaign_id, title):
-                    new_alerts.append(
-                        create_alert(
-                            AlertType.STATUS,
-                            AlertPriority.MEDIUM,
-                            title,
-                            f"A campanha foi alterada de Ativa para {current_status}.",
-                            campaign_id,
-                            campaign_name,
-                            ad_account_id=ad_account_id,
-                        )
+                new_alerts.append(
+                    create_alert(
+                        AlertType.STATUS,
+                        AlertPriority.MEDIUM,
+                        title,
+                        f"A campanha foi alterada de Ativa para {current_status}.",
+                        campaign_id,
+                        campaign_name,
+                        ad_account_id=ad_account_id,
                     )
+                )
 
     return new_alerts
 
 
 def run_alert_generation(campaigns: list[dict], previous_campaigns: Optional[list[dict]] = None, user_id: Optional[str] = None, ad_account_id: Optional[str] = None) -> int:
     """
-    Run all alert generators and save new alerts.
-    Returns the number of new alerts created.
+    Run all alert generators and save new alerts into the
+    (user, ad account) partition.
+
+    Alerts that already exist (same type, campaign and title) are rolled up
+    into the existing record instead of being appended again.
+    New (or reopened) alerts are published on the alert bus.
+    Returns the number of new (or reopened) alerts.
+
+    Blocking (file I/O under the user's lock): async callers run it with
+    asyncio.to_thread.
     """
     settings = load_settings(user_id)
-    alerts = load_alerts()
 
-    new_alerts = []
+    candidates = []
 
     # Generate all types of alerts
-    new_alerts.extend(generate_budget_alerts(campaigns, settings, ad_account_id))
-    new_alerts.extend(generate_performance_alerts(campaigns, ad_account_id))
-    new_alerts.extend(generate_optimization_alerts(campaigns, ad_account_id))
-    new_alerts.extend(generate_status_alerts(campaigns, previous_campaigns, ad_account_id))
+    candidates.extend(generate_budget_alerts(campaigns, settings, ad_account_id))
+    candidates.extend(generate_performance_alerts(campaigns, ad_account_id))
+    candidates.extend(generate_optimization_alerts(campaigns, ad_account_id))
+    candidates.extend(generate_status_alerts(campaigns, previous_campaigns, ad_account_id))
+
+    if not candidates:
+        return 0
+
+    with user_lock(user_id):
+        alerts = load_partition(user_id, ad_account_id)
+        fresh_alerts = rollup_alerts(alerts, candidates)
+        save_partition(alerts, user_id, ad_account_id)
+    get_alert_bus().publish_alerts(user_id, fresh_alerts)
+
+    return len(fresh_alerts)
 
-    if new_alerts:
-        alerts.extend(new_alerts)
-        save_alerts(alerts)
 
-    return len(new_alerts)
+async def generate_alerts_from_snapshot(snapshot: AccountSnapshot) -> int:
+    """
+    Consumer of the "account snapshot updated" event.
+    Evaluates the already fetched campaigns (and the previous snapshot, for
+    status changes) without calling the Meta API again.
+    """
+    new_count = await asyncio.to_thread(
+        run_alert_generation,
+        snapshot.campaigns,
+        previous_campaigns=snapshot.previous_campaigns,
+        user_id=snapshot.user_id,
+        ad_account_id=snapshot.ad_account_id,
+    )
+    if new_count > 0:
+        logger.info(f"Generated {new_count} new alerts")
+    return new_count
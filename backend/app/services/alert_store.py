@@ -0,0 +1,458 @@
+"""
+Alert Storage
+
+Alerts are persisted in small JSON partitions, one per (user, ad account):
+
+    data/alerts/{user_id}/{ad_account_id}.json
+
+Requests only ever load the partitions of the calling user, so the cost
+of listing or updating alerts is proportional to one tenant's data.
+Every save applies the retention window and the per-partition size cap.
+
+Repeated alerts (same type, campaign and title) are rolled up into a
+single record with an occurrence counter and a last-seen timestamp.
+A background job (see whatsapp_scheduler) compacts all partitions.
+
+Unread counters are maintained per (user, ad account, type, priority) in
+
+    data/alert_counters/{user_id}.json
+
+They are rewritten together with the partition, under the user's lock,
+on every write, so badge queries never read individual alerts. A
+reconciliation job recomputes them from the partitions to fix any drift.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from app.config import get_settings
+from app.services.settings_index import get_settings_index
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+ALERTS_DIR = DATA_DIR / "alerts"
+LEGACY_ALERTS_FILE = DATA_DIR / "alerts.json"
+COUNTERS_DIR = DATA_DIR / "alert_counters"
+
+# Partition names used when user/account are not provided
+GLOBAL_USER = "_global"
+NO_ACCOUNT = "_none"
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+logger = logging.getLogger(__name__)
+
+_user_locks: dict[str, threading.RLock] = {}
+_user_locks_guard = threading.Lock()
+_migration_lock = threading.Lock()
+
+
+def _partition_name(value: Optional[str], default: str) -> str:
+    """Sanitize an identifier so it can be used as a file/dir name."""
+    if not value:
+        return default
+    return _UNSAFE_CHARS.sub("_", value)
+
+
+def get_user_dir(user_id: Optional[str] = None) -> Path:
+    """Returns the directory holding all partitions of a user."""
+    return ALERTS_DIR / _partition_name(user_id, GLOBAL_USER)
+
+
+def get_partition_file(user_id: Optional[str] = None, ad_account_id: Optional[str] = None) -> Path:
+    """Returns the partition file for a user and ad account."""
+    return get_user_dir(user_id) / f"{_partition_name(ad_account_id, NO_ACCOUNT)}.json"
+
+
+def _lock_for(user_dir_name: str) -> threading.RLock:
+    with _user_locks_guard:
+        return _user_locks.setdefault(user_dir_name, threading.RLock())
+
+
+def user_lock(user_id: Optional[str] = None) -> threading.RLock:
+    """
+    Lock guarding a user's partitions and counters. Hold it across any
+    read-modify-write of a partition.
+    """
+    return _lock_for(_partition_name(user_id, GLOBAL_USER))
+
+
+def list_partition_files(user_id: Optional[str] = None) -> list[Path]:
+    """Lists all partition files of a user."""
+    user_dir = get_user_dir(user_id)
+    if not user_dir.exists():
+        return []
+    return sorted(user_dir.glob("*.json"))
+
+
+def read_partition(path: Path) -> list[dict]:
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return []
+
+
+def alert_key(alert: dict) -> tuple:
+    """Identity used to roll up repeated alerts."""
+    return (alert["type"], alert.get("campaign_id"), alert["title"])
+
+
+def last_seen(alert: dict) -> str:
+    return str(alert.get("last_seen_at") or alert.get("created_at", ""))
+
+
+PRIORITY_RANK = {"low": 0, "medium": 1, "high": 2, "critical": 3}
+
+
+def should_reopen(existing: dict, candidate: dict) -> bool:
+    """
+    Whether a repeated alert reopens a read one: only when its priority
+    escalates or when it had not been seen for `alerts_reopen_cooldown_hours`
+    (the condition cleared and came back).
+    """
+    if PRIORITY_RANK.get(candidate["priority"], 0) > PRIORITY_RANK.get(existing["priority"], 0):
+        return True
+    cooldown = timedelta(hours=get_settings().alerts_reopen_cooldown_hours)
+    try:
+        previous = datetime.fromisoformat(last_seen(existing)).replace(tzinfo=None)
+        current = datetime.fromisoformat(str(candidate["created_at"])).replace(tzinfo=None)
+    except ValueError:
+        return False
+    return current - previous >= cooldown
+
+
+def rollup_alerts(alerts: list[dict], candidates: list[dict]) -> list[dict]:
+    """
+    Merge freshly generated alerts into `alerts` (in place).
+
+    A candidate matching an existing alert bumps its occurrence counter and
+    refreshes message/priority/last_seen_at. A read alert stays read unless
+    `should_reopen` says the repetition is a real change. Other candidates
+    are appended.
+    Returns the alerts that are new or were reopened.
+    """
+    index = {alert_key(a): a for a in alerts}
+    fresh = []
+
+    for candidate in candidates:
+        existing = index.get(alert_key(candidate))
+        if existing is None:
+            candidate.setdefault("occurrences", 1)
+            candidate.setdefault("last_seen_at", candidate["created_at"])
+            alerts.append(candidate)
+            index[alert_key(candidate)] = candidate
+            fresh.append(candidate)
+            continue
+
+        reopen = existing.get("read", False) and should_reopen(existing, candidate)
+        existing["occurrences"] = existing.get("occurrences", 1) + 1
+        existing["last_seen_at"] = candidate["created_at"]
+        existing["message"] = candidate["message"]
+        existing["priority"] = candidate["priority"]
+        if reopen:
+            existing["read"] = False
+            fresh.append(existing)
+
+    return fresh
+
+
+def apply_retention(alerts: list[dict]) -> list[dict]:
+    """
+    Drop alerts not seen within the retention window (read alerts use the
+    shorter `alerts_read_retention_days`) and keep at most
+    `alerts_max_per_partition` alerts (most recently seen first).
+    """
+    settings = get_settings()
+    now = datetime.utcnow()
+    cutoff = (now - timedelta(days=settings.alerts_retention_days)).isoformat()
+    read_cutoff = (now - timedelta(days=settings.alerts_read_retention_days)).isoformat()
+
+    kept = [
+        a for a in alerts
+        if last_seen(a) >= (read_cutoff if a.get("read", False) else cutoff)
+    ]
+    kept.sort(key=last_seen, reverse=True)
+    return kept[: settings.alerts_max_per_partition]
+
+
+def _write_json(path: Path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def write_partition(path: Path, alerts: list[dict]) -> list[dict]:
+    """
+    Apply retention and atomically write a partition, updating the user's
+    unread counters in the same critical section. Returns the kept alerts.
+    """
+    alerts = apply_retention(alerts)
+
+    user_dir_name = path.parent.name
+    with _lock_for(user_dir_name):
+        if alerts:
+            _write_json(path, alerts)
+        elif path.exists():
+            path.unlink()
+
+        counters = _read_counters(user_dir_name)
+        unread = count_unread(alerts)
+        if unread:
+            counters[path.stem] = unread
+        else:
+            counters.pop(path.stem, None)
+
+        if counters:
+            _write_json(get_counters_file(user_dir_name), counters)
+        else:
+            get_counters_file(user_dir_name).unlink(missing_ok=True)
+
+    return alerts
+
+
+def load_partition(user_id: Optional[str] = None, ad_account_id: Optional[str] = None) -> list[dict]:
+    """Load the alerts of a single (user, ad account) partition."""
+    return read_partition(get_partition_file(user_id, ad_account_id))
+
+
+def save_partition(alerts: list[dict], user_id: Optional[str] = None, ad_account_id: Optional[str] = None) -> list[dict]:
+    """Save the alerts of a single (user, ad account) partition."""
+    return write_partition(get_partition_file(user_id, ad_account_id), alerts)
+
+
+def load_alerts(user_id: Optional[str] = None, ad_account_id: Optional[str] = None) -> list[dict]:
+    """
+    Load alerts of a user. When `ad_account_id` is given only that
+    partition is read, otherwise all partitions of the user are merged.
+    """
+    if ad_account_id:
+        return load_partition(user_id, ad_account_id)
+
+    alerts = []
+    for path in list_partition_files(user_id):
+        alerts.extend(read_partition(path))
+    return alerts
+
+
+def find_alert(user_id: Optional[str], alert_id: str) -> Optional[tuple[Path, list[dict], int]]:
+    """
+    Locate an alert among the partitions of a user.
+    Returns (partition_path, partition_alerts, index) or None.
+    """
+    for path in list_partition_files(user_id):
+        alerts = read_partition(path)
+        for index, alert in enumerate(alerts):
+            if alert["id"] == alert_id:
+                return path, alerts, index
+    return None
+
+
+def delete_user_alerts(user_id: Optional[str] = None) -> int:
+    """Remove every partition of a user. Returns the number of partitions removed."""
+    removed = 0
+    with user_lock(user_id):
+        for path in list_partition_files(user_id):
+            path.unlink()
+            removed += 1
+        counters_file = get_counters_file(_partition_name(user_id, GLOBAL_USER))
+        if counters_file.exists():
+            counters_file.unlink()
+    return removed
+
+
+# ========================================
+# Unread counters
+# ========================================
+
+
+def get_counters_file(user_dir_name: str) -> Path:
+    return COUNTERS_DIR / f"{user_dir_name}.json"
+
+
+def _read_counters(user_dir_name: str) -> dict:
+    path = get_counters_file(user_dir_name)
+    if path.exists():
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return {}
+    return {}
+
+
+def count_unread(alerts: list[dict]) -> dict:
+    """Unread alerts of a partition as {type: {priority: count}}."""
+    counts: dict[str, dict[str, int]] = {}
+    for alert in alerts:
+        if alert.get("read", False):
+            continue
+        by_priority = counts.setdefault(alert["type"], {})
+        by_priority[alert["priority"]] = by_priority.get(alert["priority"], 0) + 1
+    return counts
+
+
+def get_unread_count(
+    user_id: Optional[str] = None,
+    ad_account_id: Optional[str] = None,
+    alert_type: Optional[str] = None,
+    priority: Optional[str] = None,
+) -> int:
+    """Unread alerts of a user from the maintained counters (no alert is read)."""
+    counters = _read_counters(_partition_name(user_id, GLOBAL_USER))
+    if ad_account_id:
+        counters = {
+            key: value for key, value in counters.items()
+            if key == _partition_name(ad_account_id, NO_ACCOUNT)
+        }
+
+    total = 0
+    for by_type in counters.values():
+        for type_name, by_priority in by_type.items():
+            if alert_type and type_name != alert_type:
+                continue
+            for priority_name, count in by_priority.items():
+                if priority and priority_name != priority:
+                    continue
+                total += count
+    return total
+
+
+def reconcile_unread_counters() -> dict:
+    """
+    Recompute every user's unread counters from the partitions and
+    rewrite those that drifted. Returns reconciliation stats.
+    """
+    stats = {"users": 0, "corrected": 0}
+    user_dirs = {p.name for p in ALERTS_DIR.iterdir() if p.is_dir()} if ALERTS_DIR.exists() else set()
+    counter_users = {p.stem for p in COUNTERS_DIR.glob("*.json")} if COUNTERS_DIR.exists() else set()
+
+    for user_dir_name in sorted(user_dirs | counter_users):
+        with _lock_for(user_dir_name):
+            expected = {}
+            for path in (ALERTS_DIR / user_dir_name).glob("*.json"):
+                unread = count_unread(read_partition(path))
+                if unread:
+                    expected[path.stem] = unread
+
+            stats["users"] += 1
+            if _read_counters(user_dir_name) == expected:
+                continue
+
+            logger.warning(f"Unread counters drifted for '{user_dir_name}', rewriting")
+            stats["corrected"] += 1
+            if expected:
+                _write_json(get_counters_file(user_dir_name), expected)
+            else:
+                get_counters_file(user_dir_name).unlink(missing_ok=True)
+
+    return stats
+
+
+def compact_partition(path: Path) -> tuple[int, int]:
+    """
+    Roll up duplicated alerts and apply retention to a partition.
+    Returns (alerts_before, alerts_after).
+    """
+    with _lock_for(path.parent.name):
+        alerts = read_partition(path)
+        before = len(alerts)
+
+        # Oldest first so the surviving record keeps the original created_at
+        alerts.sort(key=lambda a: str(a.get("created_at", "")))
+        merged: dict[tuple, dict] = {}
+        for alert in alerts:
+            existing = merged.get(alert_key(alert))
+            if existing is None:
+                merged[alert_key(alert)] = alert
+                continue
+            existing["occurrences"] = existing.get("occurrences", 1) + alert.get("occurrences", 1)
+            existing["last_seen_at"] = max(last_seen(existing), last_seen(alert))
+            existing["message"] = alert["message"]
+            existing["priority"] = alert["priority"]
+            existing["read"] = existing.get("read", False) and alert.get("read", False)
+
+        kept = write_partition(path, list(merged.values()))
+    return before, len(kept)
+
+
+def compact_all_partitions() -> dict:
+    """Compact every partition of every user. Returns compaction stats."""
+    stats = {"partitions": 0, "alerts_before": 0, "alerts_after": 0}
+    if not ALERTS_DIR.exists():
+        return stats
+
+    for path in ALERTS_DIR.glob("*/*.json"):
+        before, after = compact_partition(path)
+        stats["partitions"] += 1
+        stats["alerts_before"] += before
+        stats["alerts_after"] += after
+    return stats
+
+
+def _normalize_account(ad_account_id: Optional[str]) -> str:
+    return (ad_account_id or "").removeprefix("act_")
+
+
+def _legacy_alert_owners() -> dict[str, list[Optional[str]]]:
+    """Users by configured ad account (settings index), as {account: [user_id, ...]}."""
+    owners: dict[str, list[Optional[str]]] = {}
+    for summary in get_settings_index().get_all():
+        account = _normalize_account(summary["ad_account_id"])
+        if account:
+            owners.setdefault(account, []).append(summary["user_id"])
+    return owners
+
+
+def migrate_legacy_alerts():
+    """
+    One-time migration of the legacy single-file store (data/alerts.json).
+
+    The legacy store was shared by every user. Each alert is moved to the
+    partitions of the users whose configured ad account matches its
+    ad_account_id; alerts without an account, or whose account no user has
+    configured, go to the global user's partitions.
+
+    Runs once at application startup, before requests and jobs. It takes
+    the users' locks, so it must never be called while holding one.
+    """
+    if not LEGACY_ALERTS_FILE.exists():
+        return
+
+    with _migration_lock:
+        if not LEGACY_ALERTS_FILE.exists():
+            return
+
+        try:
+            with open(LEGACY_ALERTS_FILE, "r", encoding="utf-8") as f:
+                legacy_alerts = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            legacy_alerts = []
+
+        owners = _legacy_alert_owners()
+        by_partition: dict[tuple[Optional[str], Optional[str]], list[dict]] = {}
+        for alert in legacy_alerts:
+            ad_account_id = alert.get("ad_account_id")
+            for user_id in owners.get(_normalize_account(ad_account_id), [None]):
+                by_partition.setdefault((user_id, ad_account_id), []).append(dict(alert))
+
+        discarded = 0
+        for (user_id, ad_account_id), alerts in by_partition.items():
+            with user_lock(user_id):
+                path = get_partition_file(user_id, ad_account_id)
+                merged = read_partition(path) + alerts
+                discarded += len(merged) - len(write_partition(path, merged))
+
+        if discarded:
+            logger.warning(
+                f"Legacy alert migration discarded {discarded} alerts past the retention "
+                f"window or the per-partition cap"
+            )
+        logger.info(f"Migrated {len(legacy_alerts)} legacy alerts into {len(by_partition)} partitions")
+        LEGACY_ALERTS_FILE.rename(LEGACY_ALERTS_FILE.with_suffix(".json.migrated"))
@@ -25,7 +25,7 @@ class EvolutionClient:
         3. Variáveis de ambiente (.env)
         """
         # Import local para evitar circular import
-        from app.api.settings import get_evolution_config
+        from app.services.settings_store import get_evolution_config
 
         config = get_evolution_config()
 
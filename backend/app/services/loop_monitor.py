@@ -0,0 +1,236 @@
+"""
+Event loop lag monitor and blocking-call watchdog.
+
+A task on the main event loop sleeps for `event_loop_lag_interval_ms` and
+measures how late it wakes up. The overshoot is the time the loop spent
+running other callbacks without yielding, i.e. how long any request could
+have waited just to be scheduled. Exposed as metrics:
+
+- event_loop_lag_seconds (histogram of every sample)
+- event_loop_lag_last_seconds / event_loop_lag_max_seconds (gauges)
+- event_loop_blocked_seconds_total (lag of the stalls caught by the watchdog)
+
+Watchdog: a separate thread checks the probe's heartbeat. When the probe is
+late by more than `event_loop_block_threshold_ms`, the loop is blocked right
+now, so the watchdog grabs the loop thread's stack (sys._current_frames).
+When the probe wakes up again, the stall's full duration is charged to the
+call site in that stack: the innermost frame of our own code (app/), e.g. a
+`json.load` inside `load_settings`. GET /api/admin/blocking-calls reports
+the offenders ranked by total blocked time.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from app.config import get_settings
+from app.services.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_registry = get_metrics_registry()
+LOOP_LAG = _registry.histogram(
+    "event_loop_lag_seconds",
+    "Delay between the scheduled and actual wake-up of the lag probe",
+    buckets=LAG_BUCKETS,
+)
+LOOP_LAG_LAST = _registry.gauge("event_loop_lag_last_seconds", "Last event loop lag sample")
+LOOP_LAG_MAX = _registry.gauge("event_loop_lag_max_seconds", "Highest event loop lag since start")
+LOOP_BLOCKED = _registry.counter(
+    "event_loop_blocked_seconds_total",
+    "Event loop lag of the stalls caught (with a stack) by the watchdog",
+)
+
+APP_ROOT = str(Path(__file__).resolve().parent.parent)  # .../backend/app
+STACK_DEPTH = 20  # Frames kept per sample stack
+MAX_SITES = 200  # Distinct call sites kept in the report
+
+
+def _frame_label(frame: traceback.FrameSummary) -> str:
+    filename = frame.filename
+    if filename.startswith(APP_ROOT):
+        filename = "app" + filename[len(APP_ROOT):]
+    return f"{filename}:{frame.lineno} in {frame.name}"
+
+
+def blocking_site(stack: traceback.StackSummary) -> tuple[str, str]:
+    """
+    (call site, innermost frame) of a blocked loop's stack. The call site is
+    the innermost frame of our own code, which is where the fix goes.
+    """
+    innermost = _frame_label(stack[-1]) if stack else "<unknown>"
+    for frame in reversed(stack):
+        if frame.filename.startswith(APP_ROOT) and not frame.filename.endswith("loop_monitor.py"):
+            return _frame_label(frame), innermost
+    return innermost, innermost
+
+
+class BlockingCallReport:
+    """Stalls aggregated by call site."""
+
+    def __init__(self, max_sites: int = MAX_SITES):
+        self.max_sites = max_sites
+        self.since = datetime.utcnow()
+        self.discarded = 0
+        self._sites: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stack: traceback.StackSummary, blocked_ms: float):
+        site, innermost = blocking_site(stack)
+        with self._lock:
+            entry = self._sites.get(site)
+            if entry is None:
+                if len(self._sites) >= self.max_sites:
+                    self.discarded += 1
+                    return
+                entry = self._sites[site] = {
+                    "site": site,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "innermost": {},
+                }
+            entry["count"] += 1
+            entry["total_ms"] += blocked_ms
+            entry["last_seen"] = datetime.utcnow().isoformat()
+            entry["innermost"][innermost] = entry["innermost"].get(innermost, 0) + 1
+            if blocked_ms >= entry["max_ms"]:
+                # Keep the stack of the worst stall as the example
+                entry["max_ms"] = blocked_ms
+                entry["stack"] = [_frame_label(frame) for frame in stack[-STACK_DEPTH:]]
+
+    def reset(self):
+        with self._lock:
+            self._sites.clear()
+            self.discarded = 0
+            self.since = datetime.utcnow()
+
+    def top(self, limit: int = 50) -> list[dict]:
+        """Sites ranked by total blocked time."""
+        with self._lock:
+            entries = [
+                {
+                    **entry,
+                    "total_ms": round(entry["total_ms"], 2),
+                    "max_ms": round(entry["max_ms"], 2),
+                    "avg_ms": round(entry["total_ms"] / entry["count"], 2),
+                    "innermost": dict(sorted(entry["innermost"].items(), key=lambda item: -item[1])),
+                }
+                for entry in self._sites.values()
+            ]
+        entries.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return entries[:limit]
+
+
+class EventLoopLagMonitor:
+    """Samples the lag of the event loop it is started on."""
+
+    def __init__(self, interval_ms: int = 250, block_threshold_ms: int = 100, watchdog: bool = True):
+        self.interval = interval_ms / 1000
+        self.block_threshold = block_threshold_ms / 1000
+        self.watchdog_enabled = watchdog
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.report = BlockingCallReport()
+        self._task: Optional[asyncio.Task] = None
+        self._heartbeat = 0.0  # time.monotonic() of the probe's last wake-up
+        self._loop_thread_id: Optional[int] = None
+        self._pending: Optional[tuple[float, traceback.StackSummary]] = None  # (heartbeat, stack) of a stall
+        self._lock = threading.Lock()
+        self._watchdog_stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start sampling on the running loop (idempotent)."""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="event-loop-lag-monitor")
+        if self.watchdog_enabled:
+            self._watchdog_stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+            self._watchdog.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._watchdog_stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join(1)
+            self._watchdog = None
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - started - self.interval, 0.0)
+            with self._lock:
+                pending, self._pending = self._pending, None
+                self._heartbeat = time.monotonic()
+            self.record(lag)
+            if pending is not None:
+                # The stall the watchdog caught just ended: charge its lag to the captured site
+                self.report.add(pending[1], lag * 1000)
+                LOOP_BLOCKED.inc(lag)
+
+    def _watch(self):
+        """Watchdog thread: captures the loop thread's stack while the probe is overdue."""
+        check_every = max(min(self.block_threshold / 2, self.interval), 0.01)
+        while not self._watchdog_stop.wait(check_every):
+            with self._lock:
+                heartbeat = self._heartbeat
+                overdue = time.monotonic() - heartbeat - self.interval
+                if overdue < self.block_threshold or (self._pending and self._pending[0] == heartbeat):
+                    continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            del frame
+            with self._lock:
+                if self._heartbeat == heartbeat:
+                    self._pending = (heartbeat, stack)
+
+    def record(self, lag: float):
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        LOOP_LAG.observe(lag)
+        LOOP_LAG_LAST.set(lag)
+        LOOP_LAG_MAX.set(self.max_lag)
+
+
+# Singleton
+_monitor: Optional[EventLoopLagMonitor] = None
+
+
+def get_loop_monitor() -> EventLoopLagMonitor:
+    """Returns the event loop lag monitor singleton."""
+    global _monitor
+    if _monitor is None:
+        settings = get_settings()
+        _monitor = EventLoopLagMonitor(
+            interval_ms=settings.event_loop_lag_interval_ms,
+            block_threshold_ms=settings.event_loop_block_threshold_ms,
+            watchdog=settings.event_loop_watchdog_enabled,
+        )
+    return _monitor
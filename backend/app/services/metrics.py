@@ -0,0 +1,379 @@
+"""
+In-process metrics registry.
+
+Counters, gauges and histograms keyed by label values, updated from any
+thread (request handlers, the scheduler, the activity log writer). The
+registry only keeps current values in memory; `snapshot()` returns them
+as plain dicts for admin endpoints and exporters.
+
+    registry = get_metrics_registry()
+    calls = registry.counter("upstream_calls_total", "Upstream calls", ("service", "endpoint"))
+    calls.inc(service="meta", endpoint="{ad_account_id}/campaigns")
+
+`render_prometheus()` turns a snapshot into the Prometheus text format
+(served at GET /metrics).
+
+Multiple workers: when `metrics_multiproc_dir` is set, every process writes
+its snapshot to <dir>/<pid>.json every `metrics_flush_seconds` (and right
+before serving a scrape). A scrape merges the files of all live workers:
+counters and histograms are summed, gauges are reported per worker with a
+`pid` label. Files not refreshed for STALE_FLUSHES intervals (dead workers)
+are ignored and eventually removed.
+"""
+
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers fast cache hits up to slow Graph/LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# A worker file older than this many flush intervals belongs to a dead worker
+STALE_FLUSHES = 6
+
+
+class Metric:
+    """Base class: a named family of series, one per combination of label values."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) if labels[name] is not None else "" for name in self.labelnames)
+
+    def samples(self) -> list[tuple[dict, object]]:
+        """[(labels, value)] of every series."""
+        with self._lock:
+            items = list(self._series.items())
+        return [(dict(zip(self.labelnames, key)), self._copy(value)) for key, value in items]
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(Metric):
+    """Monotonic total."""
+
+    type = "counter"
+
+    def inc(self, value: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+
+
+class Gauge(Metric):
+    """Value that goes up and down (queue depth, lag, usage)."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def inc(self, value: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + value
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram of observations (count, sum and per-bucket counts)."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @staticmethod
+    def _copy(value):
+        counts, total, count = value
+        return {"buckets": list(counts), "sum": total, "count": count}
+
+
+class MetricsRegistry:
+    """Named metrics; `counter()`/`gauge()`/`histogram()` return the existing metric when already registered."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: tuple, **kwargs) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered with a different type or labels")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def metrics(self) -> list[Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def snapshot(self) -> dict:
+        """{name: {type, help, samples: [{labels, value}]}} of every metric (histograms add `bounds`)."""
+        result = {}
+        for metric in self.metrics():
+            entry = {
+                "type": metric.type,
+                "help": metric.documentation,
+                "samples": [{"labels": labels, "value": value} for labels, value in metric.samples()],
+            }
+            if isinstance(metric, Histogram):
+                entry["bounds"] = list(metric.buckets)
+            result[metric.name] = entry
+        return result
+
+
+def merge_snapshots(snapshots: dict[int, dict]) -> dict:
+    """
+    Merges {pid: snapshot} of several workers into one snapshot: counters and
+    histograms are summed per label set, gauges keep one series per worker.
+    """
+    merged: dict = {}
+    for pid, snapshot in sorted(snapshots.items()):
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "samples": [], "_index": {}})
+            for sample in metric["samples"]:
+                labels = sample["labels"]
+                if metric["type"] == "gauge":
+                    target["samples"].append({"labels": {**labels, "pid": str(pid)}, "value": sample["value"]})
+                    continue
+                key = tuple(sorted(labels.items()))
+                existing = target["_index"].get(key)
+                if existing is None:
+                    value = sample["value"]
+                    if metric["type"] == "histogram":
+                        value = {**value, "buckets": list(value["buckets"])}
+                    target["_index"][key] = existing = {"labels": labels, "value": value}
+                    target["samples"].append(existing)
+                elif metric["type"] == "histogram":
+                    value = existing["value"]
+                    if len(value["buckets"]) == len(sample["value"]["buckets"]):
+                        value["buckets"] = [a + b for a, b in zip(value["buckets"], sample["value"]["buckets"])]
+                        value["sum"] += sample["value"]["sum"]
+                        value["count"] += sample["value"]["count"]
+                else:
+                    existing["value"] += sample["value"]
+    for metric in merged.values():
+        metric.pop("_index")
+    return merged
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict, extra: Optional[tuple] = None) -> str:
+    items = list(labels.items())
+    if extra:
+        items.append(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_prometheus(snapshot: dict) -> str:
+    """Prometheus text exposition format (version 0.0.4) of a snapshot."""
+    lines = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for sample in metric["samples"]:
+            labels, value = sample["labels"], sample["value"]
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            bounds = [*metric["bounds"], math.inf]
+            for bound, count in zip(bounds, value["buckets"]):
+                cumulative += count
+                le = ("le", _format_value(bound))
+                lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Periodically writes this worker's snapshot to the shared directory and merges all workers' files."""
+
+    def __init__(self, registry: MetricsRegistry, directory: Path, flush_seconds: float = 10):
+        self.registry = registry
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"{os.getpid()}.json"
+
+    def start(self):
+        """Start the flush thread (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop flushing and remove this worker's file."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    def flush(self):
+        """Atomically replace this worker's snapshot file."""
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.registry.snapshot(), separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def collect(self) -> dict:
+        """Merged snapshot of all live workers (this one read from memory)."""
+        self.flush()
+        snapshots = {}
+        stale_after = self.flush_seconds * STALE_FLUSHES
+        now = time.time()
+        for path in self.directory.glob("*.json"):
+            try:
+                pid = int(path.stem)
+                age = now - path.stat().st_mtime
+                if age > stale_after:
+                    if age > stale_after * 10:
+                        path.unlink()
+                    continue
+                snapshots[pid] = json.loads(path.read_text(encoding="utf-8"))
+            except (ValueError, OSError):
+                continue
+        return merge_snapshots(snapshots)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Failed to write metrics snapshot: {e}")
+
+
+# Singleton
+_registry: Optional[MetricsRegistry] = None
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Returns the metrics registry singleton."""
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
+
+
+_exporter: Optional[MetricsExporter] = None
+
+
+def get_metrics_exporter() -> Optional[MetricsExporter]:
+    """Returns the multi-worker exporter singleton, or None when `metrics_multiproc_dir` is not set."""
+    global _exporter
+    if _exporter is None:
+        settings = get_settings()
+        if settings.metrics_multiproc_dir:
+            _exporter = MetricsExporter(
+                get_metrics_registry(),
+                Path(settings.metrics_multiproc_dir),
+                settings.metrics_flush_seconds,
+            )
+    return _exporter
+
+
+def collect_metrics() -> dict:
+    """Snapshot to expose: merged across workers when an exporter is configured, else this process only."""
+    exporter = get_metrics_exporter()
+    if exporter is not None:
+        return exporter.collect()
+    return get_metrics_registry().snapshot()
+
+
+CACHE_REQUESTS = get_metrics_registry().counter(
+    "cache_requests_total",
+    "In-process cache lookups by result",
+    ("cache", "result"),
+)
+
+
+def record_cache(cache: str, hit: bool, count: int = 1):
+    """Counts lookups of an in-process cache (cache_requests_total{cache, result})."""
+    if count:
+        CACHE_REQUESTS.inc(count, cache=cache, result="hit" if hit else "miss")
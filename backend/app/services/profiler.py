@@ -0,0 +1,217 @@
+"""
+On-demand sampling profiler.
+
+A thread samples the stacks of every thread (sys._current_frames) every
+`interval_ms` for a fixed number of seconds and counts identical stacks.
+The result is in the "collapsed stacks" format (one `frame;frame;... count`
+line per stack) read by flamegraph.pl, speedscope and similar tools.
+
+Each stack starts with what the thread was doing: the route template of the
+request being served (found through the ActivityLoggerMiddleware frame on
+the stack, e.g. "GET /api/campaigns/{campaign_id}") or the thread name.
+With a route filter only the samples of that route are kept. Work handed to
+other threads (asyncio.to_thread, sync tools) has no request frame on its
+stack, so it is only counted without a route filter.
+
+Idle threads (waiting on a selector, lock or queue) are skipped unless
+`include_idle` is set. Started from POST /api/admin/profiler/start.
+"""
+
+import logging
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.middleware.activity_logger import ActivityLoggerMiddleware, route_template
+
+logger = logging.getLogger(__name__)
+
+MAX_SECONDS = 300
+MAX_STACK_DEPTH = 100
+
+# Innermost frames (file suffix, function) of threads that are just waiting
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("_base.py", "result"),
+    ("socket.py", "accept"),
+}
+
+_MIDDLEWARE_CODE = ActivityLoggerMiddleware.__call__.__code__
+
+
+def _frame_name(code) -> str:
+    filename = code.co_filename
+    marker = filename.rfind("/app/")
+    if marker != -1:
+        filename = filename[marker + 1:]
+    else:
+        filename = filename.rsplit("/", 1)[-1]
+    return f"{filename}:{code.co_qualname}"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return any(code.co_filename.endswith(suffix) and code.co_name == name for suffix, name in IDLE_FRAMES)
+
+
+def _request_route(frame) -> Optional[str]:
+    """Route of the request a stack is serving (method + template), if any."""
+    while frame is not None:
+        if frame.f_code is _MIDDLEWARE_CODE:
+            scope = frame.f_locals.get("scope")
+            if scope and scope.get("type") == "http":
+                return f"{scope['method']} {route_template(scope)}"
+            return None
+        frame = frame.f_back
+    return None
+
+
+class SamplingProfiler:
+    """One profiling session at a time; keeps the result of the last one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stacks: dict[str, int] = {}
+        self.session: Optional[dict] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(
+        self,
+        seconds: float,
+        interval_ms: float = 10,
+        route: Optional[str] = None,
+        include_idle: bool = False,
+    ) -> dict:
+        """Starts a session; raises RuntimeError if one is already running."""
+        with self._lock:
+            if self.running:
+                raise RuntimeError("A profiling session is already running")
+            self._stacks = {}
+            self._stop.clear()
+            self.session = {
+                "started_at": datetime.utcnow().isoformat(),
+                "finished_at": None,
+                "seconds": min(seconds, MAX_SECONDS),
+                "interval_ms": interval_ms,
+                "route": route,
+                "include_idle": include_idle,
+                "samples": 0,
+                "matched_samples": 0,
+                "overhead_ms": 0.0,
+            }
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return dict(self.session)
+
+    def stop(self):
+        """Ends the running session early (the samples taken so far are kept)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def status(self) -> Optional[dict]:
+        with self._lock:
+            if self.session is None:
+                return None
+            return {**self.session, "running": self.running, "distinct_stacks": len(self._stacks)}
+
+    def collapsed(self) -> str:
+        """Collapsed stacks of the current (partial) or last session."""
+        with self._lock:
+            stacks = sorted(self._stacks.items(), key=lambda item: -item[1])
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def top_frames(self, limit: int = 30) -> list[dict]:
+        """Frames ranked by self samples (innermost) and total samples (anywhere on the stack)."""
+        with self._lock:
+            stacks = list(self._stacks.items())
+        own: dict[str, int] = {}
+        total: dict[str, int] = {}
+        samples = 0
+        for stack, count in stacks:
+            frames = stack.split(";")[1:]  # first element is the route/thread
+            samples += count
+            if frames:
+                own[frames[-1]] = own.get(frames[-1], 0) + count
+            for frame in set(frames):
+                total[frame] = total.get(frame, 0) + count
+        ranked = sorted(total, key=lambda frame: (-own.get(frame, 0), -total[frame]))[:limit]
+        return [
+            {
+                "frame": frame,
+                "self_samples": own.get(frame, 0),
+                "total_samples": total[frame],
+                "self_pct": round(100 * own.get(frame, 0) / samples, 2) if samples else 0,
+                "total_pct": round(100 * total[frame] / samples, 2) if samples else 0,
+            }
+            for frame in ranked
+        ]
+
+    def _run(self):
+        session = self.session
+        interval = session["interval_ms"] / 1000
+        deadline = time.monotonic() + session["seconds"]
+        own_thread = threading.get_ident()
+        thread_names = {}
+
+        try:
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                sample_started = time.perf_counter()
+                frames = sys._current_frames()
+                if len(thread_names) != threading.active_count():
+                    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+                sampled = {}
+                for thread_id, frame in frames.items():
+                    if thread_id == own_thread or (not session["include_idle"] and _is_idle(frame)):
+                        continue
+                    route = _request_route(frame)
+                    if session["route"] and (route is None or route.split(" ", 1)[1] != session["route"]):
+                        continue
+                    names = []
+                    current = frame
+                    while current is not None and len(names) < MAX_STACK_DEPTH:
+                        names.append(_frame_name(current.f_code))
+                        current = current.f_back
+                    root = route or thread_names.get(thread_id, f"thread-{thread_id}")
+                    stack = ";".join([root.replace(";", ":"), *reversed(names)])
+                    sampled[stack] = sampled.get(stack, 0) + 1
+                del frames
+
+                with self._lock:
+                    for stack, count in sampled.items():
+                        self._stacks[stack] = self._stacks.get(stack, 0) + count
+                    session["samples"] += 1
+                    session["matched_samples"] += sum(sampled.values())
+                    session["overhead_ms"] += (time.perf_counter() - sample_started) * 1000
+
+                self._stop.wait(max(interval - (time.perf_counter() - sample_started), 0))
+        except Exception as e:
+            logger.warning(f"Sampling profiler stopped: {e}")
+        finally:
+            with self._lock:
+                session["finished_at"] = datetime.utcnow().isoformat()
+                session["overhead_ms"] = round(session["overhead_ms"], 2)
+
+
+# Singleton
+_profiler: Optional[SamplingProfiler] = None
+
+
+def get_profiler() -> SamplingProfiler:
+    """Returns the sampling profiler singleton."""
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler()
+    return _profiler
@@ -0,0 +1,137 @@
+"""
+User settings index.
+
+In-memory summary of every per-user settings file (data/settings_{user_id}.json)
+used by the admin health page, so that it does not glob and parse thousands
+of JSON files on every request.
+
+- Files are re-parsed only when their mtime changes.
+- `save_settings` invalidates the user's entry right away.
+- The directory is re-scanned (stat only) when its mtime changes (files
+  added/removed) or at most every RESCAN_SECONDS, which catches files
+  edited in place outside the API.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from app.services.metrics import record_cache
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+
+SETTINGS_FILE_PATTERN = re.compile(r"^settings_(.+)\.json$")
+
+RESCAN_SECONDS = 60
+
+
+def summarize_settings(user_id: str, settings: dict) -> dict:
+    """The fields the admin health page needs from a settings file."""
+    meta_api = settings.get("meta_api", {})
+    evolution = settings.get("evolution", {})
+    return {
+        "user_id": user_id,
+        "has_meta_token": bool(meta_api.get("access_token", "")),
+        "has_ad_account": bool(meta_api.get("ad_account_id", "")),
+        "ad_account_id": meta_api.get("ad_account_id", "") or None,
+        "has_evolution": bool(
+            evolution.get("enabled", False)
+            and evolution.get("api_url", "")
+            and evolution.get("api_key", "")
+        ),
+    }
+
+
+class UserSettingsIndex:
+    """Cached {user_id: summary} of the per-user settings files."""
+
+    def __init__(self, data_dir: Path = DATA_DIR, rescan_seconds: float = RESCAN_SECONDS):
+        self.data_dir = data_dir
+        self.rescan_seconds = rescan_seconds
+        self._entries: dict[str, tuple[int, dict]] = {}  # user_id -> (mtime_ns, summary)
+        self._dir_mtime_ns: Optional[int] = None
+        self._scanned_at = 0.0
+        self._dirty: set[str] = set()
+        self._loads = 0  # Files parsed by the current refresh (cache misses)
+        self._lock = threading.Lock()
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Marks a user's entry (or the whole index) as stale."""
+        with self._lock:
+            if user_id is None:
+                self._dir_mtime_ns = None
+            else:
+                self._dirty.add(user_id)
+
+    def get_all(self) -> list[dict]:
+        """Summaries of all users with a settings file."""
+        with self._lock:
+            self._loads = 0
+            self._refresh()
+            record_cache("settings_index", hit=False, count=self._loads)
+            record_cache("settings_index", hit=True, count=max(len(self._entries) - self._loads, 0))
+            return [summary for _, summary in self._entries.values()]
+
+    def _refresh(self):
+        try:
+            dir_mtime_ns = self.data_dir.stat().st_mtime_ns
+        except OSError:
+            self._entries.clear()
+            return
+
+        expired = time.monotonic() - self._scanned_at >= self.rescan_seconds
+        if dir_mtime_ns != self._dir_mtime_ns or expired:
+            self._scan(dir_mtime_ns)
+        elif self._dirty:
+            for user_id in self._dirty:
+                self._load(user_id, self.data_dir / f"settings_{user_id}.json")
+        self._dirty.clear()
+
+    def _scan(self, dir_mtime_ns: int):
+        seen = set()
+        with os.scandir(self.data_dir) as entries:
+            for entry in entries:
+                match = SETTINGS_FILE_PATTERN.match(entry.name)
+                if not match or not entry.is_file():
+                    continue
+                user_id = match.group(1)
+                seen.add(user_id)
+                cached = self._entries.get(user_id)
+                mtime_ns = entry.stat().st_mtime_ns
+                if cached is None or cached[0] != mtime_ns or user_id in self._dirty:
+                    self._load(user_id, Path(entry.path))
+
+        for user_id in set(self._entries) - seen:
+            del self._entries[user_id]
+        self._dir_mtime_ns = dir_mtime_ns
+        self._scanned_at = time.monotonic()
+
+    def _load(self, user_id: str, path: Path):
+        self._loads += 1
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+            with open(path, "r", encoding="utf-8") as f:
+                settings = json.load(f)
+        except FileNotFoundError:
+            self._entries.pop(user_id, None)
+            return
+        except (json.JSONDecodeError, OSError):
+            settings = {}
+            mtime_ns = 0
+        self._entries[user_id] = (mtime_ns, summarize_settings(user_id, settings))
+
+
+# Singleton
+_index: Optional[UserSettingsIndex] = None
+
+
+def get_settings_index() -> UserSettingsIndex:
+    """Returns the user settings index singleton."""
+    global _index
+    if _index is None:
+        _index = UserSettingsIndex()
+    return _index
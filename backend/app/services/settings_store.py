@@ -0,0 +1,154 @@
+"""
+Settings files (data/settings.json and data/settings_{user_id}.json) and
+the consolidated Meta/Evolution configuration built from them (JSON first,
+environment variables as fallback). Shared by the settings API, the Meta
+client and the background services.
+"""
+
+import json
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Optional
+
+from app.config import get_settings as get_env_settings
+from app.models.settings import Settings
+from app.services.metrics import record_cache
+from app.services.settings_index import get_settings_index
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+SETTINGS_FILE = DATA_DIR / "settings.json"
+
+
+def get_settings_file(user_id: str | None = None) -> Path:
+    """Retorna o path do arquivo de settings para o usuário."""
+    if user_id:
+        return DATA_DIR / f"settings_{user_id}.json"
+    return SETTINGS_FILE
+
+
+@dataclass
+class MetaConfig:
+    """Configuração consolidada da Meta API (JSON + env vars)."""
+    access_token: str
+    business_id: str
+    ad_account_id: str
+    page_id: str
+    api_version: str
+
+
+@dataclass
+class EvolutionConfig:
+    """Configuração consolidada da Evolution API (JSON + env vars)."""
+    api_url: str
+    api_key: str
+    instance: str
+    webhook_secret: str
+    enabled: bool
+    allowed_numbers: list[str]
+
+
+def ensure_data_dir():
+    """Garante que o diretório de dados existe."""
+    SETTINGS_FILE.parent.mkdir(parents=True, exist_ok=True)
+
+
+def load_settings(user_id: str | None = None) -> Settings:
+    """Carrega as configurações do arquivo JSON."""
+    ensure_data_dir()
+    settings_file = get_settings_file(user_id)
+    if settings_file.exists():
+        with open(settings_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+            return Settings(**data)
+    # Fallback: tenta arquivo global se user-specific não existe
+    if user_id and SETTINGS_FILE.exists():
+        with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+            return Settings(**data)
+    return Settings()
+
+
+# get_meta_config roda a cada MetaAPI criado (ex.: toda chamada de tool dos
+# agentes); o resultado fica em cache até os arquivos de settings mudarem.
+_meta_config_cache: dict[Optional[str], tuple[tuple, MetaConfig]] = {}
+
+
+def _settings_files_signature(user_id: str | None) -> tuple:
+    """(mtime_ns, tamanho) dos arquivos de settings lidos para o usuário."""
+    files = [get_settings_file(user_id)]
+    if user_id:
+        files.append(SETTINGS_FILE)
+    signature = []
+    for settings_file in files:
+        try:
+            stat = settings_file.stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def get_meta_config(user_id: str | None = None) -> MetaConfig:
+    """
+    Retorna configuração da Meta API.
+    Prioridade: JSON settings > Environment variables
+    """
+    signature = _settings_files_signature(user_id)
+    cached = _meta_config_cache.get(user_id)
+    hit = cached is not None and cached[0] == signature
+    record_cache("meta_config", hit)
+    if hit:
+        return replace(cached[1])
+
+    json_settings = load_settings(user_id)
+    env_settings = get_env_settings()
+
+    # JSON tem prioridade, env var é fallback
+    access_token = json_settings.meta_api.access_token or env_settings.meta_access_token
+    business_id = json_settings.meta_api.business_id or env_settings.meta_business_id
+    ad_account_id = json_settings.meta_api.ad_account_id or env_settings.meta_ad_account_id
+    page_id = json_settings.meta_api.page_id or ""
+    api_version = json_settings.meta_api.api_version or env_settings.meta_api_version
+
+    # Normaliza ad_account_id (remove 'act_' se presente para consistência)
+    if ad_account_id and ad_account_id.startswith("act_"):
+        ad_account_id = ad_account_id[4:]
+
+    config = MetaConfig(
+        access_token=access_token or "",
+        business_id=business_id or "",
+        ad_account_id=ad_account_id or "",
+        page_id=page_id,
+        api_version=api_version or "v22.0",
+    )
+    _meta_config_cache[user_id] = (signature, config)
+    return replace(config)
+
+
+def get_evolution_config(user_id: str | None = None) -> EvolutionConfig:
+    """
+    Retorna configuração da Evolution API.
+    Prioridade: JSON settings > Environment variables
+    """
+    json_settings = load_settings(user_id)
+    env_settings = get_env_settings()
+
+    return EvolutionConfig(
+        api_url=json_settings.evolution.api_url or env_settings.evolution_api_url or "",
+        api_key=json_settings.evolution.api_key or env_settings.evolution_api_key or "",
+        instance=json_settings.evolution.instance or env_settings.evolution_instance or "",
+        webhook_secret=json_settings.evolution.webhook_secret or env_settings.evolution_webhook_secret or "",
+        enabled=json_settings.evolution.enabled,
+        allowed_numbers=json_settings.evolution.allowed_numbers or [],
+    )
+
+
+def save_settings(settings: Settings, user_id: str | None = None) -> None:
+    """Salva as configurações no arquivo JSON."""
+    ensure_data_dir()
+    settings_file = get_settings_file(user_id)
+    with open(settings_file, "w", encoding="utf-8") as f:
+        json.dump(settings.model_dump(), f, indent=2, ensure_ascii=False)
+    _meta_config_cache.clear()
+    if user_id:
+        get_settings_index().invalidate(user_id)
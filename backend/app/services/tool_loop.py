@@ -0,0 +1,209 @@
+"""
+Event loop plumbing of the agent tools.
+
+The skill tools are async and normally run on the request's own event loop
+(see `skill_tools` in app/skills/tools.py). Two pieces live here:
+
+- `get_loop_http_client()`: a pooled httpx client per event loop, shared by
+  the MetaAPI instances the tools create (keep-alive connections instead of
+  a cold connection per tool call). Each loop closes its own client with
+  `close_loop_http_client()` (the main loop at application shutdown).
+- `ToolLoop`: a long-lived event loop in a daemon thread for callers that
+  need a tool's result synchronously (`agent_async_tools=False`). `run()`
+  hands it the coroutine and waits for the result, instead of a new thread
+  and `asyncio.run` per call:
+  - the caller's context is copied into the task, so the active trace span
+    and the current ad account (`set_current_ad_account`) follow the call
+  - at most `tool_loop_max_concurrency` tool coroutines run at once; the
+    others wait for a slot. A caller-specific limit (`gate`, e.g. the ad
+    account's) is acquired first, so calls waiting on it hold no global slot
+  - a call that takes longer than `tool_call_timeout_seconds` (queue wait
+    included) is cancelled and raises TimeoutError
+
+The tool loop starts on first use and is stopped at application shutdown.
+Metrics: tool_loop_in_flight, tool_loop_queued, tool_loop_wait_seconds.
+"""
+
+import asyncio
+import concurrent.futures
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+import weakref
+from typing import Any, AsyncContextManager, Callable, Coroutine, Optional
+
+import httpx
+
+from app.config import get_settings
+from app.services.metrics import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+_registry = get_metrics_registry()
+TOOL_LOOP_IN_FLIGHT = _registry.gauge("tool_loop_in_flight", "Tool coroutines running on the tool loop")
+TOOL_LOOP_QUEUED = _registry.gauge("tool_loop_queued", "Tool coroutines waiting for a concurrency slot")
+TOOL_LOOP_WAIT = _registry.histogram(
+    "tool_loop_wait_seconds",
+    "Time tool coroutines waited for a concurrency slot",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+
+
+# event loop -> pooled client (dropped with the loop)
+_loop_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_loop_clients_lock = threading.Lock()
+
+
+def get_loop_http_client() -> httpx.AsyncClient:
+    """Pooled HTTP client of the running event loop (created on first use)."""
+    loop = asyncio.get_running_loop()
+    with _loop_clients_lock:
+        client = _loop_clients.get(loop)
+        if client is None or client.is_closed:
+            max_connections = get_settings().tool_loop_max_connections
+            client = httpx.AsyncClient(
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            )
+            _loop_clients[loop] = client
+        return client
+
+
+async def close_loop_http_client():
+    """Close the running event loop's pooled HTTP client, if it has one."""
+    with _loop_clients_lock:
+        client = _loop_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+class ToolLoop:
+    """Long-lived event loop thread that runs the tools' coroutines."""
+
+    def __init__(self, max_concurrency: int = 16, timeout: float = 120):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def in_loop(self) -> bool:
+        """Whether the caller is running on the tool loop's thread."""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def start(self):
+        """Start the loop thread (idempotent; run() calls it)."""
+        with self._lock:
+            if self.running:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(loop)
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                ready.set()
+                loop.run_forever()
+
+            self._loop = loop
+            self._thread = threading.Thread(target=run, name="tool-loop", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def stop(self, timeout: float = 5):
+        """Cancel pending tool calls, close the HTTP client and stop the thread."""
+        with self._lock:
+            if not self.running:
+                return
+            loop, thread = self._loop, self._thread
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout)
+            except Exception as e:
+                logger.warning(f"Tool loop shutdown incomplete: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            if not thread.is_alive():
+                loop.close()
+            self._loop = self._thread = self._semaphore = None
+
+    async def _shutdown(self):
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await close_loop_http_client()
+
+    def run(
+        self,
+        coro: Coroutine,
+        timeout: Optional[float] = None,
+        gate: Optional[Callable[[], AsyncContextManager]] = None,
+    ) -> Any:
+        """
+        Run `coro` on the tool loop with the caller's context and wait for its result.
+        `gate` is called on the loop, in that context, and the returned context
+        manager is held around the call, entered before the global slot.
+        """
+        if self.in_loop():
+            coro.close()
+            raise RuntimeError("ToolLoop.run() called from the tool loop itself (it would deadlock)")
+        self.start()
+        timeout = timeout or self.timeout
+        future = asyncio.run_coroutine_threadsafe(
+            self._run(coro, contextvars.copy_context(), gate), self._loop
+        )
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Tool call did not finish within {timeout:g}s")
+
+    async def _run(
+        self,
+        coro: Coroutine,
+        context: contextvars.Context,
+        gate: Optional[Callable[[], AsyncContextManager]] = None,
+    ) -> Any:
+        queued = time.monotonic()
+        TOOL_LOOP_QUEUED.inc()
+        async with contextlib.AsyncExitStack() as stack:
+            try:
+                if gate is not None:
+                    await stack.enter_async_context(context.run(gate))
+                await self._semaphore.acquire()
+            except BaseException:
+                coro.close()
+                raise
+            finally:
+                TOOL_LOOP_QUEUED.inc(-1)
+            TOOL_LOOP_WAIT.observe(time.monotonic() - queued)
+            TOOL_LOOP_IN_FLIGHT.inc()
+            try:
+                return await asyncio.get_running_loop().create_task(coro, context=context)
+            finally:
+                TOOL_LOOP_IN_FLIGHT.inc(-1)
+                self._semaphore.release()
+
+
+# Singleton
+_tool_loop: Optional[ToolLoop] = None
+
+
+def get_tool_loop() -> ToolLoop:
+    """Returns the tool loop singleton."""
+    global _tool_loop
+    if _tool_loop is None:
+        settings = get_settings()
+        _tool_loop = ToolLoop(
+            max_concurrency=settings.tool_loop_max_concurrency,
+            timeout=settings.tool_call_timeout_seconds,
+        )
+    return _tool_loop
@@ -0,0 +1,212 @@
+"""
+In-process request tracing.
+
+Spans are tracked with a ContextVar, so they follow the request through
+awaits, tasks, `asyncio.to_thread` (Agno runs sync tools there) and the
+thread hop in `_run_async` (which copies the context explicitly).
+
+- `trace(name)` opens the root span of a new trace, or a child span when a
+  trace is already active (e.g. process_message called from the chat API).
+- `span(name)` opens a child span; it is a no-op outside a trace, so
+  instrumented code paths cost nothing when nobody traces them.
+- `record_span(name, duration_ms)` adds an already finished span (used by
+  the upstream call telemetry, which measures the call itself).
+
+Finished traces are kept in a bounded ring buffer (`trace_buffer_size`)
+and exposed as waterfalls by GET /api/admin/traces.
+"""
+
+import itertools
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from app.config import get_settings
+
+
+class Span:
+    """A timed operation inside a trace."""
+
+    __slots__ = ("span_id", "parent_id", "name", "start", "end", "attributes", "error", "thread")
+
+    def __init__(self, span_id: int, parent_id: Optional[int], name: str, start: float, attributes: dict):
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.start = start
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.thread = threading.current_thread().name
+
+    def set(self, **attributes):
+        """Adds attributes to the span (e.g. the detected intent)."""
+        self.attributes.update(attributes)
+
+
+class Trace:
+    """Spans of one traced operation; shared by every thread working on it."""
+
+    def __init__(self, name: str, max_spans: int):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started_at = datetime.utcnow()
+        self.origin = time.perf_counter()
+        self.max_spans = max_spans
+        self.spans: list[Span] = []
+        self.dropped_spans = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new_span(self, name: str, parent_id: Optional[int], attributes: dict, start: Optional[float] = None) -> Span:
+        with self._lock:
+            span = Span(next(self._ids), parent_id, name, start if start is not None else time.perf_counter(), attributes)
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped_spans += 1
+            return span
+
+    @property
+    def root(self) -> Span:
+        return self.spans[0]
+
+    def summary(self) -> dict:
+        root = self.root
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": _ms(root.end - root.start) if root.end is not None else None,
+            "span_count": len(self.spans),
+            "dropped_spans": self.dropped_spans,
+            "error": root.error or next((s.error for s in self.spans if s.error), None),
+            "attributes": dict(root.attributes),
+        }
+
+    def waterfall(self) -> dict:
+        """Summary plus the spans in start order, with offsets from the trace start and nesting depth."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: (s.start, s.span_id))
+        depth: dict[int, int] = {}
+        rows = []
+        for span in spans:
+            depth[span.span_id] = depth.get(span.parent_id, -1) + 1 if span.parent_id else 0
+            rows.append({
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "depth": depth[span.span_id],
+                "offset_ms": _ms(span.start - self.origin),
+                "duration_ms": _ms(span.end - span.start) if span.end is not None else None,
+                "thread": span.thread,
+                "error": span.error,
+                "attributes": dict(span.attributes),
+            })
+        return {**self.summary(), "spans": rows}
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+# (trace, current span) of the running context
+_current: ContextVar[Optional[tuple[Trace, Span]]] = ContextVar("trace_span", default=None)
+
+
+class TraceBuffer:
+    """Ring buffer of the last finished traces."""
+
+    def __init__(self, size: int = 200):
+        self._traces: deque[Trace] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def list(self) -> list[Trace]:
+        """Newest first."""
+        with self._lock:
+            return list(reversed(self._traces))
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return next((t for t in self._traces if t.trace_id == trace_id), None)
+
+
+@contextmanager
+def _open_span(trace: Trace, parent: Optional[Span], name: str, attributes: dict):
+    span = trace.new_span(name, parent.span_id if parent else None, attributes)
+    token = _current.set((trace, span))
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        span.end = time.perf_counter()
+        _current.reset(token)
+
+
+@contextmanager
+def trace(name: str, **attributes):
+    """Root span of a new trace (child span when a trace is already active)."""
+    current = _current.get()
+    if current is not None:
+        with _open_span(current[0], current[1], name, attributes) as span:
+            yield span
+        return
+
+    settings = get_settings()
+    new_trace = Trace(name, settings.trace_max_spans)
+    try:
+        with _open_span(new_trace, None, name, attributes) as span:
+            yield span
+    finally:
+        get_trace_buffer().add(new_trace)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Child span of the active trace; yields None (and records nothing) outside a trace."""
+    current = _current.get()
+    if current is None:
+        yield None
+        return
+    with _open_span(current[0], current[1], name, attributes) as child:
+        yield child
+
+
+def record_span(name: str, duration_ms: float, error: Optional[str] = None, **attributes):
+    """Adds a span that just finished and lasted `duration_ms` to the active trace."""
+    current = _current.get()
+    if current is None:
+        return
+    trace_, parent = current
+    end = time.perf_counter()
+    child = trace_.new_span(name, parent.span_id, attributes, start=end - duration_ms / 1000)
+    child.end = end
+    child.error = error
+
+
+def current_span() -> Optional[Span]:
+    current = _current.get()
+    return current[1] if current else None
+
+
+# Singleton
+_buffer: Optional[TraceBuffer] = None
+
+
+def get_trace_buffer() -> TraceBuffer:
+    """Returns the trace ring buffer singleton."""
+    global _buffer
+    if _buffer is None:
+        _buffer = TraceBuffer(get_settings().trace_buffer_size)
+    return _buffer
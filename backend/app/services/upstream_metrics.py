@@ -0,0 +1,203 @@
+"""
+Upstream call telemetry (Meta Graph API and LLM providers).
+
+Every call to an upstream API produces one record with its endpoint
+template, account, attempt count, final HTTP status, Meta error code,
+response size and the usage percentages reported in Meta's rate limit
+headers. For LLM calls `caller` is the skill and `account_id` the model.
+Each record:
+
+- updates the in-process metrics registry (app.services.metrics), and
+- is queued on the activity log writer for the `upstream_calls` table,
+  which the admin endpoint GET /api/admin/upstream-calls aggregates, and
+- becomes a span of the active trace, if any (app.services.tracing).
+
+Recording never raises: telemetry must not break the call it measures.
+"""
+
+import json
+import logging
+import re
+from typing import Optional
+
+from app.services.activity_log import get_activity_log_writer, normalize_path, now_ms
+from app.services.metrics import get_metrics_registry
+from app.services.tracing import record_span
+
+logger = logging.getLogger(__name__)
+
+# Meta error codes that mean throttling: app/user/page level and
+# business use case (800xx) rate limits
+META_THROTTLE_CODES = {4, 17, 32, 613}
+META_BUC_THROTTLE_CODES = range(80000, 80015)
+
+_ACCOUNT_PATTERN = re.compile(r"(?:^|/)act_(\d+)")
+
+_registry = get_metrics_registry()
+UPSTREAM_CALLS = _registry.counter(
+    "upstream_calls_total",
+    "Upstream API calls by final status",
+    ("service", "endpoint", "status"),
+)
+UPSTREAM_DURATION = _registry.histogram(
+    "upstream_call_duration_seconds",
+    "Upstream API call duration, retries and backoff included",
+    ("service", "endpoint"),
+)
+UPSTREAM_RETRIES = _registry.counter(
+    "upstream_retries_total",
+    "Extra attempts made after a failed or throttled upstream call",
+    ("service", "endpoint"),
+)
+UPSTREAM_THROTTLED = _registry.counter(
+    "upstream_throttled_total",
+    "Upstream calls that hit a rate limit at least once",
+    ("service", "endpoint"),
+)
+UPSTREAM_ERRORS = _registry.counter(
+    "upstream_errors_total",
+    "Upstream calls that ended in an API error, by error code",
+    ("service", "endpoint", "error_code"),
+)
+LLM_DURATION = _registry.histogram(
+    "llm_call_duration_seconds",
+    "LLM call duration by skill (router = intent classification)",
+    ("skill", "status"),
+)
+UPSTREAM_USAGE = _registry.gauge(
+    "upstream_usage_pct",
+    "Last usage percentage reported by Meta's rate limit headers",
+    ("kind", "account_id"),
+)
+
+
+def is_meta_throttle(status_code: Optional[int], error_code: Optional[int]) -> bool:
+    """Whether a Graph API response is a rate limit (HTTP 429 or throttling error code)."""
+    return status_code == 429 or error_code in META_THROTTLE_CODES or error_code in META_BUC_THROTTLE_CODES
+
+
+def meta_endpoint_template(endpoint: str) -> str:
+    """Graph path -> template, e.g. act_123/campaigns -> {ad_account_id}/campaigns."""
+    return normalize_path(endpoint.strip("/"))
+
+
+def meta_account_id(endpoint: str, default: Optional[str] = None) -> Optional[str]:
+    """Ad account of a Graph path (act_<id>/...), else `default`."""
+    match = _ACCOUNT_PATTERN.search(endpoint)
+    if match:
+        return match.group(1)
+    return default.removeprefix("act_") if default else None
+
+
+def _max_pct(values) -> Optional[float]:
+    numbers = [float(v) for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    return max(numbers) if numbers else None
+
+
+def parse_usage_headers(headers) -> dict:
+    """
+    Usage percentages from Meta's rate limit headers (highest metric of each):
+    X-App-Usage, X-Ad-Account-Usage and X-Business-Use-Case-Usage.
+    Missing or malformed headers yield None.
+    """
+    usage = {"app": None, "account": None, "business": None}
+
+    def load(name):
+        raw = headers.get(name)
+        if not raw:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    app_usage = load("x-app-usage")
+    if isinstance(app_usage, dict):
+        usage["app"] = _max_pct(app_usage.values())
+
+    account_usage = load("x-ad-account-usage")
+    if isinstance(account_usage, dict):
+        usage["account"] = _max_pct([account_usage.get("acc_id_util_pct")])
+
+    business_usage = load("x-business-use-case-usage")
+    if isinstance(business_usage, dict):
+        usage["business"] = _max_pct(
+            value
+            for entries in business_usage.values()
+            if isinstance(entries, list)
+            for entry in entries
+            if isinstance(entry, dict)
+            for key, value in entry.items()
+            if key in ("call_count", "total_cputime", "total_time")
+        )
+
+    return usage
+
+
+def record_upstream_call(
+    service: str,
+    method: str,
+    endpoint: str,
+    duration_ms: float,
+    *,
+    caller: Optional[str] = None,
+    account_id: Optional[str] = None,
+    attempts: int = 1,
+    status_code: Optional[int] = None,
+    error_code: Optional[int] = None,
+    response_bytes: Optional[int] = None,
+    usage: Optional[dict] = None,
+    throttled: bool = False,
+    retry_ms: float = 0.0,
+):
+    """Records one upstream call (`endpoint` already templated) in the registry and the local table."""
+    try:
+        usage = usage or {}
+        status = str(status_code) if status_code is not None else "error"
+        UPSTREAM_CALLS.inc(service=service, endpoint=endpoint, status=status)
+        UPSTREAM_DURATION.observe(duration_ms / 1000, service=service, endpoint=endpoint)
+        if service == "llm":
+            LLM_DURATION.observe(duration_ms / 1000, skill=caller or "", status=status)
+        if attempts > 1:
+            UPSTREAM_RETRIES.inc(attempts - 1, service=service, endpoint=endpoint)
+        if throttled:
+            UPSTREAM_THROTTLED.inc(service=service, endpoint=endpoint)
+        if error_code is not None:
+            UPSTREAM_ERRORS.inc(service=service, endpoint=endpoint, error_code=error_code)
+        for kind, value in usage.items():
+            if value is not None:
+                UPSTREAM_USAGE.set(value, kind=kind, account_id=account_id or "")
+
+        record_span(
+            f"{service} {method} {endpoint}",
+            duration_ms,
+            error=f"HTTP {status}" if status_code is None or status_code >= 400 else None,
+            caller=caller,
+            account_id=account_id,
+            attempts=attempts,
+            status_code=status_code,
+            error_code=error_code,
+            throttled=throttled,
+            retry_ms=round(retry_ms, 2),
+        )
+
+        get_activity_log_writer().submit_upstream((
+            now_ms(),
+            service,
+            method,
+            endpoint,
+            caller,
+            account_id,
+            attempts,
+            status_code,
+            error_code,
+            response_bytes,
+            usage.get("app"),
+            usage.get("account"),
+            usage.get("business"),
+            int(throttled),
+            round(duration_ms, 2),
+            round(retry_ms, 2),
+        ))
+    except Exception as e:
+        logger.warning(f"Failed to record upstream call {service} {endpoint}: {e}")
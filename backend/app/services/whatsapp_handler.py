@@ -13,6 +13,7 @@ from app.config import get_settings
 logger = logging.getLogger(__name__)
 from app.models.whatsapp import WebhookEvent, MessageType, ConversationContext
 from app.services.media_processor import get_media_processor
+from app.services.metrics import record_cache
 from app.services.evolution_client import get_evolution_client
 from app.skills.orchestrator import CampaignOrchestrator
 
@@ -110,6 +111,7 @@ class WhatsAppHandler:
 
     def _get_conversation(self, phone_number: str) -> ConversationContext:
         """Obtém ou cria contexto de conversa."""
+        record_cache("conversations", hit=phone_number in self._conversations)
         if phone_number not in self._conversations:
             self._conversations[phone_number] = ConversationContext(
                 phone_number=phone_number,
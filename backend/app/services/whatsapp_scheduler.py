@@ -2,21 +2,35 @@
 Agendador de mensagens automáticas via WhatsApp.
 Envia relatórios diários e alertas de orçamento.
 Suporte multi-usuário: itera sobre todos os settings_{user_id}.json.
+Também executa a compactação periódica do armazenamento de alertas.
+
+Alertas de orçamento são avaliados a partir do evento de snapshot publicado
+pela sincronização (ver account_snapshot). O job periódico de orçamento só
+consulta o gasto do mês dos usuários cuja conta não foi sincronizada
+recentemente.
 """
 
 import asyncio
 import json
 import logging
 import re
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
+from app.config import get_settings
+from app.services.account_snapshot import AccountSnapshot, is_snapshot_fresh
+from app.services.activity_log import run_retention
+from app.services.alert_store import compact_all_partitions, reconcile_unread_counters
 from app.services.evolution_client import EvolutionClient
+from app.services.metrics import get_metrics_registry
+from app.services.settings_store import get_evolution_config, get_meta_config
 from app.tools.meta_api import MetaAPI
 
 logger = logging.getLogger(__name__)
@@ -24,6 +38,10 @@ logger = logging.getLogger(__name__)
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
 SETTINGS_FILE = DATA_DIR / "settings.json"
 
+# Intervalo da verificação de orçamento (minutos); contas sincronizadas
+# há menos tempo que isso já foram avaliadas pelo consumidor do snapshot
+BUDGET_CHECK_MINUTES = 30
+
 
 def get_all_user_ids() -> list[str]:
     """Descobre todos os user_ids com settings configurados."""
@@ -76,8 +94,6 @@ def save_budget_state(state: dict, user_id: str | None = None):
 
 def get_evolution_client_from_settings() -> Optional[EvolutionClient]:
     """Cria cliente Evolution a partir das configurações (JSON + env vars)."""
-    from app.api.settings import get_evolution_config
-
     config = get_evolution_config()
 
     if not config.enabled:
@@ -95,7 +111,6 @@ def get_evolution_client_from_settings() -> Optional[EvolutionClient]:
 
 def get_allowed_numbers() -> list[str]:
     """Obtém lista de números permitidos para receber mensagens."""
-    from app.api.settings import get_evolution_config
     return get_evolution_config().allowed_numbers
 
 
@@ -199,8 +214,11 @@ async def generate_daily_report(user_id: str | None = None) -> str:
         return f"Erro ao gerar relatório: {str(e)}"
 
 
-async def check_budget_alerts_for_user(user_id: str | None = None):
-    """Verifica e envia alertas de orçamento para um usuário específico."""
+async def check_budget_alerts_for_user(user_id: str | None = None, month_insights: Optional[dict] = None):
+    """
+    Verifica e envia alertas de orçamento para um usuário específico.
+    Se `month_insights` (gasto do mês) for informado, não consulta a Meta API.
+    """
     settings = load_settings(user_id)
     budget_settings = settings.get("budget", {})
     notification_settings = settings.get("notifications", {})
@@ -228,8 +246,10 @@ async def check_budget_alerts_for_user(user_id: str | None = None):
         save_budget_state(state, user_id)
 
     try:
-        meta_api = MetaAPI(user_id=user_id)
-        insights = await meta_api.get_account_insights(date_preset="this_month")
+        insights = month_insights
+        if insights is None:
+            meta_api = MetaAPI(user_id=user_id)
+            insights = await meta_api.get_account_insights(date_preset="this_month")
 
         if not insights:
             return
@@ -308,21 +328,6 @@ Considere ajustar seus gastos ou aumentar o orçamento.
         logger.error(f"Erro ao verificar alertas de orçamento (user={user_id or 'global'}): {e}")
 
 
-async def check_budget_alerts():
-    """Verifica alertas de orçamento para TODOS os usuários."""
-    user_ids = get_all_user_ids()
-
-    if not user_ids:
-        logger.info("Nenhum usuário com settings configurado, pulando verificação de orçamento")
-        return
-
-    for user_id in user_ids:
-        try:
-            await check_budget_alerts_for_user(user_id)
-        except Exception as e:
-            logger.error(f"Erro ao verificar orçamento do usuário {user_id}: {e}")
-
-
 async def send_daily_report_job():
     """Job que envia o relatório diário para todos os usuários."""
     client = get_evolution_client_from_settings()
@@ -351,18 +356,133 @@ async def send_daily_report_job():
             logger.error(f"Erro ao enviar relatório para usuário {user_id}: {e}")
 
 
+def _normalize_account_id(ad_account_id: str | None) -> str:
+    return (ad_account_id or "").removeprefix("act_")
+
+
+async def check_budget_alerts_from_snapshot(snapshot: AccountSnapshot):
+    """
+    Consumidor do evento de snapshot: avalia os alertas de orçamento
+    com o gasto do mês já obtido pela sincronização.
+    Apenas a conta padrão do usuário é considerada (orçamento é por usuário).
+    """
+    if snapshot.month_insights is None:
+        return
+
+    default_account = load_settings(snapshot.user_id).get("meta_api", {}).get("ad_account_id", "")
+    if _normalize_account_id(snapshot.ad_account_id) != _normalize_account_id(default_account):
+        return
+
+    await check_budget_alerts_for_user(snapshot.user_id, snapshot.month_insights)
+
+
+async def check_budget_alerts():
+    """
+    Verifica alertas de orçamento para TODOS os usuários.
+    Pula quem teve a conta sincronizada recentemente (o consumidor do
+    snapshot já avaliou o orçamento com o gasto do mês da sincronização).
+    """
+    user_ids = get_all_user_ids()
+
+    if not user_ids:
+        logger.info("Nenhum usuário com settings configurado, pulando verificação de orçamento")
+        return
+
+    for user_id in user_ids:
+        try:
+            ad_account_id = get_meta_config(user_id).ad_account_id or None
+            if is_snapshot_fresh(user_id, ad_account_id, BUDGET_CHECK_MINUTES * 60):
+                continue
+            await check_budget_alerts_for_user(user_id)
+        except Exception as e:
+            logger.error(f"Erro ao verificar orçamento do usuário {user_id}: {e}")
+
+
 async def check_budget_alerts_job():
     """Job que verifica alertas de orçamento."""
     await check_budget_alerts()
 
 
+async def compact_alerts_job():
+    """Job que compacta os alertas (roll-up de repetidos + retenção) fora do event loop."""
+    try:
+        stats = await asyncio.to_thread(compact_all_partitions)
+        logger.info(
+            f"Compactação de alertas: {stats['partitions']} partições, "
+            f"{stats['alerts_before']} -> {stats['alerts_after']} alertas"
+        )
+    except Exception as e:
+        logger.error(f"Erro ao compactar alertas: {e}")
+
+
+async def reconcile_alert_counters_job():
+    """Job que corrige divergências nos contadores de alertas não lidos."""
+    try:
+        stats = await asyncio.to_thread(reconcile_unread_counters)
+        if stats["corrected"]:
+            logger.warning(f"Contadores de alertas corrigidos para {stats['corrected']} de {stats['users']} usuários")
+    except Exception as e:
+        logger.error(f"Erro ao reconciliar contadores de alertas: {e}")
+
+
+async def activity_log_retention_job():
+    """Job de retenção dos activity logs (remoção em lotes + incremental vacuum)."""
+    settings = get_settings()
+    try:
+        report = await asyncio.to_thread(
+            run_retention,
+            settings.activity_log_retention_days,
+            rollup_retention_days=settings.activity_rollup_retention_days,
+            batch_size=settings.activity_log_delete_batch_size,
+        )
+        logger.info(
+            f"Retenção de logs: {report['deleted_rows']} linhas removidas "
+            f"({report['dropped_partitions']} partições), "
+            f"{report['deleted_rollup_rows']} roll-ups, "
+            f"{report['reclaimed_bytes'] / 1024 / 1024:.1f} MB recuperados em {report['duration_ms']:.0f} ms"
+        )
+    except Exception as e:
+        logger.error(f"Erro na retenção de activity logs: {e}")
+
+
+_registry = get_metrics_registry()
+JOB_DURATION = _registry.histogram(
+    "scheduler_job_duration_seconds",
+    "Duração das execuções dos jobs agendados",
+    ("job",),
+)
+JOB_RUNS = _registry.counter(
+    "scheduler_job_runs_total",
+    "Execuções dos jobs agendados por resultado",
+    ("job", "result"),
+)
+
+
 class WhatsAppScheduler:
     """Gerenciador de jobs agendados para WhatsApp."""
 
     def __init__(self):
         self.scheduler = AsyncIOScheduler()
+        self.scheduler.add_listener(
+            self._on_job_event,
+            EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED,
+        )
+        self._job_started: dict[str, float] = {}
         self._started = False
 
+    def _on_job_event(self, event):
+        """Mede a duração de cada execução (do envio ao executor até o término)."""
+        if event.code == EVENT_JOB_SUBMITTED:
+            self._job_started[event.job_id] = time.monotonic()
+            return
+        if event.code == EVENT_JOB_MISSED:
+            JOB_RUNS.inc(job=event.job_id, result="missed")
+            return
+        started = self._job_started.pop(event.job_id, None)
+        if started is not None:
+            JOB_DURATION.observe(time.monotonic() - started, job=event.job_id)
+        JOB_RUNS.inc(job=event.job_id, result="error" if event.code == EVENT_JOB_ERROR else "success")
+
     def _get_report_time(self) -> tuple[int, int]:
         """Obtém horário configurado para relatório diário."""
         notification_settings = get_notification_settings()
@@ -391,15 +511,44 @@ class WhatsAppScheduler:
             replace_existing=True,
         )
 
-        # Job de verificação de orçamento (a cada 30 minutos)
+        # Job de verificação de alertas de orçamento
         self.scheduler.add_job(
             check_budget_alerts_job,
-            IntervalTrigger(minutes=30),
+            IntervalTrigger(minutes=BUDGET_CHECK_MINUTES),
             id="budget_alerts",
             name="Verificação de Alertas de Orçamento",
             replace_existing=True,
         )
 
+        # Job de compactação/retenção dos alertas
+        self.scheduler.add_job(
+            compact_alerts_job,
+            IntervalTrigger(hours=get_settings().alerts_compaction_interval_hours),
+            id="alerts_compaction",
+            name="Compactação de Alertas",
+            replace_existing=True,
+            next_run_time=datetime.now(),
+        )
+
+        # Job de reconciliação dos contadores de não lidos
+        self.scheduler.add_job(
+            reconcile_alert_counters_job,
+            IntervalTrigger(minutes=get_settings().alerts_counters_reconcile_minutes),
+            id="alerts_counters_reconcile",
+            name="Reconciliação de Contadores de Alertas",
+            replace_existing=True,
+        )
+
+        # Job de retenção dos activity logs
+        self.scheduler.add_job(
+            activity_log_retention_job,
+            IntervalTrigger(hours=get_settings().activity_log_retention_interval_hours),
+            id="activity_log_retention",
+            name="Retenção de Activity Logs",
+            replace_existing=True,
+            next_run_time=datetime.now(),
+        )
+
         self.scheduler.start()
         self._started = True
         logger.info(f"WhatsApp Scheduler iniciado - Relatório diário às {hour:02d}:{minute:02d}")
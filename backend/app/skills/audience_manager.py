@@ -3,13 +3,14 @@ Audience Manager Skill - Gerenciamento de públicos e targeting.
 """
 
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 
 from app.config import get_settings
+from app.skills.llm import InstrumentedOpenAIChat
 from app.skills.tools import (
     search_interests,
     search_locations,
     estimate_audience_reach,
+    skill_tools,
 )
 
 settings = get_settings()
@@ -46,16 +47,17 @@ def create_audience_manager_agent() -> Agent:
     """Cria o agente Audience Manager."""
     return Agent(
         name="Audience Manager",
-        model=OpenAIChat(
+        model=InstrumentedOpenAIChat(
             id=settings.llm_model,
             api_key=settings.llm_api_key,
             base_url=settings.llm_base_url or None,
+            skill="audience_manager",
         ),
-        tools=[
+        tools=skill_tools(
             search_interests,
             search_locations,
             estimate_audience_reach,
-        ],
+        ),
         instructions=SYSTEM_PROMPT,
         markdown=True,
         show_tool_calls=False,
@@ -3,9 +3,9 @@ Budget Optimizer Skill - Otimização de orçamento.
 """
 
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 
 from app.config import get_settings
+from app.skills.llm import InstrumentedOpenAIChat
 from app.skills.tools import (
     get_account_spend_summary,
     get_campaigns_spend_comparison,
@@ -13,6 +13,7 @@ from app.skills.tools import (
     update_campaign_budget,
     list_campaigns,
     get_campaign_details,
+    skill_tools,
 )
 
 settings = get_settings()
@@ -49,19 +50,20 @@ def create_budget_optimizer_agent() -> Agent:
     """Cria o agente Budget Optimizer."""
     return Agent(
         name="Budget Optimizer",
-        model=OpenAIChat(
+        model=InstrumentedOpenAIChat(
             id=settings.llm_model,
             api_key=settings.llm_api_key,
             base_url=settings.llm_base_url or None,
+            skill="budget_optimizer",
         ),
-        tools=[
+        tools=skill_tools(
             get_account_spend_summary,
             get_campaigns_spend_comparison,
             get_budget_recommendations,
             update_campaign_budget,
             list_campaigns,
             get_campaign_details,
-        ],
+        ),
         instructions=SYSTEM_PROMPT,
         markdown=True,
         show_tool_calls=False,
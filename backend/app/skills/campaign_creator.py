@@ -3,10 +3,10 @@ Campaign Creator Skill - Criação de campanhas, ad sets e ads.
 """
 
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 
 from app.config import get_settings
-from app.skills.tools import create_campaign, create_ad_set, create_ad, list_campaigns
+from app.skills.llm import InstrumentedOpenAIChat
+from app.skills.tools import create_campaign, create_ad_set, create_ad, list_campaigns, skill_tools
 
 settings = get_settings()
 
@@ -39,12 +39,13 @@ def create_campaign_creator_agent() -> Agent:
     """Cria o agente Campaign Creator."""
     return Agent(
         name="Campaign Creator",
-        model=OpenAIChat(
+        model=InstrumentedOpenAIChat(
             id=settings.llm_model,
             api_key=settings.llm_api_key,
             base_url=settings.llm_base_url or None,
+            skill="campaign_creator",
         ),
-        tools=[create_campaign, create_ad_set, create_ad, list_campaigns],
+        tools=skill_tools(create_campaign, create_ad_set, create_ad, list_campaigns),
         instructions=SYSTEM_PROMPT,
         markdown=True,
         show_tool_calls=False,
@@ -3,15 +3,16 @@ Campaign Editor Skill - Edição e gerenciamento de campanhas.
 """
 
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 
 from app.config import get_settings
+from app.skills.llm import InstrumentedOpenAIChat
 from app.skills.tools import (
     list_campaigns,
     get_campaign_details,
     update_campaign_status,
     update_campaign_budget,
     duplicate_campaign,
+    skill_tools,
 )
 
 settings = get_settings()
@@ -57,18 +58,19 @@ def create_campaign_editor_agent() -> Agent:
     """Cria o agente Campaign Editor."""
     return Agent(
         name="Campaign Editor",
-        model=OpenAIChat(
+        model=InstrumentedOpenAIChat(
             id=settings.llm_model,
             api_key=settings.llm_api_key,
             base_url=settings.llm_base_url or None,
+            skill="campaign_editor",
         ),
-        tools=[
+        tools=skill_tools(
             list_campaigns,
             get_campaign_details,
             update_campaign_status,
             update_campaign_budget,
             duplicate_campaign,
-        ],
+        ),
         instructions=SYSTEM_PROMPT,
         markdown=True,
         show_tool_calls=False,
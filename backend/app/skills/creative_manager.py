@@ -3,10 +3,10 @@ Creative Manager Skill - Gerenciamento de criativos.
 """
 
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 
 from app.config import get_settings
-from app.skills.tools import list_creatives, get_creative_specs, get_creative_best_practices
+from app.skills.llm import InstrumentedOpenAIChat
+from app.skills.tools import list_creatives, get_creative_specs, get_creative_best_practices, skill_tools
 
 settings = get_settings()
 
@@ -35,12 +35,13 @@ def create_creative_manager_agent() -> Agent:
     """Cria o agente Creative Manager."""
     return Agent(
         name="Creative Manager",
-        model=OpenAIChat(
+        model=InstrumentedOpenAIChat(
             id=settings.llm_model,
             api_key=settings.llm_api_key,
             base_url=settings.llm_base_url or None,
+            skill="creative_manager",
         ),
-        tools=[list_creatives, get_creative_specs, get_creative_best_practices],
+        tools=skill_tools(list_creatives, get_creative_specs, get_creative_best_practices),
         instructions=SYSTEM_PROMPT,
         markdown=True,
         show_tool_calls=False,
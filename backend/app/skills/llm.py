@@ -0,0 +1,85 @@
+"""
+Modelo LLM dos skills, com telemetria.
+
+InstrumentedOpenAIChat é um OpenAIChat que registra cada chamada ao
+provedor (duração, status, throttling) em app.services.upstream_metrics,
+identificada pelo skill que fez a chamada. Em streams, a chamada é
+registrada quando o stream termina (esgotado, com erro ou fechado antes).
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from agno.models.openai import OpenAIChat
+
+from app.services.upstream_metrics import record_upstream_call
+
+LLM_ENDPOINT = "chat/completions"
+
+
+def _error_status(error: Exception) -> Optional[int]:
+    """Status HTTP de um erro do provedor (None em erros de conexão)."""
+    return getattr(error.__cause__, "status_code", None)
+
+
+@dataclass
+class InstrumentedOpenAIChat(OpenAIChat):
+    """OpenAIChat que registra a telemetria de cada chamada."""
+
+    skill: Optional[str] = None
+
+    def _record(self, started: float, status_code: Optional[int]):
+        record_upstream_call(
+            "llm",
+            "POST",
+            LLM_ENDPOINT,
+            (time.monotonic() - started) * 1000,
+            caller=self.skill,
+            account_id=self.id,
+            status_code=status_code,
+            throttled=status_code == 429,
+        )
+
+    def invoke(self, messages):
+        started = time.monotonic()
+        try:
+            response = super().invoke(messages)
+        except Exception as e:
+            self._record(started, _error_status(e))
+            raise
+        self._record(started, 200)
+        return response
+
+    async def ainvoke(self, messages):
+        started = time.monotonic()
+        try:
+            response = await super().ainvoke(messages)
+        except Exception as e:
+            self._record(started, _error_status(e))
+            raise
+        self._record(started, 200)
+        return response
+
+    def invoke_stream(self, messages):
+        started = time.monotonic()
+        status_code = 200
+        try:
+            yield from super().invoke_stream(messages)
+        except Exception as e:
+            status_code = _error_status(e)
+            raise
+        finally:
+            self._record(started, status_code)
+
+    async def ainvoke_stream(self, messages):
+        started = time.monotonic()
+        status_code = 200
+        try:
+            async for chunk in super().ainvoke_stream(messages):
+                yield chunk
+        except Exception as e:
+            status_code = _error_status(e)
+            raise
+        finally:
+            self._record(started, status_code)
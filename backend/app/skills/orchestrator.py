@@ -3,6 +3,7 @@ Campaign Orchestrator - Coordena todos os skills de campanha.
 """
 
 import re
+import time
 import logging
 from typing import Optional
 from agno.agent import Agent
@@ -10,6 +11,9 @@ from agno.models.openai import OpenAIChat
 import httpx
 
 from app.config import get_settings
+from app.services.tracing import span, trace
+from app.services.upstream_metrics import record_upstream_call
+from app.skills.llm import LLM_ENDPOINT
 from app.skills.campaign_creator import create_campaign_creator_agent
 from app.skills.campaign_editor import create_campaign_editor_agent
 from app.skills.audience_manager import create_audience_manager_agent
@@ -261,13 +265,15 @@ Mensagem: "{message}"
 
 Responda APENAS: analyzer, editor, creator, budget, audience, creative ou reporter"""
 
+        started = time.monotonic()
+        status_code = response_bytes = None
+        # Usar modelo de routing se configurado, senão usa modelo principal
+        routing_model = settings.llm_routing_model or settings.llm_model
         try:
             base_url = settings.llm_base_url or "https://api.openai.com/v1"
-            # Usar modelo de routing se configurado, senão usa modelo principal
-            routing_model = settings.llm_routing_model or settings.llm_model
             async with httpx.AsyncClient(timeout=10.0) as client:
                 response = await client.post(
-                    f"{base_url}/chat/completions",
+                    f"{base_url}/{LLM_ENDPOINT}",
                     headers={
                         "Authorization": f"Bearer {settings.llm_api_key}",
                         "Content-Type": "application/json",
@@ -279,6 +285,8 @@ Responda APENAS: analyzer, editor, creator, budget, audience, creative ou report
                         "temperature": 0,
                     },
                 )
+                status_code = response.status_code
+                response_bytes = len(response.content)
                 response.raise_for_status()
                 data = response.json()
                 intent = data["choices"][0]["message"]["content"].strip().lower()
@@ -293,6 +301,18 @@ Responda APENAS: analyzer, editor, creator, budget, audience, creative ou report
         except Exception as e:
             logger.error(f"LLM intent classification failed: {e}")
             return "analyzer"
+        finally:
+            record_upstream_call(
+                "llm",
+                "POST",
+                LLM_ENDPOINT,
+                (time.monotonic() - started) * 1000,
+                caller="router",
+                account_id=routing_model,
+                status_code=status_code,
+                response_bytes=response_bytes,
+                throttled=status_code == 429,
+            )
 
     async def _detect_intent(self, message: str) -> str:
         """
@@ -395,6 +415,32 @@ Responda APENAS: analyzer, editor, creator, budget, audience, creative ou report
     ) -> dict:
         """
         Processa uma mensagem do usuário roteando para o skill apropriado.
+        Cada mensagem é um trace (ver GET /api/admin/traces).
+        """
+        with trace(
+            "orchestrator.process_message",
+            ad_account_id=ad_account_id,
+            confirmed=confirmed_action is not None,
+            message=message[:80],
+        ) as root:
+            result = await self._process_message(message, ad_account_id, history, confirmed_action)
+            root.set(agent_type=result.get("agent_type"))
+            return result
+
+    async def _run_skill(self, skill: Agent, message: str):
+        """Executa o skill dentro de um span do trace atual (ou de um trace novo)."""
+        with trace("skill.arun", skill=skill.name):
+            return await skill.arun(message)
+
+    async def _process_message(
+        self,
+        message: str,
+        ad_account_id: Optional[str] = None,
+        history: Optional[list[dict]] = None,
+        confirmed_action: Optional[str] = None,
+    ) -> dict:
+        """
+        Processa uma mensagem do usuário roteando para o skill apropriado.
 
         Args:
             message: Mensagem do usuário
@@ -467,7 +513,10 @@ Responda APENAS: analyzer, editor, creator, budget, audience, creative ou report
                     }
 
         # Detectar intenção (híbrido: keywords + LLM fallback)
-        intent = await self._detect_intent(message)
+        with span("orchestrator.detect_intent") as intent_span:
+            intent = await self._detect_intent(message)
+            if intent_span:
+                intent_span.set(intent=intent)
         logger.info(f"FINAL ROUTING: message='{message[:80]}' -> intent='{intent}', is_confirmed={is_confirmed}")
 
         # Obter o skill apropriado
@@ -503,7 +552,7 @@ Responda APENAS: analyzer, editor, creator, budget, audience, creative ou report
             full_message = context_prefix + history_context + message
 
             # Executar o skill
-            response = await skill.arun(full_message)
+            response = await self._run_skill(skill, full_message)
 
             # Extrair conteúdo da resposta
             content = ""
@@ -524,7 +573,7 @@ Responda APENAS: analyzer, editor, creator, budget, audience, creative ou report
                     "Chamar a tool é OBRIGATÓRIO. NÃO responda com texto pedindo confirmação.]\n\n"
                 )
                 full_message_retry = stronger_prefix + context_prefix + history_context + message
-                response = await skill.arun(full_message_retry)
+                response = await self._run_skill(skill, full_message_retry)
                 if hasattr(response, "content"):
                     content = response.content
                 elif isinstance(response, str):
@@ -542,7 +591,7 @@ Responda APENAS: analyzer, editor, creator, budget, audience, creative ou report
                         "NÃO escreva nenhum texto pedindo confirmação. APENAS execute a tool.]\n\n"
                     )
                     full_message_final = final_prefix + context_prefix + message
-                    response = await skill.arun(full_message_final)
+                    response = await self._run_skill(skill, full_message_final)
                     if hasattr(response, "content"):
                         content = response.content
                     elif isinstance(response, str):
@@ -584,7 +633,7 @@ Responda APENAS: analyzer, editor, creator, budget, audience, creative ou report
         """Obtém sugestões de otimização para uma campanha."""
         message = f"Analise e sugira otimizações para a campanha {campaign_id}"
         skill = self._get_skill("budget")
-        response = await skill.arun(message)
+        response = await self._run_skill(skill, message)
         return {
             "response": response.content if hasattr(response, "content") else str(response),
             "agent_type": "Budget Optimizer",
@@ -594,7 +643,7 @@ Responda APENAS: analyzer, editor, creator, budget, audience, creative ou report
         """Analisa a performance de uma campanha."""
         message = f"Faça uma análise completa da performance da campanha {campaign_id}"
         skill = self._get_skill("analyzer")
-        response = await skill.arun(message)
+        response = await self._run_skill(skill, message)
         return {
             "response": response.content if hasattr(response, "content") else str(response),
             "agent_type": "Performance Analyzer",
@@ -604,7 +653,7 @@ Responda APENAS: analyzer, editor, creator, budget, audience, creative ou report
         """Obtém recomendações de orçamento."""
         message = "Analise a distribuição de orçamento e faça recomendações"
         skill = self._get_skill("budget")
-        response = await skill.arun(message)
+        response = await self._run_skill(skill, message)
         return {
             "response": response.content if hasattr(response, "content") else str(response),
             "agent_type": "Budget Optimizer",
@@ -3,15 +3,16 @@ Performance Analyzer Skill - Análise de performance.
 """
 
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 
 from app.config import get_settings
+from app.skills.llm import InstrumentedOpenAIChat
 from app.skills.tools import (
     get_campaign_insights,
     get_breakdown_analysis,
     get_trends_analysis,
     compare_campaigns_performance,
     list_campaigns,
+    skill_tools,
 )
 
 settings = get_settings()
@@ -64,18 +65,19 @@ def create_performance_analyzer_agent() -> Agent:
     """Cria o agente Performance Analyzer."""
     return Agent(
         name="Performance Analyzer",
-        model=OpenAIChat(
+        model=InstrumentedOpenAIChat(
             id=settings.llm_model,
             api_key=settings.llm_api_key,
             base_url=settings.llm_base_url or None,
+            skill="performance_analyzer",
         ),
-        tools=[
+        tools=skill_tools(
             get_campaign_insights,
             get_breakdown_analysis,
             get_trends_analysis,
             compare_campaigns_performance,
             list_campaigns,
-        ],
+        ),
         instructions=SYSTEM_PROMPT,
         markdown=True,
         show_tool_calls=False,
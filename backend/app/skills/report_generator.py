@@ -3,14 +3,15 @@ Report Generator Skill - Geração de relatórios.
 """
 
 from agno.agent import Agent
-from agno.models.openai import OpenAIChat
 
 from app.config import get_settings
+from app.skills.llm import InstrumentedOpenAIChat
 from app.skills.tools import (
     generate_performance_report,
     generate_budget_report,
     get_account_limits_report,
     get_trends_analysis,
+    skill_tools,
 )
 
 settings = get_settings()
@@ -48,17 +49,18 @@ def create_report_generator_agent() -> Agent:
     """Cria o agente Report Generator."""
     return Agent(
         name="Report Generator",
-        model=OpenAIChat(
+        model=InstrumentedOpenAIChat(
             id=settings.llm_model,
             api_key=settings.llm_api_key,
             base_url=settings.llm_base_url or None,
+            skill="report_generator",
         ),
-        tools=[
+        tools=skill_tools(
             generate_performance_report,
             generate_budget_report,
             get_account_limits_report,
             get_trends_analysis,
-        ],
+        ),
         instructions=SYSTEM_PROMPT,
         markdown=True,
         show_tool_calls=False,
@@ -2,34 +2,107 @@
 Ferramentas (Tools) para os skills de IA.
 Cada função é uma tool que pode ser usada pelos agentes Agno.
 
-NOTA: Todas as tools devem ser síncronas (def, não async def)
-porque o Agno 1.x não faz await em async tools.
-Usamos _run_async() para executar código assíncrono dentro de funções síncronas.
+As tools são async (async def) e devem ser registradas nos skills com
+skill_tools(), que as executa no event loop da própria requisição.
+As tools pedidas pelo LLM numa mesma resposta rodam em paralelo (o Agno
+as executa com asyncio.gather e devolve os resultados na ordem pedida),
+limitadas por conta de anúncios (tool_max_concurrency_per_account).
 """
 
 import asyncio
+import contextlib
+import functools
+import inspect
 import json
 import logging
+import weakref
 from contextvars import ContextVar
-from typing import Optional
+from typing import Any, Callable, Optional
+
+from agno.tools.function import Function
+
+from app.config import get_settings
+from app.services.tool_loop import get_loop_http_client, get_tool_loop
+from app.services.tracing import span
 from app.tools.meta_api import MetaAPI
 
 logger = logging.getLogger(__name__)
 
 
-def _run_async(coro):
-    """Executa uma coroutine de forma síncrona, compatível com Agno 1.x."""
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        loop = None
+# Semáforos das contas de anúncios, por event loop (event loop -> conta -> semáforo)
+_account_semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _account_semaphore() -> asyncio.Semaphore:
+    """Semáforo da conta de anúncios atual no event loop em execução."""
+    semaphores = _account_semaphores.setdefault(asyncio.get_running_loop(), {})
+    account_id = (get_current_ad_account() or "").removeprefix("act_")
+    semaphore = semaphores.get(account_id)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(get_settings().tool_max_concurrency_per_account)
+        semaphores[account_id] = semaphore
+    return semaphore
+
+
+async def _call_tool(name: str, call: Callable[[], Any], account_slot: bool = True):
+    """
+    Executa uma tool dentro de um span "tool.<nome da tool>", aguardando uma
+    vaga da conta de anúncios atual (a espera fica dentro do span).
+    Com account_slot=False a vaga já foi obtida por quem chamou.
+    """
+    with span(f"tool.{name}"):
+        async with _account_semaphore() if account_slot else contextlib.nullcontext():
+            result = call()
+            while inspect.isawaitable(result):
+                result = await result
+            return result
+
+
+async def _run_tool(name: str, func: Callable, args: dict):
+    """
+    Tool hook dos skills: executa a tool no event loop da requisição.
+
+    O Agno 1.4 embrulha o entrypoint com validate_call, que esconde a
+    corrotina: sem um hook async ele rodaria a tool numa thread e devolveria
+    a corrotina sem await. Com o hook, a chamada passa por aexecute e o
+    resultado é aguardado aqui.
+    """
+    return await _call_tool(name, lambda: func(**args))
 
-    if loop and loop.is_running():
-        import concurrent.futures
-        with concurrent.futures.ThreadPoolExecutor() as pool:
-            return pool.submit(asyncio.run, coro).result()
-    else:
-        return asyncio.run(coro)
+
+def _sync_tool(tool: Callable) -> Callable:
+    """
+    Versão síncrona de uma tool async, executada no loop de fundo
+    (app/services/tool_loop.py). A vaga da conta é obtida antes da vaga
+    global do loop, para uma conta ocupada não prender as vagas das outras.
+    """
+    @functools.wraps(tool)
+    def wrapper(*args, **kwargs):
+        return get_tool_loop().run(
+            _call_tool(tool.__name__, lambda: tool(*args, **kwargs), account_slot=False),
+            gate=_account_semaphore,
+        )
+
+    return wrapper
+
+
+def skill_tools(*tools: Callable) -> list[Function]:
+    """
+    Tools de um skill, para o Agent(tools=...) dos create_*_agent.
+
+    Por padrão as tools async rodam no event loop da requisição (mesmo
+    contexto, conexões compartilhadas, sem threads extras). Com
+    agent_async_tools=False, o Agno as executa como funções síncronas em
+    threads, que enviam a corrotina para o loop de fundo.
+    """
+    if not get_settings().agent_async_tools:
+        return [Function.from_callable(_sync_tool(tool)) for tool in tools]
+    functions = []
+    for tool in tools:
+        function = Function.from_callable(tool)
+        function.tool_hooks = [_run_tool]
+        functions.append(function)
+    return functions
 
 
 # Context variable para armazenar ad_account_id atual
@@ -73,9 +146,12 @@ def get_current_ad_account() -> Optional[str]:
 
 
 def get_meta_api(ad_account_id: Optional[str] = None) -> MetaAPI:
-    """Retorna instância do MetaAPI usando contexto atual se não especificado."""
+    """
+    Retorna instância do MetaAPI usando contexto atual se não especificado.
+    Usa o cliente HTTP compartilhado do event loop atual (conexões reaproveitadas).
+    """
     account_id = ad_account_id or get_current_ad_account()
-    return MetaAPI(ad_account_id=account_id)
+    return MetaAPI(ad_account_id=account_id, client=get_loop_http_client())
 
 
 # ============================================
@@ -83,7 +159,7 @@ def get_meta_api(ad_account_id: Optional[str] = None) -> MetaAPI:
 # ============================================
 
 
-def create_campaign(
+async def create_campaign(
     name: str,
     objective: str,
     daily_budget: Optional[float] = None,
@@ -121,12 +197,12 @@ def create_campaign(
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": format_error(e)}, ensure_ascii=False)
 
 
-def create_ad_set(
+async def create_ad_set(
     campaign_id: str,
     name: str,
     daily_budget: int,
@@ -167,12 +243,12 @@ def create_ad_set(
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
-def create_ad(
+async def create_ad(
     ad_set_id: str,
     name: str,
     creative_id: str,
@@ -204,7 +280,7 @@ def create_ad(
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
@@ -214,7 +290,7 @@ def create_ad(
 # ============================================
 
 
-def list_campaigns(
+async def list_campaigns(
     status: Optional[str] = None,
     include_archived: bool = False,
 ) -> str:
@@ -251,12 +327,12 @@ def list_campaigns(
         return json.dumps({"success": True, "campaigns": result, "total": len(result)}, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
-def get_campaign_details(campaign_id: str) -> str:
+async def get_campaign_details(campaign_id: str) -> str:
     """
     Obtém detalhes completos de uma campanha.
 
@@ -294,12 +370,12 @@ def get_campaign_details(campaign_id: str) -> str:
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
-def update_campaign_status(campaign_id: str, status: str) -> str:
+async def update_campaign_status(campaign_id: str, status: str) -> str:
     """
     Atualiza o status de uma campanha (ativar/pausar/arquivar).
 
@@ -338,12 +414,12 @@ def update_campaign_status(campaign_id: str, status: str) -> str:
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": format_error(e)}, ensure_ascii=False)
 
 
-def update_campaign_budget(campaign_id: str, daily_budget: float) -> str:
+async def update_campaign_budget(campaign_id: str, daily_budget: float) -> str:
     """
     Atualiza o orçamento diário de uma campanha.
 
@@ -365,12 +441,12 @@ def update_campaign_budget(campaign_id: str, daily_budget: float) -> str:
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
-def duplicate_campaign(
+async def duplicate_campaign(
     campaign_id: str,
     count: int = 1,
     include_ads: bool = True,
@@ -415,7 +491,7 @@ def duplicate_campaign(
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
@@ -425,7 +501,7 @@ def duplicate_campaign(
 # ============================================
 
 
-def search_interests(query: str, limit: int = 20) -> str:
+async def search_interests(query: str, limit: int = 20) -> str:
     """
     Busca interesses disponíveis para targeting.
 
@@ -447,12 +523,12 @@ def search_interests(query: str, limit: int = 20) -> str:
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
-def search_locations(
+async def search_locations(
     query: str,
     location_types: Optional[list[str]] = None,
 ) -> str:
@@ -477,12 +553,12 @@ def search_locations(
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
-def estimate_audience_reach(
+async def estimate_audience_reach(
     targeting_spec: dict,
     optimization_goal: str = "REACH",
 ) -> str:
@@ -514,7 +590,7 @@ def estimate_audience_reach(
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
@@ -524,7 +600,7 @@ def estimate_audience_reach(
 # ============================================
 
 
-def get_account_spend_summary(date_preset: str = "last_30d") -> str:
+async def get_account_spend_summary(date_preset: str = "last_30d") -> str:
     """
     Obtém resumo de gastos da conta.
 
@@ -553,12 +629,12 @@ def get_account_spend_summary(date_preset: str = "last_30d") -> str:
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
-def get_campaigns_spend_comparison(date_preset: str = "last_7d") -> str:
+async def get_campaigns_spend_comparison(date_preset: str = "last_7d") -> str:
     """
     Compara gastos entre campanhas.
 
@@ -597,12 +673,12 @@ def get_campaigns_spend_comparison(date_preset: str = "last_7d") -> str:
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
-def get_budget_recommendations() -> str:
+async def get_budget_recommendations() -> str:
     """
     Gera recomendações de alocação de orçamento baseado em performance.
 
@@ -645,7 +721,7 @@ def get_budget_recommendations() -> str:
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
@@ -655,7 +731,7 @@ def get_budget_recommendations() -> str:
 # ============================================
 
 
-def get_campaign_insights(
+async def get_campaign_insights(
     campaign_id: str,
     date_preset: str = "last_7d",
 ) -> str:
@@ -689,12 +765,12 @@ def get_campaign_insights(
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
-def get_breakdown_analysis(
+async def get_breakdown_analysis(
     object_id: str,
     breakdown: str,
     date_preset: str = "last_7d",
@@ -739,12 +815,12 @@ def get_breakdown_analysis(
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
-def get_trends_analysis(date_preset: str = "last_7d") -> str:
+async def get_trends_analysis(date_preset: str = "last_7d") -> str:
     """
     Analisa tendências de performance ao longo do tempo.
 
@@ -790,12 +866,12 @@ def get_trends_analysis(date_preset: str = "last_7d") -> str:
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
-def compare_campaigns_performance(
+async def compare_campaigns_performance(
     campaign_ids: list[str],
     date_preset: str = "last_7d",
 ) -> str:
@@ -831,7 +907,7 @@ def compare_campaigns_performance(
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
@@ -841,7 +917,7 @@ def compare_campaigns_performance(
 # ============================================
 
 
-def generate_performance_report(
+async def generate_performance_report(
     date_preset: str = "last_7d",
     include_campaigns: bool = True,
     include_adsets: bool = False,
@@ -900,12 +976,12 @@ def generate_performance_report(
         return json.dumps(report, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
-def generate_budget_report(date_preset: str = "last_30d") -> str:
+async def generate_budget_report(date_preset: str = "last_30d") -> str:
     """
     Gera relatório focado em orçamento e gastos.
 
@@ -951,12 +1027,12 @@ def generate_budget_report(date_preset: str = "last_30d") -> str:
         return json.dumps(report, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
-def get_account_limits_report() -> str:
+async def get_account_limits_report() -> str:
     """
     Gera relatório de limites da conta.
 
@@ -975,7 +1051,7 @@ def get_account_limits_report() -> str:
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
@@ -985,7 +1061,7 @@ def get_account_limits_report() -> str:
 # ============================================
 
 
-def list_creatives(limit: int = 20) -> str:
+async def list_creatives(limit: int = 20) -> str:
     """
     Lista criativos disponíveis na conta.
 
@@ -1016,12 +1092,12 @@ def list_creatives(limit: int = 20) -> str:
         }, ensure_ascii=False)
 
     try:
-        return _run_async(_impl())
+        return await _impl()
     except Exception as e:
         return json.dumps({"success": False, "error": str(e)}, ensure_ascii=False)
 
 
-def get_creative_specs(format_type: str) -> str:
+async def get_creative_specs(format_type: str) -> str:
     """
     Retorna especificações técnicas para um formato de anúncio.
 
@@ -1130,7 +1206,7 @@ def get_creative_specs(format_type: str) -> str:
     }, ensure_ascii=False)
 
 
-def get_creative_best_practices(objective: str) -> str:
+async def get_creative_best_practices(objective: str) -> str:
     """
     Retorna melhores práticas de criativos por objetivo de campanha.
 
@@ -3,9 +3,20 @@ import logging
 import httpx
 import asyncio
 import json
+import time
 from typing import Optional
 from datetime import datetime
 
+from app.config import get_settings
+from app.services.upstream_metrics import (
+    META_THROTTLE_CODES,
+    is_meta_throttle,
+    meta_account_id,
+    meta_endpoint_template,
+    parse_usage_headers,
+    record_upstream_call,
+)
+
 logger = logging.getLogger("meta_api")
 
 # Rate limiting configuration
@@ -25,8 +36,6 @@ class MetaAPIError(Exception):
 class MetaAPI:
     """Cliente para a Meta Marketing API."""
 
-    BASE_URL = "https://graph.facebook.com"
-
     def __init__(
         self,
         ad_account_id: Optional[str] = None,
@@ -34,6 +43,7 @@ class MetaAPI:
         business_id: Optional[str] = None,
         api_version: Optional[str] = None,
         user_id: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
     ):
         """
         Inicializa o cliente Meta API.
@@ -42,9 +52,12 @@ class MetaAPI:
         1. Parâmetros passados no construtor
         2. Configurações JSON (data/settings.json ou settings_{user_id}.json)
         3. Variáveis de ambiente (.env)
+
+        `client` permite compartilhar um cliente HTTP (pool de conexões)
+        entre instâncias; nesse caso close() não o fecha.
         """
         # Import local para evitar circular import
-        from app.api.settings import get_meta_config
+        from app.services.settings_store import get_meta_config
 
         config = get_meta_config(user_id)
 
@@ -53,7 +66,8 @@ class MetaAPI:
         self.business_id = business_id or config.business_id
         self.page_id = config.page_id
         self.api_version = api_version or config.api_version
-        self.client = httpx.AsyncClient(timeout=30.0)
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(timeout=30.0)
 
     def with_account(self, ad_account_id: str) -> "MetaAPI":
         """Retorna uma nova instância com outra conta de anúncios."""
@@ -62,11 +76,12 @@ class MetaAPI:
             access_token=self.access_token,
             business_id=self.business_id,
             api_version=self.api_version,
+            client=None if self._owns_client else self.client,
         )
 
     @property
     def _base_url(self) -> str:
-        return f"{self.BASE_URL}/{self.api_version}"
+        return f"{get_settings().meta_graph_base_url.rstrip('/')}/{self.api_version}"
 
     async def _request(
         self,
@@ -88,87 +103,123 @@ class MetaAPI:
         if params:
             default_params.update(params)
 
-        last_error = None
-        for attempt in range(MAX_RETRIES):
-            try:
-                response = await self.client.request(
-                    method=method,
-                    url=url,
-                    params=default_params,
-                    json=data,
-                )
+        # Telemetria da chamada (registrada no finally, com sucesso ou erro)
+        started = time.monotonic()
+        attempt_started = started
+        attempts = 0
+        status_code = None
+        error_code = None
+        response_bytes = None
+        usage = None
+        throttled = False
 
-                if response.status_code == 429:
-                    retry_delay = BASE_RETRY_DELAY * (2 ** attempt)
-                    logger.warning(
-                        "Meta API rate limit (HTTP 429)",
-                        extra={"endpoint": endpoint, "method": method, "attempt": attempt + 1},
+        try:
+            last_error = None
+            for attempt in range(MAX_RETRIES):
+                attempt_started = time.monotonic()
+                attempts = attempt + 1
+                status_code = error_code = response_bytes = None
+                try:
+                    response = await self.client.request(
+                        method=method,
+                        url=url,
+                        params=default_params,
+                        json=data,
                     )
-                    if attempt < MAX_RETRIES - 1:
-                        await asyncio.sleep(retry_delay)
-                        continue
-                    raise MetaAPIError("Rate limit exceeded after retries", 429)
+                    status_code = response.status_code
+                    response_bytes = len(response.content)
+                    usage = parse_usage_headers(response.headers)
 
-                result = response.json()
-
-                if "error" in result:
-                    error = result["error"]
-                    error_code = error.get("code")
-                    error_subcode = error.get("error_subcode")
-                    error_msg = error.get("message", "Unknown error")
-                    error_user_msg = error.get("error_user_msg") or error.get("error_user_title")
-
-                    # Meta API rate limit error codes: 4, 17, 32, 613
-                    if error_code in [4, 17, 32, 613] and attempt < MAX_RETRIES - 1:
+                    if response.status_code == 429:
+                        throttled = True
                         retry_delay = BASE_RETRY_DELAY * (2 ** attempt)
                         logger.warning(
-                            "Meta API rate limit (error code)",
+                            "Meta API rate limit (HTTP 429)",
+                            extra={"endpoint": endpoint, "method": method, "attempt": attempt + 1},
+                        )
+                        if attempt < MAX_RETRIES - 1:
+                            await asyncio.sleep(retry_delay)
+                            continue
+                        raise MetaAPIError("Rate limit exceeded after retries", 429)
+
+                    result = response.json()
+
+                    if "error" in result:
+                        error = result["error"]
+                        error_code = error.get("code")
+                        error_subcode = error.get("error_subcode")
+                        error_msg = error.get("message", "Unknown error")
+                        error_user_msg = error.get("error_user_msg") or error.get("error_user_title")
+
+                        throttled = throttled or is_meta_throttle(status_code, error_code)
+
+                        # Meta API rate limit error codes: 4, 17, 32, 613
+                        if error_code in META_THROTTLE_CODES and attempt < MAX_RETRIES - 1:
+                            retry_delay = BASE_RETRY_DELAY * (2 ** attempt)
+                            logger.warning(
+                                "Meta API rate limit (error code)",
+                                extra={
+                                    "endpoint": endpoint,
+                                    "error_code": error_code,
+                                    "attempt": attempt + 1,
+                                },
+                            )
+                            await asyncio.sleep(retry_delay)
+                            continue
+
+                        full_msg = error_msg
+                        if error_subcode:
+                            full_msg += f" (subcode: {error_subcode})"
+                        if error_user_msg:
+                            full_msg += f" - {error_user_msg}"
+
+                        logger.error(
+                            "Meta API error response",
                             extra={
                                 "endpoint": endpoint,
+                                "method": method,
                                 "error_code": error_code,
-                                "attempt": attempt + 1,
+                                "error_subcode": error_subcode,
+                                "error_message": error_msg,
+                                "error_type": error.get("type"),
                             },
                         )
-                        await asyncio.sleep(retry_delay)
-                        continue
-
-                    full_msg = error_msg
-                    if error_subcode:
-                        full_msg += f" (subcode: {error_subcode})"
-                    if error_user_msg:
-                        full_msg += f" - {error_user_msg}"
+                        raise MetaAPIError(full_msg, error_code)
 
+                    return result
+                except httpx.HTTPError as e:
+                    last_error = e
                     logger.error(
-                        "Meta API error response",
+                        "Meta API HTTP error",
                         extra={
                             "endpoint": endpoint,
                             "method": method,
-                            "error_code": error_code,
-                            "error_subcode": error_subcode,
-                            "error_message": error_msg,
-                            "error_type": error.get("type"),
+                            "attempt": attempt + 1,
+                            "error": str(e),
                         },
                     )
-                    raise MetaAPIError(full_msg, error_code)
-
-                return result
-            except httpx.HTTPError as e:
-                last_error = e
-                logger.error(
-                    "Meta API HTTP error",
-                    extra={
-                        "endpoint": endpoint,
-                        "method": method,
-                        "attempt": attempt + 1,
-                        "error": str(e),
-                    },
-                )
-                if attempt < MAX_RETRIES - 1:
-                    await asyncio.sleep(BASE_RETRY_DELAY * (2 ** attempt))
-                    continue
-                raise MetaAPIError(f"HTTP error: {str(e)}")
-
-        raise MetaAPIError(f"Request failed after {MAX_RETRIES} attempts: {last_error}")
+                    if attempt < MAX_RETRIES - 1:
+                        await asyncio.sleep(BASE_RETRY_DELAY * (2 ** attempt))
+                        continue
+                    raise MetaAPIError(f"HTTP error: {str(e)}")
+
+            raise MetaAPIError(f"Request failed after {MAX_RETRIES} attempts: {last_error}")
+        finally:
+            finished = time.monotonic()
+            record_upstream_call(
+                "meta",
+                method,
+                meta_endpoint_template(endpoint),
+                (finished - started) * 1000,
+                account_id=meta_account_id(endpoint, self.ad_account_id),
+                attempts=attempts,
+                status_code=status_code,
+                error_code=error_code,
+                response_bytes=response_bytes,
+                usage=usage,
+                throttled=throttled,
+                retry_ms=(attempt_started - started) * 1000,
+            )
 
     async def _upload(
         self,
@@ -188,22 +239,41 @@ class MetaAPI:
         if params:
             default_params.update(params)
 
+        started = time.monotonic()
+        status_code = error_code = response_bytes = usage = None
         try:
             response = await self.client.post(
                 url,
                 files=files,
                 params=default_params,
             )
+            status_code = response.status_code
+            response_bytes = len(response.content)
+            usage = parse_usage_headers(response.headers)
             result = response.json()
 
             if "error" in result:
                 error = result["error"]
+                error_code = error.get("code")
                 error_msg = error.get("message", "Unknown error")
-                raise MetaAPIError(error_msg, error.get("code"))
+                raise MetaAPIError(error_msg, error_code)
 
             return result
         except httpx.HTTPError as e:
             raise MetaAPIError(f"Upload error: {str(e)}")
+        finally:
+            record_upstream_call(
+                "meta",
+                "POST",
+                meta_endpoint_template(endpoint),
+                (time.monotonic() - started) * 1000,
+                account_id=meta_account_id(endpoint, self.ad_account_id),
+                status_code=status_code,
+                error_code=error_code,
+                response_bytes=response_bytes,
+                usage=usage,
+                throttled=is_meta_throttle(status_code, error_code),
+            )
 
     async def get_pages(self) -> list[dict]:
         """Lista Facebook Pages disponíveis para o usuário."""
@@ -311,14 +381,33 @@ class MetaAPI:
         # Paginação - buscar próximas páginas
         while "paging" in result and "next" in result["paging"]:
             next_url = result["paging"]["next"]
+            started = time.monotonic()
+            status_code = error_code = response_bytes = usage = None
             try:
                 response = await self.client.get(next_url)
+                status_code = response.status_code
+                response_bytes = len(response.content)
+                usage = parse_usage_headers(response.headers)
                 result = response.json()
                 if "error" in result:
+                    error_code = result["error"].get("code")
                     break
                 all_campaigns.extend(result.get("data", []))
             except Exception:
                 break
+            finally:
+                record_upstream_call(
+                    "meta",
+                    "GET",
+                    "{ad_account_id}/campaigns",
+                    (time.monotonic() - started) * 1000,
+                    account_id=meta_account_id("", self.ad_account_id),
+                    status_code=status_code,
+                    error_code=error_code,
+                    response_bytes=response_bytes,
+                    usage=usage,
+                    throttled=is_meta_throttle(status_code, error_code),
+                )
 
         return all_campaigns
 
@@ -1349,5 +1438,6 @@ class MetaAPI:
         return result.get("data", [])
 
     async def close(self):
-        """Fecha o cliente HTTP."""
-        await self.client.aclose()
+        """Fecha o cliente HTTP (se não for compartilhado)."""
+        if self._owns_client:
+            await self.client.aclose()
@@ -0,0 +1,808 @@
+"""
+Fake Meta Graph API server for offline load tests (no real quota is used).
+
+Serves a deterministic synthetic tree of ad accounts -> campaigns -> ad sets
+-> ads, with insights generated per object and day, covering the requests
+MetaAPI makes:
+
+- objects and edges: act_<id>, act_<id>/campaigns|adsets|ads|adcreatives,
+  <campaign>/adsets, <adset>/ads, <object_id>, me/accounts,
+  <business>/owned_ad_accounts, search, reachestimate
+- field expansion: `campaign{id,name}`, `insights.date_preset(last_7d){spend,...}`
+- insights: `date_preset`, `time_increment=1` (one row per day), `breakdowns`
+- `filtering` on effective_status, `limit` + cursor paging (`paging.next`),
+  `summary=true`
+- batch requests (POST / with `batch=[...]`)
+- X-App-Usage / X-Ad-Account-Usage / X-Business-Use-Case-Usage headers from
+  a per-account sliding window of calls, optionally enforced (code 80000/80004)
+- injected latency (+ extra for insights), throttling errors (code 17) and
+  HTTP 429s at configurable rates
+
+Control endpoints (not part of the Graph API): GET /_fake/ids (object ids to
+build requests from), GET /_fake/stats and POST /_fake/reset.
+
+    python -m benchmarks.fake_graph_api --port 8900 --campaigns 50 --latency-ms 80
+
+then start the backend with META_GRAPH_BASE_URL=http://localhost:8900 (any
+access token is accepted).
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import re
+import time
+import uuid
+import zlib
+from collections import Counter, deque
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+CAMPAIGN_ID_BASE = 23850000000000
+ADSET_ID_BASE = 23860000000000
+AD_ID_BASE = 23870000000000
+CREATIVE_ID_BASE = 23880000000000
+ACCOUNT_ID_BASE = 1000000000
+BUSINESS_ID = "555000000000001"
+
+OBJECTIVES = ["OUTCOME_SALES", "OUTCOME_LEADS", "OUTCOME_TRAFFIC", "OUTCOME_ENGAGEMENT", "OUTCOME_AWARENESS"]
+STATUSES = ["ACTIVE"] * 6 + ["PAUSED"] * 3 + ["ARCHIVED"]
+
+BREAKDOWN_VALUES = {
+    "age": ["18-24", "25-34", "35-44", "45-54", "55-64", "65+"],
+    "gender": ["1", "2", "unknown"],
+    "country": ["BR", "PT", "US", "AR", "MX"],
+    "region": ["São Paulo", "Rio de Janeiro", "Minas Gerais", "Paraná"],
+    "publisher_platform": ["facebook", "instagram", "audience_network", "messenger"],
+    "platform_position": ["feed", "story", "reels", "right_hand_column"],
+    "device_platform": ["mobile", "desktop"],
+}
+
+MAX_BATCH = 50
+DEFAULT_LIMIT = 25
+USAGE_WINDOW_SECONDS = 60
+
+
+@dataclass
+class FakeGraphConfig:
+    accounts: int = 2
+    campaigns: int = 30  # Per account
+    adsets: int = 3  # Per campaign
+    ads: int = 3  # Per ad set
+    latency_ms: float = 50
+    jitter_ms: float = 20
+    insights_latency_ms: float = 100  # Extra latency of insights requests
+    throttle_rate: float = 0.0  # Fraction answered with error code 17 (HTTP 400)
+    http_429_rate: float = 0.0  # Fraction answered with HTTP 429
+    budget_per_minute: int = 600  # Calls per account and minute that make usage 100%
+    enforce_budget: bool = False  # Answer code 80000/80004 while usage >= 100%
+    max_page_size: int = 500
+    seed: int = 42
+
+
+class GraphError(Exception):
+    def __init__(self, message: str, code: int, status_code: int = 400, error_type: str = "OAuthException"):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.status_code = status_code
+        self.error_type = error_type
+
+    def body(self) -> dict:
+        return {
+            "error": {
+                "message": self.message,
+                "type": self.error_type,
+                "code": self.code,
+                "fbtrace_id": uuid.uuid4().hex[:11],
+            }
+        }
+
+
+# ----------------------------------------
+# Request parsing
+# ----------------------------------------
+
+def split_top_level(value: str) -> list[str]:
+    """Splits a fields string on commas outside braces/parentheses."""
+    parts, depth, current = [], 0, []
+    for char in value:
+        if char in "{(":
+            depth += 1
+        elif char in "})":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if current:
+        parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+_FIELD_PATTERN = re.compile(r"^(?P<name>[a-z_]+)(?P<modifiers>(?:\.[a-z_]+\([^)]*\))*)(?:\{(?P<sub>.*)\})?$")
+_MODIFIER_PATTERN = re.compile(r"\.([a-z_]+)\(([^)]*)\)")
+
+
+def parse_fields(value: Optional[str]) -> dict[str, tuple[dict, dict]]:
+    """`id,campaign{id,name},insights.date_preset(last_7d){spend}` -> {name: (modifiers, subfields)}."""
+    fields = {}
+    for part in split_top_level(value or ""):
+        match = _FIELD_PATTERN.match(part)
+        if not match:
+            raise GraphError(f"Syntax error \"Expected end of string instead of \\\"{part}\\\".\"", 2500)
+        modifiers = dict(_MODIFIER_PATTERN.findall(match.group("modifiers") or ""))
+        fields[match.group("name")] = (modifiers, parse_fields(match.group("sub")) if match.group("sub") else {})
+    return fields
+
+
+def preset_days(preset: str, today: date) -> list[date]:
+    """Days covered by a date_preset."""
+    if preset == "today":
+        return [today]
+    if preset == "yesterday":
+        return [today - timedelta(days=1)]
+    if preset == "this_month":
+        start = today.replace(day=1)
+    elif preset == "last_month":
+        end = today.replace(day=1) - timedelta(days=1)
+        start = end.replace(day=1)
+        return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    elif preset == "maximum":
+        start = today - timedelta(days=365)
+    else:
+        match = re.fullmatch(r"last_(\d+)d", preset)
+        if not match:
+            raise GraphError("(#100) date_preset must be one of the following values: today, yesterday, this_month, last_month, last_Nd, maximum", 100)
+        count = int(match.group(1))
+        return [today - timedelta(days=count - i) for i in range(count)]
+    return [start + timedelta(days=i) for i in range((today - start).days + 1)]
+
+
+def _day_factor(seed: int, day: date) -> float:
+    """Deterministic daily variation (0.7..1.3) of an object's metrics."""
+    return 0.7 + ((seed ^ (day.toordinal() * 2654435761)) % 600) / 1000
+
+
+# ----------------------------------------
+# Synthetic data
+# ----------------------------------------
+
+class FakeGraphStore:
+    """Synthetic ad accounts and their objects, generated from a seed."""
+
+    def __init__(self, config: FakeGraphConfig):
+        self.config = config
+        self.objects: dict[str, dict] = {}
+        self.children: dict[str, dict[str, list[str]]] = {}  # parent id -> edge -> ids
+        self.accounts: list[str] = []
+        self._ids = Counter()
+        self._generate()
+
+    def _new_id(self, base: int, kind: str) -> str:
+        self._ids[kind] += 1
+        return str(base + self._ids[kind])
+
+    def _add(self, obj: dict, *parents: tuple[str, str]):
+        self.objects[obj["id"]] = obj
+        for parent_id, edge in parents:
+            self.children.setdefault(parent_id, {}).setdefault(edge, []).append(obj["id"])
+
+    def _generate(self):
+        rng = random.Random(self.config.seed)
+        created = "2025-01-15T10:00:00-0300"
+        for a in range(self.config.accounts):
+            account_id = str(ACCOUNT_ID_BASE + a + 1)
+            account = f"act_{account_id}"
+            self.accounts.append(account)
+            self._add({
+                "_type": "account",
+                "id": account,
+                "account_id": account_id,
+                "name": f"Conta de Teste {a + 1}",
+                "account_status": 1,
+                "currency": "BRL",
+                "amount_spent": str(rng.randint(100000, 9000000)),
+                "business_name": "Empresa de Teste",
+            })
+            for c in range(self.config.campaigns):
+                status = rng.choice(STATUSES)
+                campaign = {
+                    "_type": "campaign",
+                    "_account": account,
+                    "id": self._new_id(CAMPAIGN_ID_BASE, "campaign"),
+                    "name": f"Campanha {a + 1}.{c + 1} - {rng.choice(['Vendas', 'Leads', 'Tráfego', 'Remarketing'])}",
+                    "objective": rng.choice(OBJECTIVES),
+                    "status": status,
+                    "effective_status": status,
+                    "daily_budget": str(rng.choice([2000, 5000, 10000, 25000])),
+                    "buying_type": "AUCTION",
+                    "special_ad_categories": [],
+                    "created_time": created,
+                    "updated_time": created,
+                }
+                self._add(campaign, (account, "campaigns"))
+                for s in range(self.config.adsets):
+                    adset_status = status if rng.random() < 0.8 else "PAUSED"
+                    adset = {
+                        "_type": "adset",
+                        "_account": account,
+                        "id": self._new_id(ADSET_ID_BASE, "adset"),
+                        "name": f"Conjunto {s + 1} - {campaign['name']}",
+                        "status": adset_status,
+                        "effective_status": adset_status if status == "ACTIVE" else "CAMPAIGN_PAUSED",
+                        "campaign_id": campaign["id"],
+                        "daily_budget": str(rng.choice([1000, 2000, 5000])),
+                        "billing_event": "IMPRESSIONS",
+                        "optimization_goal": rng.choice(["OFFSITE_CONVERSIONS", "LEAD_GENERATION", "LINK_CLICKS", "REACH"]),
+                        "targeting": {
+                            "geo_locations": {"countries": ["BR"]},
+                            "age_min": rng.choice([18, 25]),
+                            "age_max": rng.choice([45, 65]),
+                        },
+                        "created_time": created,
+                        "updated_time": created,
+                    }
+                    self._add(adset, (account, "adsets"), (campaign["id"], "adsets"))
+                    for d in range(self.config.ads):
+                        creative = {
+                            "_type": "creative",
+                            "_account": account,
+                            "id": self._new_id(CREATIVE_ID_BASE, "creative"),
+                            "name": f"Criativo {d + 1}",
+                            "object_type": rng.choice(["SHARE", "VIDEO", "PHOTO"]),
+                            "thumbnail_url": "https://example.com/thumb.jpg",
+                            "image_url": "https://example.com/image.jpg",
+                            "status": "ACTIVE",
+                            "title": "Oferta especial",
+                            "body": "Aproveite o desconto desta semana.",
+                        }
+                        self._add(creative, (account, "adcreatives"))
+                        ad_status = adset_status if rng.random() < 0.85 else "PAUSED"
+                        ad = {
+                            "_type": "ad",
+                            "_account": account,
+                            "id": self._new_id(AD_ID_BASE, "ad"),
+                            "name": f"Anúncio {d + 1} - {adset['name']}",
+                            "status": ad_status,
+                            "effective_status": ad_status if adset["effective_status"] == "ACTIVE" else "ADSET_PAUSED",
+                            "campaign_id": campaign["id"],
+                            "adset_id": adset["id"],
+                            "_creative": creative["id"],
+                            "created_time": created,
+                            "updated_time": created,
+                            "_base": self._ad_base(rng),
+                        }
+                        self._add(ad, (account, "ads"), (adset["id"], "ads"))
+
+        # Parents aggregate the daily base of their ads
+        for obj in list(self.objects.values()):
+            if obj["_type"] != "ad":
+                continue
+            for parent_id in (obj["adset_id"], obj["campaign_id"], obj["_account"]):
+                parent = self.objects[parent_id]
+                base = parent.setdefault("_base", dict.fromkeys(obj["_base"], 0.0))
+                for key, value in obj["_base"].items():
+                    base[key] += value
+
+    @staticmethod
+    def _ad_base(rng: random.Random) -> dict:
+        """Daily metrics of an ad before the daily variation."""
+        impressions = rng.randint(300, 6000)
+        clicks = impressions * rng.uniform(0.004, 0.03)
+        spend = clicks * rng.uniform(0.4, 3.5)
+        purchases = clicks * rng.uniform(0, 0.04)
+        return {
+            "impressions": impressions,
+            "clicks": clicks,
+            "spend": spend,
+            "leads": clicks * rng.uniform(0, 0.08),
+            "purchases": purchases,
+            "revenue": purchases * rng.uniform(60, 400),
+            "landing_page_views": clicks * rng.uniform(0.5, 0.9),
+            "video_views": impressions * rng.uniform(0, 0.2),
+        }
+
+    def insight_rows(
+        self,
+        obj: dict,
+        preset: str,
+        fields: dict,
+        time_increment: Optional[str] = None,
+        breakdowns: Optional[list[str]] = None,
+    ) -> list[dict]:
+        base = obj.get("_base")
+        if base is None:
+            return []
+        days = preset_days(preset, date.today())
+        seed = zlib.crc32(obj["id"].encode())
+        periods = [[day] for day in days] if time_increment == "1" else [days]
+
+        splits: list[tuple[dict, float]] = [({}, 1.0)]
+        for breakdown in breakdowns or []:
+            values = BREAKDOWN_VALUES.get(breakdown)
+            if values is None:
+                raise GraphError(f"(#100) {breakdown} is not a valid breakdown field", 100)
+            weights = [(seed >> i) % 7 + 1 + len(values) - i for i in range(len(values))]
+            total = sum(weights)
+            splits = [
+                ({**labels, breakdown: value}, share * weight / total)
+                for labels, share in splits
+                for value, weight in zip(values, weights)
+            ]
+
+        rows = []
+        for period in periods:
+            factor = sum(_day_factor(seed, day) for day in period)
+            for labels, share in splits:
+                row = self._insight_row(obj, base, factor * share, len(period))
+                row.update(labels)
+                row["date_start"] = period[0].isoformat()
+                row["date_stop"] = period[-1].isoformat()
+                rows.append(self._select(row, fields, keep=("date_start", "date_stop", *labels)))
+        return rows
+
+    @staticmethod
+    def _insight_row(obj: dict, base: dict, scale: float, day_count: int) -> dict:
+        impressions = int(base["impressions"] * scale)
+        clicks = int(base["clicks"] * scale)
+        spend = base["spend"] * scale
+        reach = max(int(impressions / (1.1 + 0.02 * day_count)), 1 if impressions else 0)
+        leads = int(base["leads"] * scale)
+        purchases = int(base["purchases"] * scale)
+        revenue = base["revenue"] * scale
+        actions = [
+            {"action_type": "link_click", "value": str(clicks)},
+            {"action_type": "landing_page_view", "value": str(int(base["landing_page_views"] * scale))},
+        ]
+        if leads:
+            actions.append({"action_type": "lead", "value": str(leads)})
+        if purchases:
+            actions.append({"action_type": "purchase", "value": str(purchases)})
+            actions.append({"action_type": "omni_purchase", "value": str(purchases)})
+        row = {
+            "spend": f"{spend:.2f}",
+            "impressions": str(impressions),
+            "clicks": str(clicks),
+            "reach": str(reach),
+            "frequency": f"{impressions / reach:.6f}" if reach else "0",
+            "ctr": f"{clicks / impressions * 100:.6f}" if impressions else "0",
+            "cpc": f"{spend / clicks:.6f}" if clicks else None,
+            "cpm": f"{spend / impressions * 1000:.6f}" if impressions else None,
+            "cpp": f"{spend / reach * 1000:.6f}" if reach else None,
+            "conversions": str(leads + purchases),
+            "actions": actions,
+            "cost_per_action_type": [
+                {"action_type": action["action_type"], "value": f"{spend / int(action['value']):.6f}"}
+                for action in actions
+                if int(action["value"])
+            ],
+            "purchase_roas": [{"action_type": "omni_purchase", "value": f"{revenue / spend:.6f}"}] if purchases and spend else None,
+            "video_play_actions": [{"action_type": "video_view", "value": str(int(base["video_views"] * scale))}],
+        }
+        kind = obj["_type"]
+        if kind == "campaign":
+            row.update(campaign_id=obj["id"], campaign_name=obj["name"])
+        elif kind == "adset":
+            row.update(campaign_id=obj["campaign_id"], adset_id=obj["id"], adset_name=obj["name"])
+        elif kind == "ad":
+            row.update(campaign_id=obj["campaign_id"], adset_id=obj["adset_id"], ad_id=obj["id"], ad_name=obj["name"])
+        elif kind == "account":
+            row["account_id"] = obj["account_id"]
+        return row
+
+    @staticmethod
+    def _select(row: dict, fields: dict, keep: tuple = ()) -> dict:
+        """Requested fields only (Graph omits empty ones)."""
+        if not fields:
+            return {key: value for key, value in row.items() if value is not None}
+        return {key: row[key] for key in (*fields, *keep) if row.get(key) is not None}
+
+    def render(self, obj: dict, fields: dict) -> dict:
+        """Object with the requested fields, expanding related objects and insights."""
+        if not fields:
+            fields = {"id": ({}, {}), "name": ({}, {})}
+        result = {}
+        for name, (modifiers, subfields) in fields.items():
+            if name == "insights":
+                rows = self.insight_rows(obj, modifiers.get("date_preset", "last_30d"), subfields)
+                if rows:
+                    result["insights"] = {"data": rows, "paging": {"cursors": {"before": "MAZDZD", "after": "MAZDZD"}}}
+            elif name in ("campaign", "adset") and f"{name}_id" in obj:
+                result[name] = self.render(self.objects[obj[f"{name}_id"]], subfields)
+            elif name == "creative" and "_creative" in obj:
+                result[name] = self.render(self.objects[obj["_creative"]], subfields or {"id": ({}, {})})
+            elif not name.startswith("_") and obj.get(name) is not None:
+                result[name] = obj[name]
+        return result
+
+
+def _matches(obj: dict, filtering: list) -> bool:
+    for rule in filtering:
+        value = obj.get(rule.get("field"))
+        operator = rule.get("operator")
+        expected = rule.get("value")
+        if operator == "IN" and value not in expected:
+            return False
+        if operator == "NOT_IN" and value in expected:
+            return False
+        if operator == "EQUAL" and value != expected:
+            return False
+    return True
+
+
+# ----------------------------------------
+# Server
+# ----------------------------------------
+
+class FakeGraphAPI:
+    """Request dispatch, usage accounting, fault injection and stats."""
+
+    def __init__(self, config: FakeGraphConfig):
+        self.config = config
+        self.store = FakeGraphStore(config)
+        self._rng = random.Random(config.seed)
+        self._windows: dict[str, deque] = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.started = time.monotonic()
+        self.stats = Counter()
+        self.by_endpoint = Counter()
+
+    # --- usage headers ---
+
+    def _usage_pct(self, key: str) -> float:
+        window = self._windows.setdefault(key, deque())
+        now = time.monotonic()
+        window.append(now)
+        while window and window[0] < now - USAGE_WINDOW_SECONDS:
+            window.popleft()
+        return round(len(window) / self.config.budget_per_minute * 100, 1)
+
+    def _usage_headers(self, account: Optional[str]) -> tuple[dict, float]:
+        app_pct = self._usage_pct("app")
+        headers = {"x-app-usage": json.dumps({"call_count": min(app_pct, 100), "total_cputime": min(app_pct / 2, 100), "total_time": min(app_pct / 2, 100)})}
+        if account is None:
+            return headers, 0.0
+        pct = self._usage_pct(account)
+        headers["x-ad-account-usage"] = json.dumps({"acc_id_util_pct": min(pct, 100), "reset_time_duration": 0})
+        headers["x-business-use-case-usage"] = json.dumps({
+            account.removeprefix("act_"): [{
+                "type": "ads_insights",
+                "call_count": min(pct, 100),
+                "total_cputime": min(pct / 3, 100),
+                "total_time": min(pct / 2, 100),
+                "estimated_time_to_regain_access": 1 if pct >= 100 else 0,
+            }]
+        })
+        return headers, pct
+
+    # --- dispatch ---
+
+    def _account_of(self, segments: list[str]) -> Optional[str]:
+        if not segments:
+            return None
+        head = segments[0]
+        if head.startswith("act_"):
+            return head
+        obj = self.store.objects.get(head)
+        return obj.get("_account") if obj else None
+
+    def _edge(self, parent_id: str, edge: str, params: dict, base_url: str) -> dict:
+        if parent_id not in self.store.objects:
+            raise GraphError(f"(#100) Tried accessing nonexisting field ({edge}) on node type (Unknown)", 100)
+        ids = self.store.children.get(parent_id, {}).get(edge, [])
+        objects = [self.store.objects[object_id] for object_id in ids]
+        if params.get("filtering"):
+            try:
+                filtering = json.loads(params["filtering"])
+            except ValueError:
+                raise GraphError("(#100) param filtering must be a valid JSON array", 100)
+            objects = [obj for obj in objects if _matches(obj, filtering)]
+
+        summary = {"total_count": len(objects)} if params.get("summary") == "true" else None
+        limit = min(int(params.get("limit", DEFAULT_LIMIT)), self.config.max_page_size)
+        offset = int(base64.urlsafe_b64decode(params["after"]).decode()) if params.get("after") else 0
+        fields = parse_fields(params.get("fields"))
+
+        page = objects[offset:offset + limit] if limit else []
+        result: dict = {"data": [self.store.render(obj, fields) for obj in page]}
+        if page:
+            after = offset + len(page)
+            result["paging"] = {
+                "cursors": {
+                    "before": base64.urlsafe_b64encode(str(offset).encode()).decode(),
+                    "after": base64.urlsafe_b64encode(str(after).encode()).decode(),
+                },
+            }
+            if after < len(objects):
+                next_params = {**params, "after": result["paging"]["cursors"]["after"]}
+                result["paging"]["next"] = f"{base_url}/{parent_id}/{edge}?{urlencode(next_params)}"
+        if summary is not None:
+            result["summary"] = summary
+        return result
+
+    def handle(self, method: str, segments: list[str], params: dict, body: dict, base_url: str) -> dict:
+        """Graph response body for one (non-batch) request; raises GraphError."""
+        if not params.get("access_token"):
+            raise GraphError("An active access token must be used to query information about the current user.", 2500)
+        if not segments:
+            raise GraphError("(#100) Unsupported request", 100)
+
+        head, rest = segments[0], segments[1:]
+        store = self.store
+
+        if head == "me" and rest == ["accounts"]:
+            return {"data": [{"id": "100200300400500", "name": "Página de Teste"}]}
+        if head == "search":
+            if params.get("type") == "adinterest":
+                query = params.get("q", "")
+                return {"data": [
+                    {"id": str(6003000000000 + i), "name": f"{query.title()} {i}", "audience_size_lower_bound": 100000 * i,
+                     "audience_size_upper_bound": 150000 * i, "path": ["Interesses", query.title()], "topic": query.title()}
+                    for i in range(1, min(int(params.get("limit", 20)), 10) + 1)
+                ]}
+            return {"data": []}
+        if rest == ["owned_ad_accounts"] and head not in store.objects:
+            fields = parse_fields(params.get("fields"))
+            return {"data": [store.render(store.objects[account], fields) for account in store.accounts]}
+
+        if head.startswith("act_") and head not in store.objects:
+            raise GraphError(f"(#100) Ad account {head} does not exist or you don't have access to it", 100)
+
+        if method == "GET":
+            if not rest:
+                obj = store.objects.get(head)
+                if obj is None:
+                    raise GraphError(f"Unsupported get request. Object with ID '{head}' does not exist", 100, error_type="GraphMethodException")
+                return store.render(obj, parse_fields(params.get("fields")))
+            edge = rest[0]
+            if edge == "insights":
+                obj = store.objects.get(head)
+                if obj is None:
+                    raise GraphError(f"Unsupported get request. Object with ID '{head}' does not exist", 100, error_type="GraphMethodException")
+                breakdowns = [b for b in params.get("breakdowns", "").split(",") if b]
+                rows = store.insight_rows(
+                    obj,
+                    params.get("date_preset", "last_30d"),
+                    parse_fields(params.get("fields")),
+                    time_increment=params.get("time_increment"),
+                    breakdowns=breakdowns,
+                )
+                return {"data": rows, "paging": {"cursors": {"before": "MAZDZD", "after": "MAZDZD"}}}
+            if edge == "reachestimate":
+                return {"data": {"users_lower_bound": 1200000, "users_upper_bound": 1400000, "estimate_ready": True}}
+            return self._edge(head, edge, params, base_url)
+
+        if method == "POST":
+            if not rest:
+                obj = store.objects.get(head)
+                if obj is None:
+                    raise GraphError(f"Unsupported post request. Object with ID '{head}' does not exist", 100, error_type="GraphMethodException")
+                obj.update({key: value for key, value in body.items() if key in ("name", "status", "daily_budget", "lifetime_budget")})
+                if "status" in body:
+                    obj["effective_status"] = body["status"]
+                return {"success": True}
+            edge = rest[0]
+            if edge == "adimages":
+                return {"images": {"ad_image.jpg": {"hash": uuid.uuid4().hex, "url": "https://example.com/image.jpg"}}}
+            kinds = {"campaigns": ("campaign", CAMPAIGN_ID_BASE), "adsets": ("adset", ADSET_ID_BASE), "ads": ("ad", AD_ID_BASE), "adcreatives": ("creative", CREATIVE_ID_BASE)}
+            if edge in kinds:
+                kind, id_base = kinds[edge]
+                obj = {
+                    "_type": kind,
+                    "_account": head,
+                    "id": store._new_id(id_base, kind),
+                    "name": body.get("name", f"Novo {kind}"),
+                    "status": body.get("status", "PAUSED"),
+                    "effective_status": body.get("status", "PAUSED"),
+                    "created_time": time.strftime("%Y-%m-%dT%H:%M:%S-0300"),
+                }
+                obj["updated_time"] = obj["created_time"]
+                parents = [(head, edge)]
+                for parent_key, parent_edge in (("campaign_id", "adsets"), ("adset_id", "ads")):
+                    if body.get(parent_key) in store.objects and kind != "creative":
+                        obj[parent_key] = body[parent_key]
+                        parents.append((body[parent_key], parent_edge))
+                store._add(obj, *parents)
+                return {"id": obj["id"]}
+            raise GraphError(f"(#100) Unsupported post request to edge {edge}", 100)
+
+        if method == "DELETE":
+            obj = store.objects.get(head)
+            if obj is not None:
+                obj["status"] = obj["effective_status"] = "DELETED"
+            return {"success": True}
+
+        raise GraphError(f"(#100) Unsupported method {method}", 100)
+
+    def endpoint_template(self, method: str, segments: list[str]) -> str:
+        path = "/".join(segments)
+        path = re.sub(r"\bact_\d+", "act_{id}", path)
+        path = re.sub(r"(?<![\w{])\d{6,}", "{id}", path)
+        return f"{method} /{path}"
+
+    async def respond(self, method: str, segments: list[str], params: dict, body: dict, base_url: str) -> tuple[int, dict, dict]:
+        """(status, headers, body) of one request, with latency, usage and injected faults."""
+        config = self.config
+        template = self.endpoint_template(method, segments)
+        self.stats["requests"] += 1
+        self.by_endpoint[template] += 1
+
+        latency = config.latency_ms + self._rng.uniform(-config.jitter_ms, config.jitter_ms)
+        if segments[-1:] == ["insights"] or "insights" in params.get("fields", ""):
+            latency += config.insights_latency_ms
+        await asyncio.sleep(max(latency, 0) / 1000)
+
+        account = self._account_of(segments)
+        headers, pct = self._usage_headers(account)
+
+        try:
+            roll = self._rng.random()
+            if roll < config.http_429_rate:
+                self.stats["http_429"] += 1
+                raise GraphError("Too many requests", 4, status_code=429)
+            if roll < config.http_429_rate + config.throttle_rate:
+                self.stats["throttled"] += 1
+                raise GraphError("(#17) User request limit reached", 17)
+            if config.enforce_budget and pct >= 100:
+                self.stats["budget_exceeded"] += 1
+                code = 80000 if "insights" in template else 80004
+                raise GraphError("There have been too many calls from this ad-account. Wait a bit and try again.", code)
+            return 200, headers, self.handle(method, segments, params, body, base_url)
+        except GraphError as e:
+            self.stats["errors"] += 1
+            return e.status_code, headers, e.body()
+
+    async def batch(self, raw_batch: str, access_token: Optional[str], base_url: str) -> tuple[int, dict, object]:
+        try:
+            requests = json.loads(raw_batch)
+        except ValueError:
+            error = GraphError("(#100) The parameter batch must be a valid JSON array", 100)
+            return error.status_code, {}, error.body()
+        if not isinstance(requests, list) or len(requests) > MAX_BATCH:
+            error = GraphError(f"(#100) Too many requests in batch message. Maximum batch size is {MAX_BATCH}", 100)
+            return error.status_code, {}, error.body()
+
+        self.stats["batches"] += 1
+
+        async def run(item: dict) -> dict:
+            url = urlsplit(item.get("relative_url", ""))
+            segments = [segment for segment in url.path.split("/") if segment]
+            if segments and re.fullmatch(r"v\d+\.\d+", segments[0]):
+                segments = segments[1:]
+            params = dict(parse_qsl(url.query))
+            params.setdefault("access_token", access_token or "")
+            body = dict(parse_qsl(item.get("body", "")))
+            status, headers, result = await self.respond(item.get("method", "GET").upper(), segments, params, body, base_url)
+            return {
+                "code": status,
+                "headers": [{"name": "Content-Type", "value": "application/json"}]
+                + [{"name": name, "value": value} for name, value in headers.items()],
+                "body": json.dumps(result),
+            }
+
+        results = await asyncio.gather(*(run(item) for item in requests))
+        return 200, {}, list(results)
+
+    def snapshot_stats(self) -> dict:
+        return {
+            "uptime_seconds": round(time.monotonic() - self.started, 2),
+            **self.stats,
+            "by_endpoint": dict(self.by_endpoint.most_common()),
+        }
+
+    def ids(self, limit: int) -> dict:
+        """Object ids per account, for load tests to build requests from."""
+        store = self.store
+        accounts = []
+        for account in store.accounts:
+            campaigns = store.children.get(account, {}).get("campaigns", [])
+            adsets = [
+                [campaign_id, adset_id]
+                for campaign_id in campaigns
+                for adset_id in store.children.get(campaign_id, {}).get("adsets", [])
+            ]
+            accounts.append({
+                "id": account,
+                "account_id": store.objects[account]["account_id"],
+                "campaigns": [
+                    {"id": campaign_id, "name": store.objects[campaign_id]["name"], "status": store.objects[campaign_id]["effective_status"]}
+                    for campaign_id in campaigns[:limit]
+                ],
+                "adsets": adsets[:limit],
+            })
+        return {"business_id": BUSINESS_ID, "accounts": accounts}
+
+
+def create_app(config: FakeGraphConfig) -> Starlette:
+    fake = FakeGraphAPI(config)
+
+    async def graph(request: Request):
+        segments = [segment for segment in request.path_params["path"].split("/") if segment]
+        if segments and re.fullmatch(r"v\d+\.\d+", segments[0]):
+            version, segments = segments[0], segments[1:]
+        else:
+            version = "v22.0"
+        base_url = f"{str(request.base_url).rstrip('/')}/{version}"
+
+        params = dict(request.query_params)
+        body: dict = {}
+        if request.method == "POST":
+            content_type = request.headers.get("content-type", "")
+            if content_type.startswith("application/json"):
+                body = await request.json() or {}
+            else:
+                form = await request.form()
+                body = {key: value for key, value in form.items() if isinstance(value, str)}
+            params.setdefault("access_token", body.pop("access_token", ""))
+
+        if request.method == "POST" and not segments and "batch" in body:
+            status, headers, result = await fake.batch(body["batch"], params.get("access_token"), base_url)
+        else:
+            status, headers, result = await fake.respond(request.method, segments, params, body, base_url)
+        return JSONResponse(result, status_code=status, headers=headers)
+
+    async def ids(request: Request):
+        return JSONResponse(fake.ids(int(request.query_params.get("limit", 200))))
+
+    async def stats(request: Request):
+        return JSONResponse(fake.snapshot_stats())
+
+    async def reset(request: Request):
+        fake.reset_stats()
+        return JSONResponse({"success": True})
+
+    app = Starlette(routes=[
+        Route("/_fake/ids", ids),
+        Route("/_fake/stats", stats),
+        Route("/_fake/reset", reset, methods=["POST"]),
+        Route("/{path:path}", graph, methods=["GET", "POST", "DELETE"]),
+    ])
+    app.state.fake = fake
+    return app
+
+
+def parse_config(argv: Optional[list[str]] = None) -> tuple[FakeGraphConfig, argparse.Namespace]:
+    parser = argparse.ArgumentParser(description="Fake Meta Graph API server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    defaults = FakeGraphConfig()
+    for name, value in asdict(defaults).items():
+        option = f"--{name.replace('_', '-')}"
+        if isinstance(value, bool):
+            parser.add_argument(option, action="store_true", default=value)
+        else:
+            parser.add_argument(option, type=type(value), default=value)
+    args = parser.parse_args(argv)
+    config = FakeGraphConfig(**{name: getattr(args, name) for name in asdict(defaults)})
+    return config, args
+
+
+def main(argv: Optional[list[str]] = None):
+    import uvicorn
+
+    config, args = parse_config(argv)
+    app = create_app(config)
+    store = app.state.fake.store
+    print(
+        f"Fake Graph API on http://{args.host}:{args.port} - "
+        f"{len(store.accounts)} accounts: {', '.join(store.accounts)}; "
+        f"{sum(1 for obj in store.objects.values() if obj['_type'] == 'ad')} ads"
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Fake OpenAI-compatible LLM server for offline chat benchmarks.
+
+Answers POST /v1/chat/completions the way the orchestrator and the Agno
+skills expect, from a script instead of a model:
+
+- intent classification (the `_detect_intent_by_llm` prompt, no tools):
+  replies with the intent of the first script rule matching the message
+- skill runs (requests with `tools`): replies with the rule's tool calls,
+  one step per round trip (a step may hold several calls, returned together
+  in one assistant message), then with a final text answer once every step
+  has a tool result
+- tool arguments are filled from each tool's JSON schema: ids come from the
+  fake Graph API tree (GET /_fake/ids of --graph-url, or the default tree
+  when no URL is given), other values from the rule or ARGUMENT_DEFAULTS
+- for rules marked `modifies`, the first round trip asks for confirmation
+  at --confirmation-rate (as real models sometimes do), which exercises the
+  orchestrator's retry path; the retry prefixes always get the tool calls
+- injected latency (shorter for classification), HTTP 429s and 500s
+
+The default script (DEFAULT_SCRIPT) matches the corpus of
+benchmarks/orchestrator_bench.py; --script loads another one from a JSON
+file with the same shape. Control endpoints: GET /_fake/stats and
+POST /_fake/reset.
+
+    python -m benchmarks.fake_llm --port 8901 --latency-ms 400 --graph-url http://localhost:8900
+
+then point the backend at it with LLM_BASE_URL=http://localhost:8901/v1 (any
+API key is accepted).
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from benchmarks.fake_graph_api import FakeGraphAPI, FakeGraphConfig
+
+
+@dataclass
+class FakeLLMConfig:
+    latency_ms: float = 400.0  # per skill round trip
+    routing_latency_ms: float = 150.0  # intent classification (max_tokens=20)
+    jitter_ms: float = 50.0
+    confirmation_rate: float = 0.1
+    http_429_rate: float = 0.0
+    http_500_rate: float = 0.0
+    graph_url: str = ""
+    script: str = ""
+    seed: int = 1
+
+
+# Rules are tried in order against the user's message; the first match
+# wins. `steps` are the tool call rounds of the skill run.
+DEFAULT_SCRIPT = {
+    "rules": [
+        {"match": r"\b(pause|pausar|desative|desativar)\b", "intent": "editor", "modifies": True,
+         "steps": [["list_campaigns"], ["update_campaign_status"]],
+         "arguments": {"update_campaign_status": {"status": "PAUSED"}}},
+        {"match": r"\b(ative|ativar|reative)\b", "intent": "editor", "modifies": True,
+         "steps": [["list_campaigns"], ["update_campaign_status"]],
+         "arguments": {"update_campaign_status": {"status": "ACTIVE"}}},
+        {"match": r"\bduplique\b", "intent": "editor", "modifies": True,
+         "steps": [["list_campaigns"], ["duplicate_campaign"]]},
+        {"match": r"\b(aumente|reduza|altere) o orçamento\b", "intent": "budget", "modifies": True,
+         "steps": [["list_campaigns"], ["update_campaign_budget"]],
+         "arguments": {"update_campaign_budget": {"daily_budget": 80}}},
+        {"match": r"\bcrie\b", "intent": "creator", "modifies": True,
+         "steps": [["create_campaign"]],
+         "arguments": {"create_campaign": {"name": "Campanha Benchmark", "objective": "OUTCOME_TRAFFIC"}}},
+        {"match": r"\b(orçamento|gastos)\b", "intent": "budget",
+         "steps": [["get_account_spend_summary", "get_campaigns_spend_comparison"]]},
+        {"match": r"\binteresses\b", "intent": "audience",
+         "steps": [["search_interests"]]},
+        {"match": r"\bpúblico\b", "intent": "audience",
+         "steps": [["search_locations"], ["estimate_audience_reach"]],
+         "arguments": {"search_locations": {"query": "São Paulo"}}},
+        {"match": r"\b(especificações|criativos?|formato)\b", "intent": "creative",
+         "steps": [["get_creative_specs"]]},
+        {"match": r"\brelatório\b", "intent": "reporter",
+         "steps": [["generate_performance_report"]]},
+        {"match": r"\b(idade|gênero|posicionamento)\b", "intent": "analyzer",
+         "steps": [["get_breakdown_analysis"]],
+         "arguments": {"get_breakdown_analysis": {"breakdown": "age"}}},
+        {"match": r"\btendência\b", "intent": "analyzer",
+         "steps": [["get_trends_analysis"]]},
+        {"match": r"\b(melhor|compare)\b", "intent": "analyzer",
+         "steps": [["list_campaigns"], ["compare_campaigns_performance"]]},
+    ],
+    "default": {"intent": "analyzer", "steps": [["list_campaigns"], ["get_campaign_insights"]]},
+}
+
+# Values for required tool parameters, by name (ids are filled separately)
+ARGUMENT_DEFAULTS = {
+    "name": "Benchmark",
+    "objective": "OUTCOME_TRAFFIC",
+    "daily_budget": 50,
+    "query": "fitness",
+    "breakdown": "age",
+    "format_type": "feed",
+    "targeting_spec": {"geo_locations": {"countries": ["BR"]}, "age_min": 18, "age_max": 45},
+}
+TYPE_DEFAULTS = {"string": "teste", "integer": 1, "number": 1.0, "boolean": True, "array": [], "object": {}}
+
+CLASSIFICATION_MESSAGE = re.compile(r'Mensagem: "(.*)"\s*\n\s*Responda APENAS', re.DOTALL)
+ACCOUNT_CONTEXT = re.compile(r"\[Contexto: Conta de anúncios (\S+)\]")
+# Prefixes of the orchestrator's retries: the model must call the tool now
+RETRY_MARKERS = ("[INSTRUÇÃO CRÍTICA", "[ORDEM DIRETA")
+
+
+def _text(content) -> str:
+    """Text of a message content (plain string or list of parts)."""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeLLM:
+    def __init__(self, config: FakeLLMConfig):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        if config.script:
+            with open(config.script, encoding="utf-8") as f:
+                self.script = json.load(f)
+        else:
+            self.script = DEFAULT_SCRIPT
+        self._rules = [(re.compile(rule["match"], re.IGNORECASE), rule) for rule in self.script["rules"]]
+        self._ids: Optional[dict] = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.started = time.monotonic()
+        self.stats = Counter()
+        self.by_tool: Counter = Counter()
+        self.by_intent: Counter = Counter()
+
+    async def ids(self) -> dict:
+        """Graph object ids to fill tool arguments with (fetched once)."""
+        if self._ids is None:
+            if self.config.graph_url:
+                async with httpx.AsyncClient(timeout=10) as client:
+                    response = await client.get(f"{self.config.graph_url.rstrip('/')}/_fake/ids")
+                    response.raise_for_status()
+                    self._ids = response.json()
+            else:
+                self._ids = FakeGraphAPI(FakeGraphConfig()).ids(200)
+        return self._ids
+
+    def rule_for(self, message: str) -> dict:
+        for pattern, rule in self._rules:
+            if pattern.search(message):
+                return rule
+        return self.script["default"]
+
+    async def arguments(self, tool: dict, rule: dict, user_message: str) -> dict:
+        """Arguments for the required parameters of a tool, from its JSON schema."""
+        ids = await self.ids()
+        match = ACCOUNT_CONTEXT.search(user_message)
+        account = next(
+            (a for a in ids["accounts"] if match and match.group(1) in (a["id"], a["account_id"])),
+            ids["accounts"][0],
+        )
+        campaigns = [c["id"] for c in account["campaigns"]] or ["0"]
+        adsets = [adset_id for _, adset_id in account["adsets"]] or ["0"]
+
+        function = tool["function"]
+        schema = function.get("parameters") or {}
+        overrides = rule.get("arguments", {}).get(function["name"], {})
+        arguments = {}
+        for name in schema.get("required", []):
+            kind = (schema.get("properties", {}).get(name) or {}).get("type", "string")
+            if isinstance(kind, list):
+                kind = next((k for k in kind if k != "null"), "string")
+            if name in overrides:
+                arguments[name] = overrides[name]
+            elif name == "campaign_ids":
+                arguments[name] = self._rng.sample(campaigns, min(3, len(campaigns)))
+            elif name in ("campaign_id", "object_id"):
+                arguments[name] = self._rng.choice(campaigns)
+            elif name in ("ad_set_id", "adset_id"):
+                arguments[name] = self._rng.choice(adsets)
+            elif name in ARGUMENT_DEFAULTS:
+                arguments[name] = ARGUMENT_DEFAULTS[name]
+            else:
+                arguments[name] = TYPE_DEFAULTS.get(kind, "teste")
+        return {**overrides, **arguments}
+
+    async def complete(self, body: dict) -> dict:
+        """Assistant message (content or tool_calls) and finish reason for one request."""
+        messages = body.get("messages") or []
+        tools = {t["function"]["name"]: t for t in body.get("tools") or [] if t.get("type") == "function"}
+        user_message = next((_text(m.get("content")) for m in messages if m.get("role") == "user"), "")
+
+        if not tools:
+            self.stats["classifications"] += 1
+            match = CLASSIFICATION_MESSAGE.search(user_message)
+            intent = self.rule_for(match.group(1) if match else user_message)["intent"]
+            self.by_intent[intent] += 1
+            return {"role": "assistant", "content": intent}, "stop"
+
+        self.stats["skill_calls"] += 1
+        rule = self.rule_for(user_message)
+        done = sum(1 for m in messages if m.get("role") == "assistant" and m.get("tool_calls"))
+        steps = [[name for name in step if name in tools] for step in rule["steps"]]
+        steps = [step for step in steps if step]
+
+        if done == 0 and rule.get("modifies") and not any(marker in user_message for marker in RETRY_MARKERS):
+            if self._rng.random() < self.config.confirmation_rate:
+                self.stats["confirmation_requests"] += 1
+                return {
+                    "role": "assistant",
+                    "content": "Encontrei a campanha. Você tem certeza? Deseja prosseguir com a alteração?",
+                }, "stop"
+
+        if done < len(steps):
+            calls = []
+            for name in steps[done]:
+                self.by_tool[name] += 1
+                calls.append({
+                    "id": f"call_{uuid.uuid4().hex[:24]}",
+                    "type": "function",
+                    "function": {"name": name, "arguments": json.dumps(await self.arguments(tools[name], rule, user_message))},
+                })
+            self.stats["tool_calls"] += len(calls)
+            return {"role": "assistant", "content": None, "tool_calls": calls}, "tool_calls"
+
+        called = [name for step in steps for name in step]
+        summary = ", ".join(called) if called else "nenhuma ferramenta"
+        return {
+            "role": "assistant",
+            "content": f"Pronto! Consultei {summary} e aqui está o resumo para a sua conta.",
+        }, "stop"
+
+    async def respond(self, body: dict) -> tuple[int, dict]:
+        """(status, body) of one request, with latency and injected faults."""
+        config = self.config
+        self.stats["requests"] += 1
+        latency = config.latency_ms if body.get("tools") else config.routing_latency_ms
+        latency += self._rng.uniform(-config.jitter_ms, config.jitter_ms)
+        await asyncio.sleep(max(latency, 0) / 1000)
+
+        roll = self._rng.random()
+        if roll < config.http_429_rate:
+            self.stats["http_429"] += 1
+            return 429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error", "code": "rate_limit_exceeded"}}
+        if roll < config.http_429_rate + config.http_500_rate:
+            self.stats["http_500"] += 1
+            return 500, {"error": {"message": "The server had an error", "type": "server_error", "code": None}}
+        if body.get("stream"):
+            return 400, {"error": {"message": "stream is not supported by the fake server", "type": "invalid_request_error", "code": None}}
+
+        message, finish_reason = await self.complete(body)
+        prompt_tokens = _tokens(json.dumps(body.get("messages") or [], ensure_ascii=False))
+        completion_tokens = _tokens(json.dumps(message, ensure_ascii=False))
+        self.stats["prompt_tokens"] += prompt_tokens
+        self.stats["completion_tokens"] += completion_tokens
+        return 200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def snapshot_stats(self) -> dict:
+        return {
+            "uptime_seconds": round(time.monotonic() - self.started, 2),
+            **self.stats,
+            "by_intent": dict(self.by_intent.most_common()),
+            "by_tool": dict(self.by_tool.most_common()),
+        }
+
+
+def create_app(config: FakeLLMConfig) -> Starlette:
+    fake = FakeLLM(config)
+
+    async def completions(request: Request):
+        status, result = await fake.respond(await request.json())
+        return JSONResponse(result, status_code=status)
+
+    async def stats(request: Request):
+        return JSONResponse(fake.snapshot_stats())
+
+    async def reset(request: Request):
+        fake.reset_stats()
+        return JSONResponse({"success": True})
+
+    app = Starlette(routes=[
+        Route("/_fake/stats", stats),
+        Route("/_fake/reset", reset, methods=["POST"]),
+        Route("/v1/chat/completions", completions, methods=["POST"]),
+        Route("/chat/completions", completions, methods=["POST"]),
+    ])
+    app.state.fake = fake
+    return app
+
+
+def parse_config(argv: Optional[list[str]] = None) -> tuple[FakeLLMConfig, argparse.Namespace]:
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server for chat benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    defaults = FakeLLMConfig()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args(argv)
+    config = FakeLLMConfig(**{name: getattr(args, name) for name in asdict(defaults)})
+    return config, args
+
+
+def main(argv: Optional[list[str]] = None):
+    import uvicorn
+
+    config, args = parse_config(argv)
+    app = create_app(config)
+    print(
+        f"Fake LLM on http://{args.host}:{args.port}/v1 - "
+        f"{len(app.state.fake.script['rules'])} script rules, "
+        f"latency {config.latency_ms:g}ms (routing {config.routing_latency_ms:g}ms)"
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
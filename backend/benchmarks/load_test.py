@@ -0,0 +1,342 @@
+"""
+Load test harness for the /api/sync, /api/campaigns and /api/alerts endpoints.
+
+Drives a running backend whose Meta client points at the fake Graph API
+(benchmarks.fake_graph_api), so nothing touches real Meta quota. Each worker
+loops over a weighted mix of scenarios for the test duration (closed loop:
+`--concurrency` requests in flight). The report has, per scenario and
+overall: requests, errors, throughput and latency percentiles, plus how many
+Graph API calls one request of each scenario makes (measured once, alone,
+before the load starts, from the fake server's counters).
+
+    # backend (META_GRAPH_BASE_URL=http://localhost:8900) and fake server already running
+    python -m benchmarks.load_test --target http://localhost:8000 --graph http://localhost:8900
+
+    # or let the harness start both as subprocesses
+    python -m benchmarks.load_test --spawn --duration 60 --concurrency 20 \\
+        --graph-args "--campaigns 100 --latency-ms 80 --throttle-rate 0.01"
+
+Requests use `user_id=loadtest` so alerts and settings stay in their own
+partition (deleted at the end unless --keep-alerts).
+
+With --spawn the backend runs from a copy of `app/` in a temporary directory,
+so its data/ (activity.db, alert partitions, counters, settings) is a scratch
+tree removed at the end; the scheduler is disabled (SCHEDULER_ENABLED=false)
+and the scratch settings.json turns notifications and WhatsApp off, so the
+snapshot budget consumer never sends anything.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+LOAD_TEST_USER = "loadtest"
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str  # May use {campaign_id} / {ad_set_id}
+    weight: int
+    params: dict = field(default_factory=dict)
+    account: bool = True  # Send ad_account_id
+    body: Optional[str] = None  # "campaigns" = campaign list for /api/alerts/generate
+
+
+SCENARIOS = [
+    Scenario("sync.campaigns_insights", "GET", "/api/sync/campaigns-insights", 10, {"date_preset": "last_7d"}),
+    Scenario("sync.adsets_insights", "GET", "/api/sync/adsets-insights", 6, {"date_preset": "last_7d"}),
+    Scenario("sync.ads_insights", "GET", "/api/sync/ads-insights", 6, {"date_preset": "last_7d"}),
+    Scenario("sync.trends", "GET", "/api/sync/trends", 6, {"date_preset": "last_30d"}),
+    Scenario("sync.dashboard", "GET", "/api/sync/dashboard", 8, {"date_preset": "last_7d"}),
+    Scenario("sync.account_limits", "GET", "/api/sync/account-limits", 2),
+    Scenario("sync.breakdown", "GET", "/api/sync/breakdown/{campaign_id}", 3, {"breakdown": "age"}),
+    Scenario("sync.campaigns", "POST", "/api/sync/campaigns", 2),
+    Scenario("sync.full", "POST", "/api/sync", 1),
+    Scenario("campaigns.list", "GET", "/api/campaigns", 8, {"limit": 20}),
+    Scenario("campaigns.get", "GET", "/api/campaigns/{campaign_id}", 6, account=False),
+    Scenario("campaigns.insights", "GET", "/api/campaigns/{campaign_id}/insights", 6, {"date_preset": "last_7d"}, account=False),
+    Scenario("campaigns.ad_sets", "GET", "/api/campaigns/{campaign_id}/ad-sets", 4, account=False),
+    Scenario("campaigns.ads", "GET", "/api/campaigns/{campaign_id}/ad-sets/{ad_set_id}/ads", 4, account=False),
+    Scenario("alerts.list", "GET", "/api/alerts", 10, {"limit": 50}),
+    Scenario("alerts.unread_count", "GET", "/api/alerts/unread-count", 8),
+    Scenario("alerts.generate", "POST", "/api/alerts/generate", 2, body="campaigns"),
+]
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies_ms: list[float], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies_ms)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 2) if elapsed else 0,
+        "mean_ms": round(statistics.fmean(values), 2) if values else 0,
+        **{f"p{p}_ms": round(percentile(values, p), 2) for p in (50, 90, 95, 99)},
+        "max_ms": round(values[-1], 2) if values else 0,
+    }
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace, ids: dict):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.accounts = ids["accounts"][: args.accounts] if args.accounts else ids["accounts"]
+        self.scenarios = [s for s in SCENARIOS if not args.only or any(s.name.startswith(o) for o in args.only)]
+        if not self.scenarios:
+            raise SystemExit(f"No scenario matches {args.only}")
+        self.latencies: dict[str, list[float]] = {s.name: [] for s in self.scenarios}
+        self.errors: dict[str, int] = {s.name: 0 for s in self.scenarios}
+        self.error_samples: dict[str, str] = {}
+
+    def build_request(self, scenario: Scenario) -> tuple[str, dict, Optional[list]]:
+        account = self.rng.choice(self.accounts)
+        campaign_id, ad_set_id = self.rng.choice(account["adsets"]) if account["adsets"] else (account["campaigns"][0]["id"], "")
+        path = scenario.path.format(campaign_id=campaign_id, ad_set_id=ad_set_id)
+        params = {**scenario.params, "user_id": LOAD_TEST_USER}
+        if scenario.account:
+            params["ad_account_id"] = account["account_id"]
+        body = None
+        if scenario.body == "campaigns":
+            body = [
+                {
+                    "id": campaign["id"],
+                    "name": campaign["name"],
+                    "status": campaign["status"],
+                    "insights": {
+                        "ctr": round(self.rng.uniform(0.2, 3), 2),
+                        "cpc": round(self.rng.uniform(0.3, 8), 2),
+                        "impressions": self.rng.randint(500, 50000),
+                        "spend": round(self.rng.uniform(10, 2000), 2),
+                    },
+                }
+                for campaign in account["campaigns"]
+            ]
+        return path, params, body
+
+    async def send(self, client: httpx.AsyncClient, scenario: Scenario) -> tuple[float, Optional[str]]:
+        path, params, body = self.build_request(scenario)
+        started = time.perf_counter()
+        try:
+            response = await client.request(scenario.method, path, params=params, json=body)
+            error = None if response.status_code < 400 else f"HTTP {response.status_code}: {response.text[:200]}"
+        except httpx.HTTPError as e:
+            error = f"{type(e).__name__}: {e}"
+        return (time.perf_counter() - started) * 1000, error
+
+    async def calibrate(self, client: httpx.AsyncClient, graph: httpx.AsyncClient) -> dict[str, Optional[float]]:
+        """Graph API calls made by one request of each scenario (run alone)."""
+        calls = {}
+        for scenario in self.scenarios:
+            before = (await graph.get("/_fake/stats")).json().get("requests", 0)
+            _, error = await self.send(client, scenario)
+            after = (await graph.get("/_fake/stats")).json().get("requests", 0)
+            calls[scenario.name] = after - before
+            if error:
+                print(f"  calibration: {scenario.name} failed: {error}", file=sys.stderr)
+        return calls
+
+    async def worker(self, client: httpx.AsyncClient, deadline: float, warmup_until: float):
+        weights = [s.weight for s in self.scenarios]
+        while time.monotonic() < deadline:
+            scenario = self.rng.choices(self.scenarios, weights)[0]
+            latency, error = await self.send(client, scenario)
+            if time.monotonic() < warmup_until:
+                continue
+            self.latencies[scenario.name].append(latency)
+            if error:
+                self.errors[scenario.name] += 1
+                self.error_samples.setdefault(scenario.name, error)
+
+    async def run(self) -> dict:
+        args = self.args
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=args.target, timeout=args.timeout, limits=limits) as client, \
+                httpx.AsyncClient(base_url=args.graph, timeout=10) as graph:
+            graph_calls = await self.calibrate(client, graph)
+            await graph.post("/_fake/reset")
+
+            print(f"Running {args.duration}s (+{args.warmup}s warm-up) with {args.concurrency} concurrent requests...")
+            started = time.monotonic()
+            warmup_until = started + args.warmup
+            deadline = warmup_until + args.duration
+            await asyncio.gather(*(self.worker(client, deadline, warmup_until) for _ in range(args.concurrency)))
+            elapsed = time.monotonic() - warmup_until
+            graph_stats = (await graph.get("/_fake/stats")).json()
+
+            if not args.keep_alerts:
+                await client.delete("/api/alerts", params={"user_id": LOAD_TEST_USER})
+
+        scenarios = {
+            name: {**summarize(self.latencies[name], self.errors[name], elapsed), "graph_calls_per_request": graph_calls.get(name)}
+            for name in self.latencies
+        }
+        all_latencies = [latency for values in self.latencies.values() for latency in values]
+        return {
+            "config": {key: value for key, value in vars(args).items() if key != "func"},
+            "elapsed_seconds": round(elapsed, 2),
+            "overall": summarize(all_latencies, sum(self.errors.values()), elapsed),
+            "scenarios": scenarios,
+            "graph": graph_stats,
+            "error_samples": self.error_samples,
+        }
+
+
+def print_report(report: dict):
+    columns = ("requests", "errors", "rps", "p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms", "graph_calls_per_request")
+    headers = ("scenario", "reqs", "errs", "rps", "p50", "p90", "p95", "p99", "max", "graph/req")
+    rows = [(name, *(stats.get(column) for column in columns)) for name, stats in report["scenarios"].items()]
+    rows.append(("TOTAL", *(report["overall"].get(column) for column in columns)))
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    for row in (headers, *rows):
+        print("  ".join(str("-" if value is None else value).rjust(width) for value, width in zip(row, widths)))
+    graph = report["graph"]
+    print(
+        f"\nGraph API: {graph.get('requests', 0)} calls, {graph.get('errors', 0)} errors "
+        f"({graph.get('throttled', 0)} throttled, {graph.get('http_429', 0)} HTTP 429, "
+        f"{graph.get('budget_exceeded', 0)} over budget)"
+    )
+    for name, error in report["error_samples"].items():
+        print(f"  {name}: {error}")
+
+
+async def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise SystemExit(f"{url} exited with code {process.returncode}")
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.3)
+    raise SystemExit(f"{url} did not start within {timeout}s")
+
+
+# Scratch settings for the spawned backend: no notifications, no WhatsApp
+SPAWN_SETTINGS = {
+    "notifications": {
+        "daily_reports": False,
+        "immediate_alerts": False,
+        "optimization_suggestions": False,
+        "status_changes": False,
+    },
+    "evolution": {"enabled": False},
+}
+
+
+def prepare_backend_dir(workdir: Path) -> Path:
+    """Copies `app/` into `workdir` next to an empty data/ and returns the copy's root.
+
+    Every module resolves data/ relative to its own file, so running the copy
+    keeps the developer's backend/data untouched.
+    """
+    backend_dir = workdir / "backend"
+    shutil.copytree(BACKEND_DIR / "app", backend_dir / "app", ignore=shutil.ignore_patterns("__pycache__"))
+    data_dir = backend_dir / "data"
+    data_dir.mkdir()
+    (data_dir / "settings.json").write_text(json.dumps(SPAWN_SETTINGS, indent=2), encoding="utf-8")
+    return backend_dir
+
+
+def spawn(args: argparse.Namespace, workdir: Path) -> list[subprocess.Popen]:
+    """Starts the fake Graph API and the backend (pointed at it) as subprocesses."""
+    graph_port = int(args.graph.rsplit(":", 1)[1])
+    backend_port = int(args.target.rsplit(":", 1)[1])
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_graph_api", "--port", str(graph_port), *shlex.split(args.graph_args)],
+        cwd=BACKEND_DIR,
+    )
+    env = {
+        **os.environ,
+        "META_GRAPH_BASE_URL": args.graph,
+        "META_ACCESS_TOKEN": "fake-token",
+        "META_BUSINESS_ID": "555000000000001",
+        "SCHEDULER_ENABLED": "false",
+        "EVOLUTION_API_URL": "",
+        "EVOLUTION_API_KEY": "",
+        "EVOLUTION_INSTANCE": "",
+    }
+    env.setdefault("OPENAI_API_KEY", "unused")
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(backend_port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=prepare_backend_dir(workdir),
+        env=env,
+    )
+    return [fake, backend]
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    workdir = tempfile.TemporaryDirectory(prefix="load-test-") if args.spawn else None
+    processes = spawn(args, Path(workdir.name)) if workdir else []
+    try:
+        if processes:
+            await wait_until_up(f"{args.graph}/_fake/stats", processes[0])
+            await wait_until_up(f"{args.target}/health", processes[1])
+        async with httpx.AsyncClient(base_url=args.graph, timeout=10) as graph:
+            ids = (await graph.get("/_fake/ids")).json()
+        return await LoadTest(args, ids).run()
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if workdir:
+            workdir.cleanup()
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Load test of the sync/campaigns/alerts API against the fake Graph API")
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="Backend base URL")
+    parser.add_argument("--graph", default="http://127.0.0.1:8900", help="Fake Graph API base URL")
+    parser.add_argument("--spawn", action="store_true", help="Start the fake Graph API and the backend")
+    parser.add_argument("--graph-args", default="", help="Extra fake_graph_api options (with --spawn)")
+    parser.add_argument("--workers", type=int, default=1, help="Backend uvicorn workers (with --spawn)")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds of load before measuring")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--accounts", type=int, default=0, help="Use only the first N fake accounts (0 = all)")
+    parser.add_argument("--only", nargs="*", help="Scenario name prefixes, e.g. sync. alerts.list")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep-alerts", action="store_true")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"\nReport written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+"""
+Microbenchmarks of hot pure-Python paths, at several input scales.
+
+Each benchmark is a setup function that receives the scale `n`, builds its
+synthetic fixtures and returns the callable to time (pytest-benchmark
+style, without the dependency). Timing follows timeit: the loop count is
+calibrated so one round lasts at least `--min-time`, then `--rounds`
+rounds run with the garbage collector off; the median round is the result.
+
+- meta.get_all_ads_insights: normalisation of n ads with insights (Graph
+  request stubbed out)
+- alerts.run_alert_generation: alert generation for n campaigns + roll-up
+  into the partition on disk (temporary directory)
+- alerts.rollup_alerts: dedup of n/10 candidates (half repeated) against
+  n stored alerts (replaced the old `alert_exists` scan)
+- api.alerts.list / api.alerts.list_filtered: GET /api/alerts filtering,
+  sorting and response construction over n alerts
+- orchestrator.detect_intent_by_keywords / orchestrator.word_match: keyword
+  regex matching of n chat messages
+- api.sync.ads_insights: AdInsightsItem construction and sorting for n ads
+  (GET /api/sync/ads-insights), plus JSON serialisation
+
+    python -m benchmarks.microbench --json results.json
+    python -m benchmarks.microbench --compare results.json --threshold 10
+    python -m benchmarks.microbench --filter alerts --scales 100 1000
+
+With --compare, a benchmark whose median is more than --threshold percent
+slower than the baseline is a regression and the exit code is 1.
+"""
+
+import argparse
+import asyncio
+import atexit
+import gc
+import json
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SCALES = (100, 1_000, 10_000, 100_000)
+SMALL_SCALES = SCALES[:3]  # For benchmarks too slow per item to run 100k
+
+# Everything the benchmarks write goes here (alert partitions, counters)
+_WORKDIR = Path(tempfile.mkdtemp(prefix="microbench-"))
+atexit.register(shutil.rmtree, _WORKDIR, ignore_errors=True)
+_LOOP = asyncio.new_event_loop()
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[[int], Callable[[], object]]
+    scales: tuple[int, ...] = SCALES
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(name: str, scales: tuple[int, ...] = SCALES):
+    """Registers a setup function: setup(n) -> callable to time."""
+    def decorator(setup):
+        BENCHMARKS.append(Benchmark(name, setup, scales))
+        return setup
+    return decorator
+
+
+def _isolate_data_dir():
+    """Points the alert store and settings at the temporary directory."""
+    from app.services import alert_generator, alert_store
+
+    alert_store.DATA_DIR = _WORKDIR
+    alert_store.ALERTS_DIR = _WORKDIR / "alerts"
+    alert_store.COUNTERS_DIR = _WORKDIR / "alert_counters"
+    alert_store.LEGACY_ALERTS_FILE = _WORKDIR / "alerts.json"
+    alert_generator.DATA_DIR = _WORKDIR
+
+
+# ----------------------------------------
+# Synthetic fixtures
+# ----------------------------------------
+
+def make_ads_payload(n: int, rng: random.Random) -> dict:
+    """Graph response of act_<id>/ads with creative, parents and insights."""
+    ads = []
+    for i in range(n):
+        impressions = rng.randint(0, 50000)
+        clicks = int(impressions * rng.uniform(0.002, 0.03))
+        spend = clicks * rng.uniform(0.3, 4)
+        actions = [{"action_type": "link_click", "value": str(clicks)}]
+        if rng.random() < 0.5:
+            actions.append({"action_type": "lead", "value": str(rng.randint(0, 40))})
+        if rng.random() < 0.4:
+            purchases = str(rng.randint(0, 20))
+            actions += [{"action_type": "purchase", "value": purchases}, {"action_type": "omni_purchase", "value": purchases}]
+        ad = {
+            "id": str(23870000000000 + i),
+            "name": f"Anúncio {i}",
+            "status": "ACTIVE",
+            "effective_status": rng.choice(["ACTIVE", "PAUSED", "ADSET_PAUSED"]),
+            "adset_id": str(23860000000000 + i // 3),
+            "adset": {"id": str(23860000000000 + i // 3), "name": f"Conjunto {i // 3}"},
+            "campaign": {"id": str(23850000000000 + i // 9), "name": f"Campanha {i // 9}"},
+            "creative": {"id": str(23880000000000 + i), "name": f"Criativo {i}", "object_type": "SHARE", "thumbnail_url": "https://example.com/t.jpg"},
+        }
+        if impressions and rng.random() < 0.9:
+            ad["insights"] = {"data": [{
+                "spend": f"{spend:.2f}",
+                "impressions": str(impressions),
+                "clicks": str(clicks),
+                "reach": str(int(impressions * 0.8)),
+                "ctr": f"{clicks / impressions * 100:.6f}",
+                "cpc": f"{spend / clicks:.6f}" if clicks else None,
+                "actions": actions,
+                "date_start": "2026-01-01",
+                "date_stop": "2026-01-07",
+            }]}
+        ads.append(ad)
+    return {"data": ads}
+
+
+def make_campaigns(n: int, rng: random.Random) -> list[dict]:
+    """Campaigns with insights as published in an account snapshot."""
+    return [
+        {
+            "id": str(23850000000000 + i),
+            "name": f"Campanha {i}",
+            "status": rng.choice(["ACTIVE", "ACTIVE", "PAUSED"]),
+            "daily_budget": rng.choice([2000, 5000, 10000]),
+            "insights": {
+                "ctr": round(rng.uniform(0.1, 4), 2),
+                "cpc": round(rng.uniform(0.2, 9), 2),
+                "impressions": rng.randint(0, 50000),
+                "spend": round(rng.uniform(0, 3000), 2),
+            },
+        }
+        for i in range(n)
+    ]
+
+
+def make_alerts(n: int, rng: random.Random) -> list[dict]:
+    now = datetime.utcnow()
+    alerts = []
+    for i in range(n):
+        created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 60))
+        alerts.append({
+            "id": f"alert-{i}",
+            "type": rng.choice(["budget", "performance", "status", "optimization"]),
+            "priority": rng.choice(["low", "medium", "high", "critical"]),
+            "title": rng.choice(["CTR baixo", "CPC alto", "Campanha pausada", "Orçamento diário em 90%"]),
+            "message": f"Mensagem do alerta {i}",
+            "campaign_id": str(23850000000000 + i),
+            "campaign_name": f"Campanha {i}",
+            "ad_account_id": "1000000001",
+            "read": rng.random() < 0.6,
+            "occurrences": rng.randint(1, 5),
+            "created_at": created.isoformat(),
+            "last_seen_at": (created + timedelta(minutes=rng.randint(0, 600))).isoformat(),
+        })
+    return alerts
+
+
+MESSAGE_TEMPLATES = [
+    "Quero criar uma campanha de vendas para o produto {x}",
+    "pause todas as campanhas com CPC acima de {x} reais",
+    "Como está o desempenho da campanha {x} nos últimos 7 dias?",
+    "aumente o orçamento da campanha {x} em 20%",
+    "gere um relatório semanal das campanhas ativas",
+    "quais públicos estão performando melhor no conjunto {x}?",
+    "troque o criativo do anúncio {x} por um vídeo",
+    "desative-a por enquanto, por favor",
+    "duplique a campanha {x} e altere o público para 25-34 anos",
+    "qual foi o ROAS da conta ontem?",
+    "arquivar campanhas antigas de {x}",
+    "Olá! tudo bem? Preciso de ajuda com meus anúncios",
+]
+
+
+def make_messages(n: int, rng: random.Random) -> list[str]:
+    return [rng.choice(MESSAGE_TEMPLATES).format(x=rng.randint(1, 999)) for _ in range(n)]
+
+
+# ----------------------------------------
+# Benchmarks
+# ----------------------------------------
+
+@benchmark("meta.get_all_ads_insights")
+def bench_ads_insights_normalisation(n: int):
+    from app.tools.meta_api import MetaAPI
+
+    payload = make_ads_payload(n, random.Random(n))
+    api = MetaAPI(ad_account_id="1000000001", access_token="bench")
+
+    async def request(*args, **kwargs):
+        return payload
+
+    api._request = request
+    return lambda: _LOOP.run_until_complete(api.get_all_ads_insights())
+
+
+@benchmark("alerts.run_alert_generation")
+def bench_run_alert_generation(n: int):
+    from app.services.alert_generator import run_alert_generation
+
+    campaigns = make_campaigns(n, random.Random(n))
+    account = f"bench-{n}"
+    return lambda: run_alert_generation(campaigns, user_id="microbench", ad_account_id=account)
+
+
+@benchmark("alerts.rollup_alerts")
+def bench_rollup_alerts(n: int):
+    from app.services.alert_store import rollup_alerts
+
+    rng = random.Random(n)
+    stored = make_alerts(n, rng)
+    repeated = [dict(alert) for alert in rng.sample(stored, max(n // 20, 1))]
+    new = make_alerts(max(n // 20, 1), rng)
+    for alert in new:
+        alert["campaign_id"] = f"new-{alert['campaign_id']}"
+    candidates = repeated + new
+    # The shallow copy keeps every round starting from n stored alerts
+    return lambda: rollup_alerts(list(stored), candidates)
+
+
+def _alerts_route(n: int, **filters):
+    import app.api.alerts as alerts_api
+
+    stored = make_alerts(n, random.Random(n))
+    alerts_api.load_alerts = lambda user_id=None, ad_account_id=None: list(stored)
+    params = {"type": None, "priority": None, "read": None, "ad_account_id": None, "limit": 50, "user_id": "microbench"}
+    params.update(filters)
+    return lambda: _LOOP.run_until_complete(alerts_api.get_alerts(**params))
+
+
+@benchmark("api.alerts.list")
+def bench_alerts_list(n: int):
+    return _alerts_route(n)
+
+
+@benchmark("api.alerts.list_filtered")
+def bench_alerts_list_filtered(n: int):
+    return _alerts_route(n, type="performance", priority="high", read=False)
+
+
+@benchmark("orchestrator.detect_intent_by_keywords", SMALL_SCALES)
+def bench_detect_intent(n: int):
+    from app.skills.orchestrator import CampaignOrchestrator
+
+    orchestrator = CampaignOrchestrator()
+    messages = make_messages(n, random.Random(n))
+    return lambda: [orchestrator._detect_intent_by_keywords(message) for message in messages]
+
+
+@benchmark("orchestrator.word_match", SMALL_SCALES)
+def bench_word_match(n: int):
+    from app.skills.orchestrator import CampaignOrchestrator
+
+    orchestrator = CampaignOrchestrator()
+    messages = [message.lower() for message in make_messages(n, random.Random(n))]
+    keywords = CampaignOrchestrator.MODIFICATION_KEYWORDS
+    return lambda: [orchestrator._word_match(message, keywords) for message in messages]
+
+
+def _ads_insights_route(n: int):
+    import app.api.sync as sync_api
+    from app.tools.meta_api import MetaAPI
+
+    api = MetaAPI(ad_account_id="1000000001", access_token="bench")
+    payload = make_ads_payload(n, random.Random(n))
+
+    async def request(*args, **kwargs):
+        return payload
+
+    api._request = request
+    ads = _LOOP.run_until_complete(api.get_all_ads_insights())
+
+    class StubMetaAPI:
+        async def get_all_ads_insights(self, *args):
+            return ads
+
+    sync_api.get_meta_api = lambda *args, **kwargs: StubMetaAPI()
+    return lambda: _LOOP.run_until_complete(
+        sync_api.get_ads_insights(ad_account_id=None, date_preset="last_7d", include_archived=False, user_id=None)
+    )
+
+
+@benchmark("api.sync.ads_insights")
+def bench_ads_insights_response(n: int):
+    return _ads_insights_route(n)
+
+
+@benchmark("api.sync.ads_insights+json")
+def bench_ads_insights_response_json(n: int):
+    route = _ads_insights_route(n)
+    return lambda: route().model_dump_json()
+
+
+# ----------------------------------------
+# Runner
+# ----------------------------------------
+
+def time_callable(func: Callable[[], object], min_time: float, rounds: int) -> dict:
+    """timeit-style: calibrate loops per round, then time `rounds` rounds with GC off."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    timings = []
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for _ in range(loops):
+                func()
+            timings.append((time.perf_counter() - started) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return {
+        "loops": loops,
+        "rounds": rounds,
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "mean_s": statistics.fmean(timings),
+        "stddev_s": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+def _format_time(seconds: float) -> str:
+    for unit, factor in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= factor:
+            return f"{seconds / factor:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> dict:
+    _isolate_data_dir()
+    pattern = re.compile(args.filter) if args.filter else None
+    results = []
+    for bench in BENCHMARKS:
+        if pattern and not pattern.search(bench.name):
+            continue
+        for n in bench.scales:
+            if args.scales and n not in args.scales:
+                continue
+            func = bench.setup(n)
+            func()  # Warm-up (imports, caches, first partition write)
+            stats = time_callable(func, args.min_time, args.rounds)
+            stats.update(name=bench.name, scale=n, per_item_ns=round(stats["median_s"] / n * 1e9, 1))
+            results.append(stats)
+            print(
+                f"{bench.name:<42} n={n:<7} median {_format_time(stats['median_s']):>10}  "
+                f"({stats['per_item_ns']:>9.1f} ns/item, {stats['loops']} loops x {stats['rounds']})",
+                flush=True,
+            )
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "commit": _git_commit(),
+            "min_time": args.min_time,
+            "rounds": args.rounds,
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold_pct: float) -> int:
+    """Prints the median change per benchmark/scale; returns the number of regressions."""
+    previous = {(r["name"], r["scale"]): r for r in baseline.get("results", [])}
+    regressions = 0
+    print(f"\nComparison with baseline ({baseline.get('meta', {}).get('commit') or 'unknown commit'}), threshold {threshold_pct}%:")
+    for result in report["results"]:
+        old = previous.get((result["name"], result["scale"]))
+        if old is None:
+            print(f"  {result['name']:<42} n={result['scale']:<7} (not in baseline)")
+            continue
+        change = (result["median_s"] / old["median_s"] - 1) * 100
+        if change > threshold_pct:
+            verdict = "REGRESSION"
+            regressions += 1
+        elif change < -threshold_pct:
+            verdict = "faster"
+        else:
+            verdict = ""
+        print(
+            f"  {result['name']:<42} n={result['scale']:<7} {_format_time(old['median_s']):>10} -> "
+            f"{_format_time(result['median_s']):>10}  {change:+7.1f}%  {verdict}"
+        )
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks of hot pure-Python paths")
+    parser.add_argument("--filter", help="Regex on benchmark names")
+    parser.add_argument("--scales", type=int, nargs="*", help=f"Subset of {SCALES}")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per round")
+    parser.add_argument("--json", help="Write the results to this file (use it as a baseline later)")
+    parser.add_argument("--compare", help="Baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=10, help="Slowdown (%%) counted as a regression")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for bench in BENCHMARKS:
+            print(f"{bench.name}  scales={list(bench.scales)}")
+        return
+
+    report = run(args)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.json}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
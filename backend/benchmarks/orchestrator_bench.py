@@ -0,0 +1,298 @@
+"""
+Chat throughput benchmark for CampaignOrchestrator.process_message.
+
+Replays a corpus of Portuguese chat messages (CORPUS, or --corpus with a
+JSON lines file of {"message", "confirmed", "history"}) through one shared
+orchestrator, as app/api/chat.py does, with `--concurrency` messages in
+flight. The LLM is the scripted fake (benchmarks.fake_llm) and the tools
+hit the fake Graph API (benchmarks.fake_graph_api), so no real quota is
+used and the numbers only reflect our own round trips and overhead.
+
+Each message runs inside a trace, and its spans give the per-message counts:
+LLM calls (`llm ...` spans, intent classification included), tool calls
+(`tool.<name>` spans, opened for every skill tool by app/skills/tools.py)
+and Graph API calls (`meta ...`).
+The report has, per skill and overall: messages, messages/sec, latency
+percentiles and those counts per message, plus the fake servers' counters
+(confirmation requests, tokens).
+
+    # fakes already running (see the module docstrings)
+    python -m benchmarks.orchestrator_bench --llm http://localhost:8901 --graph http://localhost:8900
+
+    # or let the benchmark start both as subprocesses
+    python -m benchmarks.orchestrator_bench --spawn --messages 200 --concurrency 10 \\
+        --llm-args "--latency-ms 600 --confirmation-rate 0.2"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from benchmarks.load_test import BACKEND_DIR, percentile, wait_until_up
+
+# Message mix of the chat: questions, confirmed actions (the frontend sends
+# them as confirmed_action), an unconfirmed destructive action (answered by
+# the orchestrator itself) and a short reply resolved from the history.
+CORPUS = [
+    {"message": "Como está a performance das minhas campanhas nos últimos 7 dias?"},
+    {"message": "Qual campanha tem o melhor CTR esta semana?"},
+    {"message": "Mostre a análise por idade da campanha de conversão"},
+    {"message": "Como está a tendência de cliques e conversões?"},
+    {"message": "Liste minhas campanhas ativas"},
+    {"message": "Como está distribuído meu orçamento?"},
+    {"message": "Busque interesses sobre fitness e academia"},
+    {"message": "Qual o tamanho do público em São Paulo?"},
+    {"message": "Quais as especificações de vídeo para Stories?"},
+    {"message": "Gere um relatório de performance do mês"},
+    {"message": "Pause a campanha Promo Verão"},
+    {"message": "Pause a campanha Promo Verão", "confirmed": True},
+    {"message": "Ative a campanha de remarketing", "confirmed": True},
+    {"message": "Duplique a campanha de tráfego", "confirmed": True},
+    {"message": "Aumente o orçamento da campanha de conversão para R$ 80", "confirmed": True},
+    {"message": "Crie uma campanha de tráfego chamada Teste Benchmark", "confirmed": True},
+    {
+        "message": "sim",
+        "history": [
+            {"role": "user", "content": "Desative a campanha Black Friday"},
+            {"role": "assistant", "content": "⚠️ **Ação Destrutiva Detectada**\n\nAção: _Desative a campanha Black Friday_"},
+        ],
+    },
+]
+
+
+def load_corpus(path: Optional[str]) -> list[dict]:
+    if not path:
+        return CORPUS
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def message_counts(spans) -> dict:
+    """LLM, tool and Graph API calls (and LLM/tool time) among the spans of one message's trace."""
+    counts = {"llm_calls": 0, "tool_calls": 0, "graph_calls": 0, "llm_ms": 0.0, "tool_ms": 0.0}
+    for span in spans:
+        duration_ms = (span.end - span.start) * 1000 if span.end is not None else 0.0
+        if span.name.startswith("llm "):
+            counts["llm_calls"] += 1
+            counts["llm_ms"] += duration_ms
+        elif span.name.startswith("tool."):
+            counts["tool_calls"] += 1
+            counts["tool_ms"] += duration_ms
+        elif span.name.startswith("meta "):
+            counts["graph_calls"] += 1
+    return counts
+
+
+def summarize(samples: list[dict], elapsed: float) -> dict:
+    latencies = sorted(sample["latency_ms"] for sample in samples)
+    count = len(samples)
+    summary = {
+        "messages": count,
+        "errors": sum(1 for sample in samples if sample["error"]),
+        "msgs_per_sec": round(count / elapsed, 2) if elapsed else 0,
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0,
+        **{f"p{p}_ms": round(percentile(latencies, p), 2) for p in (50, 90, 95, 99)},
+        "max_ms": round(latencies[-1], 2) if latencies else 0,
+    }
+    for key in ("llm_calls", "tool_calls", "graph_calls", "llm_ms", "tool_ms"):
+        summary[f"{key}_per_message"] = round(sum(sample[key] for sample in samples) / count, 2) if count else 0
+    return summary
+
+
+class OrchestratorBench:
+    def __init__(self, args: argparse.Namespace, ids: dict, workdir: Path):
+        # Imported here: the settings must see the fake endpoints first
+        from app.services import activity_log
+        from app.services.tracing import get_trace_buffer, trace
+        from app.skills.orchestrator import CampaignOrchestrator
+
+        # Upstream call telemetry goes to a throwaway activity log
+        activity_log.DB_PATH = workdir / "activity.db"
+        self.args = args
+        self.trace = trace
+        self.trace_buffer = get_trace_buffer()
+        self.orchestrator = CampaignOrchestrator()
+        self.account_id = ids["accounts"][0]["account_id"]
+        self.corpus = load_corpus(args.corpus)
+        self.samples: list[dict] = []
+        self.error_samples: dict[str, str] = {}
+
+    async def run_message(self, item: dict) -> dict:
+        """Runs one corpus message and returns its latency and call counts."""
+        confirmed = item.get("confirmed", False)
+        with self.trace("bench.message", message=item["message"][:80]) as root:
+            started = time.perf_counter()
+            try:
+                result = await self.orchestrator.process_message(
+                    item["message"],
+                    ad_account_id=self.account_id,
+                    history=item.get("history"),
+                    confirmed_action=item["message"] if confirmed else None,
+                )
+                agent_type = result.get("agent_type", "?")
+                error = agent_type == "error"
+                if error:
+                    self.error_samples.setdefault(item["message"][:60], result.get("response", "")[:200])
+            except Exception as e:
+                agent_type, error = "error", True
+                self.error_samples.setdefault(item["message"][:60], f"{type(e).__name__}: {e}"[:200])
+            latency_ms = (time.perf_counter() - started) * 1000
+
+        finished = next((t for t in self.trace_buffer.list() if t.spans and t.root is root), None)
+        return {
+            "agent_type": agent_type,
+            "latency_ms": latency_ms,
+            "error": error,
+            **message_counts(finished.spans if finished else []),
+        }
+
+    async def replay(self, count: int) -> tuple[list[dict], float]:
+        """Replays `count` messages (corpus shuffled and cycled) with the configured concurrency."""
+        rng = random.Random(self.args.seed)
+        items = [self.corpus[i % len(self.corpus)] for i in range(count)]
+        rng.shuffle(items)
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+        samples: list[dict] = []
+
+        async def worker():
+            while not queue.empty():
+                samples.append(await self.run_message(queue.get_nowait()))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+        return samples, time.perf_counter() - started
+
+    async def run(self, llm: httpx.AsyncClient, graph: httpx.AsyncClient) -> dict:
+        args = self.args
+        if args.warmup:
+            await self.replay(args.warmup)
+        await llm.post("/_fake/reset")
+        await graph.post("/_fake/reset")
+        self.error_samples.clear()
+
+        samples, elapsed = await self.replay(args.messages)
+        by_skill = defaultdict(list)
+        for sample in samples:
+            by_skill[sample["agent_type"]].append(sample)
+        return {
+            "config": {
+                "messages": args.messages,
+                "concurrency": args.concurrency,
+                "corpus_size": len(self.corpus),
+                "llm_args": args.llm_args,
+                "graph_args": args.graph_args,
+            },
+            "skills": {name: summarize(group, elapsed) for name, group in sorted(by_skill.items())},
+            "overall": summarize(samples, elapsed),
+            "llm": (await llm.get("/_fake/stats")).json(),
+            "graph": (await graph.get("/_fake/stats")).json(),
+            "error_samples": self.error_samples,
+        }
+
+
+def print_report(report: dict):
+    columns = ("messages", "errors", "msgs_per_sec", "mean_ms", "p50_ms", "p95_ms", "p99_ms",
+               "llm_calls_per_message", "tool_calls_per_message", "graph_calls_per_message",
+               "llm_ms_per_message", "tool_ms_per_message")
+    headers = ("skill", "msgs", "errs", "msg/s", "mean", "p50", "p95", "p99",
+               "llm/msg", "tools/msg", "graph/msg", "llm ms", "tool ms")
+    rows = [(name, *(stats.get(column) for column in columns)) for name, stats in report["skills"].items()]
+    rows.append(("TOTAL", *(report["overall"].get(column) for column in columns)))
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    for row in (headers, *rows):
+        print("  ".join(str("-" if value is None else value).rjust(width) for value, width in zip(row, widths)))
+    llm, graph = report["llm"], report["graph"]
+    print(
+        f"\nLLM: {llm.get('requests', 0)} calls ({llm.get('classifications', 0)} classifications, "
+        f"{llm.get('skill_calls', 0)} skill round trips, {llm.get('confirmation_requests', 0)} confirmation requests), "
+        f"{llm.get('prompt_tokens', 0)} prompt tokens, {llm.get('http_429', 0)} HTTP 429, {llm.get('http_500', 0)} HTTP 500"
+    )
+    print(f"Graph API: {graph.get('requests', 0)} calls, {graph.get('errors', 0)} errors")
+    for message, error in report["error_samples"].items():
+        print(f"  {message}: {error}")
+
+
+def spawn(args: argparse.Namespace) -> list[subprocess.Popen]:
+    """Starts the fake Graph API and the fake LLM (filling tool ids from it) as subprocesses."""
+    graph_port = int(args.graph.rsplit(":", 1)[1])
+    llm_port = int(args.llm.rsplit(":", 1)[1])
+    graph = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_graph_api", "--port", str(graph_port), *shlex.split(args.graph_args)],
+        cwd=BACKEND_DIR,
+    )
+    llm = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_llm", "--port", str(llm_port), "--graph-url", args.graph,
+         *shlex.split(args.llm_args)],
+        cwd=BACKEND_DIR,
+    )
+    return [graph, llm]
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    os.environ.update({
+        "LLM_BASE_URL": f"{args.llm}/v1",
+        "LLM_API_KEY": "fake-key",
+        "META_GRAPH_BASE_URL": args.graph,
+        "META_ACCESS_TOKEN": "fake-token",
+        "META_BUSINESS_ID": "555000000000001",
+    })
+    processes = spawn(args) if args.spawn else []
+    workdir = tempfile.TemporaryDirectory(prefix="orchestrator-bench-")
+    try:
+        if processes:
+            await wait_until_up(f"{args.graph}/_fake/stats", processes[0])
+            await wait_until_up(f"{args.llm}/_fake/stats", processes[1])
+        async with httpx.AsyncClient(base_url=args.llm, timeout=10) as llm, \
+                httpx.AsyncClient(base_url=args.graph, timeout=10) as graph:
+            ids = (await graph.get("/_fake/ids")).json()
+            return await OrchestratorBench(args, ids, Path(workdir.name)).run(llm, graph)
+    finally:
+        workdir.cleanup()
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Chat throughput benchmark of CampaignOrchestrator against the fake LLM and Graph API")
+    parser.add_argument("--llm", default="http://127.0.0.1:8901", help="Fake LLM base URL (without /v1)")
+    parser.add_argument("--graph", default="http://127.0.0.1:8900", help="Fake Graph API base URL")
+    parser.add_argument("--spawn", action="store_true", help="Start the fake LLM and Graph API")
+    parser.add_argument("--llm-args", default="", help="Extra fake_llm options (with --spawn)")
+    parser.add_argument("--graph-args", default="", help="Extra fake_graph_api options (with --spawn)")
+    parser.add_argument("--corpus", help="JSON lines file of messages (default: built-in corpus)")
+    parser.add_argument("--messages", type=int, default=100, help="Measured messages")
+    parser.add_argument("--warmup", type=int, default=len(CORPUS), help="Messages replayed before measuring")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(main_async(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -197,7 +197,8 @@ export default function AlertsPage() {
                         </p>
                       )}
                       <p className="text-xs text-muted-foreground">
-                        {formatTime(alert.created_at)}
+                        {formatTime(alert.last_seen_at || alert.created_at)}
+                        {(alert.occurrences ?? 1) > 1 && ` · ${alert.occurrences} ocorrências`}
                       </p>
                     </div>
 
@@ -103,6 +103,8 @@ export default function MonitoringPage() {
   const [stats, setStats] = useState<LogStats | null>(null)
   const [logs, setLogs] = useState<ActivityLog[]>([])
   const [totalLogs, setTotalLogs] = useState(0)
+  const [totalExact, setTotalExact] = useState(true)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
   const [loading, setLoading] = useState(true)
   const [expandedLog, setExpandedLog] = useState<number | null>(null)
   const [copiedId, setCopiedId] = useState<string | null>(null)
@@ -115,37 +117,50 @@ export default function MonitoringPage() {
   const [filterMethod, setFilterMethod] = useState<string>("all")
   const [filterUser, setFilterUser] = useState<string>("all")
   const [filterPath, setFilterPath] = useState("")
+  const [filterRoute, setFilterRoute] = useState<string>("all")
+  const [routes, setRoutes] = useState<string[]>([])
   const [errorsOnly, setErrorsOnly] = useState(false)
-  const [page, setPage] = useState(1)
+  // Cursores das paginas ja visitadas (pagina N usa cursors[N - 2])
+  const [cursors, setCursors] = useState<string[]>([])
+  const page = cursors.length + 1
+
+  useEffect(() => {
+    setCursors([])
+  }, [filterMethod, filterUser, filterPath, filterRoute, errorsOnly])
   const [statsHours, setStatsHours] = useState(24)
   const [autoRefresh, setAutoRefresh] = useState(true)
 
   const fetchData = useCallback(async () => {
     try {
-      const [statsRes, logsRes, healthRes, usersRes] = await Promise.all([
+      const [statsRes, logsRes, healthRes, usersRes, routesRes] = await Promise.all([
         logsApi.getStats(statsHours),
         logsApi.getLogs({
           method: filterMethod !== "all" ? filterMethod : undefined,
           user_id: filterUser !== "all" ? filterUser : undefined,
+          route: filterRoute !== "all" ? filterRoute : undefined,
           path_contains: filterPath || undefined,
           errors_only: errorsOnly,
-          page,
+          cursor: cursors[cursors.length - 1],
           limit: 50,
         }),
         adminApi.getUsersHealth(statsHours).catch(() => ({ users: [] })),
         adminApi.getUsers().catch(() => ({ users: [] })),
+        logsApi.getRoutes().catch(() => ({ routes: [] })),
       ])
       setStats(statsRes)
       setLogs(logsRes.logs)
       setTotalLogs(logsRes.total)
+      setTotalExact(logsRes.total_exact)
+      setNextCursor(logsRes.next_cursor)
       setUsersHealth(healthRes.users)
       setAdminUsers(usersRes.users)
+      setRoutes(Array.from(new Set(routesRes.routes.map((r) => r.route))))
     } catch {
       // Silently handle errors on monitoring page
     } finally {
       setLoading(false)
     }
-  }, [statsHours, filterMethod, filterUser, filterPath, errorsOnly, page])
+  }, [statsHours, filterMethod, filterUser, filterPath, filterRoute, errorsOnly, cursors])
 
   useEffect(() => {
     if (userRole !== "superadmin") {
@@ -180,6 +195,7 @@ export default function MonitoringPage() {
   function formatLogAsText(log: ActivityLog): string {
     return [
       `[${log.timestamp}] ${log.status_code || "-"} ${log.method} ${log.path}`,
+      `  Rota: ${log.route || "-"}`,
       `  Usuario: ${resolveEmail(log.user_id)}`,
       `  Tempo: ${log.response_time_ms?.toFixed(0) || "-"}ms`,
       `  IP: ${log.ip_address || "-"}`,
@@ -213,7 +229,8 @@ export default function MonitoringPage() {
     try {
       const result = await adminApi.cleanupLogs(days)
       setCleanupResult(
-        `${result.deleted_count} logs removidos. ${result.remaining_count} restantes.`
+        `${result.deleted_count} logs removidos. ${result.remaining_count} restantes. ` +
+          `${(result.reclaimed_bytes / 1024 / 1024).toFixed(1)} MB recuperados.`
       )
       fetchData()
     } catch {
@@ -224,6 +241,7 @@ export default function MonitoringPage() {
   }
 
   const totalPages = Math.ceil(totalLogs / 50)
+  const totalLabel = totalExact ? totalLogs.toLocaleString() : `~${totalLogs.toLocaleString()}`
 
   return (
     <div className="space-y-6 p-6">
@@ -319,7 +337,10 @@ export default function MonitoringPage() {
                 </CardHeader>
                 <CardContent>
                   <div className="text-2xl font-bold">{stats.avg_response_time_ms.toFixed(0)}ms</div>
-                  <p className="text-xs text-muted-foreground">response time</p>
+                  <p className="text-xs text-muted-foreground">
+                    response time
+                    {stats.latency.p95 !== null && ` · p95 ${stats.latency.p95.toFixed(0)}ms · p99 ${stats.latency.p99?.toFixed(0)}ms`}
+                  </p>
                 </CardContent>
               </Card>
 
@@ -402,6 +423,9 @@ export default function MonitoringPage() {
                         <div className="flex items-center gap-3 shrink-0">
                           <span className="text-muted-foreground">{ep.count}x</span>
                           <span className="text-muted-foreground">{ep.avg_time_ms}ms</span>
+                          {ep.p95_ms !== null && (
+                            <span className="text-muted-foreground">p95 {ep.p95_ms}ms</span>
+                          )}
                           {ep.error_count > 0 && (
                             <span className="text-red-400">{ep.error_count} err</span>
                           )}
@@ -648,6 +672,20 @@ export default function MonitoringPage() {
                   </SelectContent>
                 </Select>
 
+                <Select value={filterRoute} onValueChange={setFilterRoute}>
+                  <SelectTrigger className="w-[260px]">
+                    <SelectValue placeholder="Rota" />
+                  </SelectTrigger>
+                  <SelectContent>
+                    <SelectItem value="all">Todas as rotas</SelectItem>
+                    {routes.map((route) => (
+                      <SelectItem key={route} value={route}>
+                        {route}
+                      </SelectItem>
+                    ))}
+                  </SelectContent>
+                </Select>
+
                 <Input
                   placeholder="Filtrar por path..."
                   value={filterPath}
@@ -664,7 +702,7 @@ export default function MonitoringPage() {
                   {errorsOnly ? "Erros" : "Todos"}
                 </Button>
 
-                <Button variant="outline" size="sm" onClick={() => { setPage(1); fetchData() }}>
+                <Button variant="outline" size="sm" onClick={() => { setCursors([]); fetchData() }}>
                   Aplicar
                 </Button>
 
@@ -730,7 +768,10 @@ export default function MonitoringPage() {
                               <td className="px-3 py-2">
                                 <MethodBadge method={log.method} />
                               </td>
-                              <td className="px-3 py-2 font-mono text-xs max-w-[300px] truncate">
+                              <td
+                                className="px-3 py-2 font-mono text-xs max-w-[300px] truncate"
+                                title={log.route ?? undefined}
+                              >
                                 {log.path}
                               </td>
                               <td className="px-3 py-2 text-xs text-muted-foreground">
@@ -800,16 +841,16 @@ export default function MonitoringPage() {
               </div>
 
               {/* Pagination */}
-              {totalPages > 1 && (
+              {(page > 1 || nextCursor) && (
                 <div className="flex items-center justify-between mt-4">
                   <span className="text-sm text-muted-foreground">
-                    {totalLogs} logs total - Pagina {page} de {totalPages}
+                    {totalLabel} logs total - Pagina {page} de {totalExact ? totalPages : `~${totalPages}`}
                   </span>
                   <div className="flex gap-2">
                     <Button
                       variant="outline"
                       size="sm"
-                      onClick={() => setPage(Math.max(1, page - 1))}
+                      onClick={() => setCursors(cursors.slice(0, -1))}
                       disabled={page <= 1}
                     >
                       Anterior
@@ -817,8 +858,8 @@ export default function MonitoringPage() {
                     <Button
                       variant="outline"
                       size="sm"
-                      onClick={() => setPage(Math.min(totalPages, page + 1))}
-                      disabled={page >= totalPages}
+                      onClick={() => nextCursor && setCursors([...cursors, nextCursor])}
+                      disabled={!nextCursor}
                     >
                       Proximo
                     </Button>
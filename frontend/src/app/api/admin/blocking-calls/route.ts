@@ -0,0 +1,14 @@
+import { type NextRequest } from "next/server"
+import { adminProxy } from "@/lib/backend-proxy"
+
+export async function GET(request: NextRequest) {
+  const params = new URLSearchParams()
+  const limit = request.nextUrl.searchParams.get("limit")
+  if (limit) params.set("limit", limit)
+
+  return adminProxy("/api/admin/blocking-calls", { searchParams: params })
+}
+
+export async function DELETE() {
+  return adminProxy("/api/admin/blocking-calls", { method: "DELETE" })
+}
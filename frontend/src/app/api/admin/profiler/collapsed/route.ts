@@ -0,0 +1,5 @@
+import { adminProxy } from "@/lib/backend-proxy"
+
+export async function GET() {
+  return adminProxy("/api/admin/profiler/collapsed", { raw: true })
+}
@@ -0,0 +1,10 @@
+import { type NextRequest } from "next/server"
+import { adminProxy } from "@/lib/backend-proxy"
+
+export async function GET(request: NextRequest) {
+  const params = new URLSearchParams()
+  const limit = request.nextUrl.searchParams.get("limit")
+  if (limit) params.set("limit", limit)
+
+  return adminProxy("/api/admin/profiler", { searchParams: params })
+}
@@ -0,0 +1,12 @@
+import { type NextRequest } from "next/server"
+import { adminProxy } from "@/lib/backend-proxy"
+
+export async function POST(request: NextRequest) {
+  const params = new URLSearchParams()
+  for (const key of ["seconds", "interval_ms", "route", "include_idle"]) {
+    const value = request.nextUrl.searchParams.get(key)
+    if (value) params.set(key, value)
+  }
+
+  return adminProxy("/api/admin/profiler/start", { method: "POST", searchParams: params })
+}
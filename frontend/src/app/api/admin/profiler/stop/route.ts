@@ -0,0 +1,5 @@
+import { adminProxy } from "@/lib/backend-proxy"
+
+export async function POST() {
+  return adminProxy("/api/admin/profiler/stop", { method: "POST" })
+}
@@ -0,0 +1,10 @@
+import { type NextRequest } from "next/server"
+import { adminProxy } from "@/lib/backend-proxy"
+
+export async function GET(
+  _request: NextRequest,
+  { params }: { params: Promise<{ traceId: string }> }
+) {
+  const { traceId } = await params
+  return adminProxy(`/api/admin/traces/${encodeURIComponent(traceId)}`)
+}
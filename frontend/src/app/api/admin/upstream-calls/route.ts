@@ -0,0 +1,12 @@
+import { type NextRequest } from "next/server"
+import { adminProxy } from "@/lib/backend-proxy"
+
+export async function GET(request: NextRequest) {
+  const params = new URLSearchParams()
+  for (const key of ["hours", "service", "sort", "limit"]) {
+    const value = request.nextUrl.searchParams.get(key)
+    if (value) params.set(key, value)
+  }
+
+  return adminProxy("/api/admin/upstream-calls", { searchParams: params })
+}
@@ -28,6 +28,7 @@ export function Header({ onSync }: HeaderProps) {
   const [isSyncing, setIsSyncing] = useState(false)
   const [unreadAlerts, setUnreadAlerts] = useState(0)
   const userRole = (session?.user as { role?: string })?.role
+  const userId = (session?.user as { id?: string })?.id
   const isSuperadmin = userRole === "superadmin"
 
   const fetchUnreadCount = useCallback(async () => {
@@ -41,11 +42,14 @@ export function Header({ onSync }: HeaderProps) {
   }, [isSuperadmin])
 
   useEffect(() => {
-    fetchUnreadCount()
-    // Refresh every 30 seconds
-    const interval = setInterval(fetchUnreadCount, 30000)
-    return () => clearInterval(interval)
-  }, [fetchUnreadCount])
+    if (isSuperadmin || !userId) return
+    // Push-based updates (SSE) instead of polling
+    return alertsApi.subscribe(userId, {
+      onUnreadCount: setUnreadAlerts,
+      onUnreadDelta: (delta) => setUnreadAlerts((prev) => Math.max(0, prev + delta)),
+      onResync: fetchUnreadCount,
+    })
+  }, [isSuperadmin, userId, fetchUnreadCount])
 
   const handleSync = async () => {
     if (!onSync) return
@@ -681,8 +681,18 @@ export interface Alert {
   message: string
   campaign_id?: string
   campaign_name?: string
+  ad_account_id?: string
   read: boolean
+  occurrences?: number
   created_at: string
+  last_seen_at?: string
+}
+
+export interface AlertStreamHandlers {
+  onUnreadCount?: (count: number) => void
+  onAlert?: (alert: Alert) => void
+  onUnreadDelta?: (delta: number) => void
+  onResync?: () => void
 }
 
 export interface AlertListResponse {
@@ -709,6 +719,27 @@ export const alertsApi = {
 
   getUnreadCount: () => fetchApi<{ unread_count: number }>("/api/alerts/unread-count"),
 
+  // Server-Sent Events: pushes new alerts and unread-count deltas. Returns a close function.
+  subscribe: (userId: string | undefined, handlers: AlertStreamHandlers) => {
+    const params = userId ? `?user_id=${userId}` : ""
+    const source = new EventSource(`${API_BASE_URL}/api/alerts/stream${params}`)
+
+    source.addEventListener("unread_count", (event) => {
+      handlers.onUnreadCount?.(JSON.parse((event as MessageEvent).data).unread_count)
+    })
+    source.addEventListener("alert", (event) => {
+      const data = JSON.parse((event as MessageEvent).data)
+      handlers.onAlert?.(data.alert)
+      handlers.onUnreadDelta?.(data.unread_delta)
+    })
+    source.addEventListener("unread_delta", (event) => {
+      handlers.onUnreadDelta?.(JSON.parse((event as MessageEvent).data).delta)
+    })
+    source.addEventListener("resync", () => handlers.onResync?.())
+
+    return () => source.close()
+  },
+
   getById: (alertId: string) => fetchApi<Alert>(`/api/alerts/${alertId}`),
 
   update: (alertId: string, update: AlertUpdate) =>
@@ -916,14 +947,30 @@ export interface ActivityLog {
   error_detail: string | null
   ip_address: string | null
   user_agent: string | null
+  route: string | null
 }
 
 export interface LogsResponse {
   success: boolean
   logs: ActivityLog[]
   total: number
+  total_exact: boolean
   page: number
   limit: number
+  next_cursor: string | null
+}
+
+export interface LogRoutesResponse {
+  success: boolean
+  routes: Array<{ route: string; method: string; count: number }>
+}
+
+export interface LatencyPercentiles {
+  p50: number | null
+  p90: number | null
+  p95: number | null
+  p99: number | null
+  max: number | null
 }
 
 export interface LogStats {
@@ -931,8 +978,20 @@ export interface LogStats {
   total_requests: number
   error_count: number
   avg_response_time_ms: number
+  latency: LatencyPercentiles
   active_users: Array<{ user_id: string; request_count: number; last_seen: string }>
-  top_endpoints: Array<{ path: string; method: string; count: number; avg_time_ms: number; error_count: number }>
+  top_endpoints: Array<{
+    path: string
+    method: string
+    count: number
+    avg_time_ms: number
+    error_count: number
+    p50_ms: number | null
+    p90_ms: number | null
+    p95_ms: number | null
+    p99_ms: number | null
+    max_ms: number | null
+  }>
   status_breakdown: Array<{ status_group: string; count: number }>
   recent_errors: Array<{ timestamp: string; user_id: string | null; method: string; path: string; status_code: number; response_time_ms: number; error_detail: string | null }>
 }
@@ -960,8 +1019,10 @@ export const logsApi = {
     method?: string
     status_min?: number
     status_max?: number
+    route?: string
     path_contains?: string
     errors_only?: boolean
+    cursor?: string
     page?: number
     limit?: number
   }) => {
@@ -970,8 +1031,10 @@ export const logsApi = {
     if (filters?.method) params.append("method", filters.method)
     if (filters?.status_min) params.append("status_min", String(filters.status_min))
     if (filters?.status_max) params.append("status_max", String(filters.status_max))
+    if (filters?.route) params.append("route", filters.route)
     if (filters?.path_contains) params.append("path_contains", filters.path_contains)
     if (filters?.errors_only) params.append("errors_only", "true")
+    if (filters?.cursor) params.append("cursor", filters.cursor)
     if (filters?.page) params.append("page", String(filters.page))
     if (filters?.limit) params.append("limit", String(filters.limit))
     const queryString = params.toString() ? `?${params.toString()}` : ""
@@ -980,6 +1043,9 @@ export const logsApi = {
 
   getStats: (hours: number = 24) =>
     fetchLocalApi<LogStats>(`/api/admin/logs-stats?hours=${hours}`),
+
+  getRoutes: (hours: number = 168) =>
+    fetchLocalApi<LogRoutesResponse>(`/api/admin/logs-routes?hours=${hours}`),
 }
 
 // ==================== Admin API ====================
@@ -1020,6 +1086,129 @@ export interface LogCleanupResponse {
   success: boolean
   deleted_count: number
   remaining_count: number
+  dropped_partitions: number
+  reclaimed_bytes: number
+}
+
+export interface UpstreamEndpointStats {
+  service: "meta" | "llm"
+  method: string
+  endpoint: string
+  caller: string
+  calls: number
+  total_ms: number
+  avg_ms: number
+  max_ms: number
+  retries: number
+  retry_ms: number
+  throttled: number
+  throttle_rate: number
+  errors: number
+  response_bytes: number
+  p50_ms: number | null
+  p90_ms: number | null
+  p95_ms: number | null
+  p99_ms: number | null
+}
+
+export interface UpstreamAccountUsage {
+  account_id: string
+  calls: number
+  throttled: number
+  max_app_usage_pct: number | null
+  max_account_usage_pct: number | null
+  max_business_usage_pct: number | null
+}
+
+export interface UpstreamCallsResponse {
+  success: boolean
+  hours: number
+  sort: "total_time" | "throttle_rate" | "retry_cost"
+  endpoints: UpstreamEndpointStats[]
+  accounts: UpstreamAccountUsage[]
+}
+
+export interface TraceSummary {
+  trace_id: string
+  name: string
+  started_at: string
+  duration_ms: number | null
+  span_count: number
+  dropped_spans: number
+  error: string | null
+  attributes: Record<string, unknown>
+}
+
+export interface TraceSpan {
+  span_id: number
+  parent_id: number | null
+  name: string
+  depth: number
+  offset_ms: number
+  duration_ms: number | null
+  thread: string
+  error: string | null
+  attributes: Record<string, unknown>
+}
+
+export interface TracesResponse {
+  success: boolean
+  traces: TraceSummary[]
+}
+
+export interface TraceResponse {
+  success: boolean
+  trace: TraceSummary & { spans: TraceSpan[] }
+}
+
+export interface BlockingCallSite {
+  site: string
+  count: number
+  total_ms: number
+  avg_ms: number
+  max_ms: number
+  last_seen: string
+  innermost: Record<string, number>
+  stack: string[]
+}
+
+export interface BlockingCallsResponse {
+  success: boolean
+  watchdog_running: boolean
+  since: string
+  threshold_ms: number
+  last_lag_ms: number
+  max_lag_ms: number
+  discarded: number
+  sites: BlockingCallSite[]
+}
+
+export interface ProfilerSession {
+  started_at: string
+  finished_at: string | null
+  seconds: number
+  interval_ms: number
+  route: string | null
+  include_idle: boolean
+  samples: number
+  matched_samples: number
+  overhead_ms: number
+  running?: boolean
+  distinct_stacks?: number
+}
+
+export interface ProfilerFrame {
+  frame: string
+  self_samples: number
+  total_samples: number
+  self_pct: number
+  total_pct: number
+}
+
+export interface ProfilerResponse {
+  success: boolean
+  session: ProfilerSession | null
+  top_frames: ProfilerFrame[]
 }
 
 export const adminApi = {
@@ -1033,4 +1222,49 @@ export const adminApi = {
     fetchLocalApi<LogCleanupResponse>(`/api/admin/logs-cleanup?days=${days}`, {
       method: "DELETE",
     }),
+
+  getUpstreamCalls: (
+    hours: number = 24,
+    sort: UpstreamCallsResponse["sort"] = "total_time",
+    service?: "meta" | "llm",
+  ) => {
+    const params = new URLSearchParams({ hours: String(hours), sort })
+    if (service) params.set("service", service)
+    return fetchLocalApi<UpstreamCallsResponse>(`/api/admin/upstream-calls?${params.toString()}`)
+  },
+
+  getTraces: (filters?: { name?: string; min_duration_ms?: number; errors_only?: boolean; limit?: number }) => {
+    const params = new URLSearchParams()
+    if (filters?.name) params.set("name", filters.name)
+    if (filters?.min_duration_ms) params.set("min_duration_ms", String(filters.min_duration_ms))
+    if (filters?.errors_only) params.set("errors_only", "true")
+    if (filters?.limit) params.set("limit", String(filters.limit))
+    const queryString = params.toString() ? `?${params.toString()}` : ""
+    return fetchLocalApi<TracesResponse>(`/api/admin/traces${queryString}`)
+  },
+
+  getTrace: (traceId: string) =>
+    fetchLocalApi<TraceResponse>(`/api/admin/traces/${encodeURIComponent(traceId)}`),
+
+  getBlockingCalls: (limit: number = 50) =>
+    fetchLocalApi<BlockingCallsResponse>(`/api/admin/blocking-calls?limit=${limit}`),
+
+  resetBlockingCalls: () =>
+    fetchLocalApi<{ success: boolean }>("/api/admin/blocking-calls", { method: "DELETE" }),
+
+  startProfiler: (options?: { seconds?: number; interval_ms?: number; route?: string; include_idle?: boolean }) => {
+    const params = new URLSearchParams()
+    if (options?.seconds) params.set("seconds", String(options.seconds))
+    if (options?.interval_ms) params.set("interval_ms", String(options.interval_ms))
+    if (options?.route) params.set("route", options.route)
+    if (options?.include_idle) params.set("include_idle", "true")
+    const queryString = params.toString() ? `?${params.toString()}` : ""
+    return fetchLocalApi<ProfilerResponse>(`/api/admin/profiler/start${queryString}`, { method: "POST" })
+  },
+
+  stopProfiler: () =>
+    fetchLocalApi<ProfilerResponse>("/api/admin/profiler/stop", { method: "POST" }),
+
+  getProfiler: (limit: number = 30) =>
+    fetchLocalApi<ProfilerResponse>(`/api/admin/profiler?limit=${limit}`),
 }
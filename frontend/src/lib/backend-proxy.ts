@@ -6,6 +6,8 @@ const ADMIN_API_KEY = process.env.ADMIN_API_KEY || ""
 interface ProxyOptions {
   method?: string
   searchParams?: URLSearchParams
+  /** Pass the backend body through untouched (e.g. file downloads) */
+  raw?: boolean
 }
 
 export async function adminProxy(
@@ -34,6 +36,15 @@ export async function adminProxy(
     headers: { "X-Admin-Key": ADMIN_API_KEY },
   })
 
+  if (options.raw) {
+    const headers = new Headers()
+    for (const name of ["content-type", "content-disposition"]) {
+      const value = res.headers.get(name)
+      if (value) headers.set(name, value)
+    }
+    return new Response(res.body, { status: res.status, headers })
+  }
+
   const data = await res.json()
   return Response.json(data, { status: res.status })
 }